@@ -30,6 +30,13 @@ with open(_CSV.format('atomic_radius'), 'rb') as f:
     )
 
 
+with open(_CSV.format('atomic_covalent_radius'), 'rb') as f:
+    ATOMIC_COVALENT_RADIUS = dict(
+        _transtype(*line.decode('utf-8').strip().split(','))
+            for line in f
+    )
+
+
 with open(_CSV.format('aminoacid_charges'), 'rb') as f:
     headers = next(f).decode('utf-8').split(',')[1:]
     AMINOACID_CHARGES = {
@@ -0,0 +1,276 @@
+# coding: utf-8
+"""
+ligand
+======
+
+Array-backed small molecules, read from SDF / MOL files.
+
+A `Ligand` only stores the arrays needed to score it against a receptor
+(atom positions, elements and partial charges), and implements the
+``atom_*`` methods of `dockerasmus.pdb.Protein` used by the scoring
+requirements, so that it can be passed to a `ScoringFunction`.
+"""
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import gzip
+
+import numpy
+import six
+
+from . import constants
+from .utils import matrices
+
+
+class Ligand(object):
+    """A small molecule with array-backed atoms.
+
+    Attributes:
+        name (`str`): the name of the molecule (the first line of
+            its MOL block).
+        elements (`numpy.ndarray`): the element symbol of each atom.
+        positions (`numpy.ndarray`): an array of shape (n_atoms, 3)
+            with the position of each atom.
+        charges (`numpy.ndarray`): the partial charge of each atom.
+        bonds (`numpy.ndarray`): an array of shape (n_bonds, 2) with
+            the (0-based) indices of the atoms of each bond.
+        properties (`dict`): the data items of the SDF record.
+
+    Warning:
+        Components requiring residue-level information, such as
+        `dockerasmus.score.components.Fabiola`, cannot score ligands.
+
+    Example:
+        >>> ligand = Ligand("water", ["O", "H", "H"], numpy.eye(3), [-0.8, 0.4, 0.4])
+        >>> len(ligand)
+        3
+        >>> ligand.atom_radius()
+        array([ 1.684,  1.487,  1.487])
+    """
+
+    __slots__ = (
+        "name", "elements", "positions", "charges", "bonds", "properties", "_vectors",
+    )
+
+    #: The atom type used to read the Lennard-Jones parameters of each
+    #: element from `constants.ATOMIC_POTENTIAL_WELL_DEPTH` and
+    #: `constants.ATOMIC_RADIUS`. Other elements (the halogens and
+    #: phosphorus) are read with their own symbol as atom type.
+    ELEMENT_TYPES = {'C': 'CT', 'H': 'HC', 'N': 'N2m', 'O': 'OS', 'S': 'S'}
+
+    #: The data items checked for partial charges, in order, when no
+    #: field is given to `Ligand.iter_sdf`.
+    CHARGES_FIELDS = (
+        'PUBCHEM_MMFF94_PARTIAL_CHARGES', 'partial_charges',
+        'PartialCharges', 'charges',
+    )
+
+    _FORMAL_CHARGES = {0: 0, 1: 3, 2: 2, 3: 1, 4: 0, 5: -1, 6: -2, 7: -3}
+
+    def __init__(self, name, elements, positions, charges=None, bonds=None, properties=None):
+        self.name = name
+        self.elements = numpy.array(elements, dtype=six.text_type)
+        self.positions = numpy.asarray(positions, dtype=float).reshape(-1, 3)
+        self.charges = numpy.zeros(len(self.positions)) if charges is None \
+                  else numpy.asarray(charges, dtype=float)
+        self.bonds = numpy.zeros((0, 2), dtype=int) if bonds is None \
+                else numpy.asarray(bonds, dtype=int).reshape(-1, 2)
+        self.properties = properties or {}
+        self._vectors = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __repr__(self):
+        return "Ligand({!r}, {} atoms)".format(self.name, len(self))
+
+    @staticmethod
+    def _parse_charges(value, n_atoms):
+        """Parse the partial charges stored in a data item.
+
+        Both a plain list of charges (one per atom) and the sparse
+        PubChem format (the number of charged atoms, followed by one
+        ``<index> <charge>`` line per charged atom) are supported.
+        """
+        lines = value.strip().splitlines()
+        if len(lines) > 1 and lines[0].strip().isdigit() \
+        and int(lines[0]) == len(lines) - 1 \
+        and all(len(line.split()) == 2 for line in lines[1:]):
+            charges = numpy.zeros(n_atoms)
+            for line in lines[1:]:
+                index, charge = line.split()
+                charges[int(index) - 1] = float(charge)
+            return charges
+        charges = numpy.array(value.split(), dtype=float)
+        if len(charges) != n_atoms:
+            raise ValueError("Expected {} charges, found {}".format(n_atoms, len(charges)))
+        return charges
+
+    @classmethod
+    def _from_sdf_record(cls, lines, charges_field=None):
+        """Create a new Ligand from the lines of a single SDF record.
+        """
+        if len(lines) < 4:
+            raise ValueError("Truncated MOL block")
+        counts = lines[3]
+        if counts[34:39].strip() == b"V3000":
+            raise ValueError("V3000 MOL blocks are not supported")
+        n_atoms, n_bonds = int(counts[0:3]), int(counts[3:6])
+        atoms = lines[4:4+n_atoms]
+        if len(atoms) != n_atoms or len(lines) < 4 + n_atoms + n_bonds:
+            raise ValueError("Truncated MOL block")
+
+        positions = [(float(l[0:10]), float(l[10:20]), float(l[20:30])) for l in atoms]
+        elements = [l[31:34].strip().decode('ascii') for l in atoms]
+        formal = [cls._FORMAL_CHARGES.get(int(l[36:39] or 0), 0) for l in atoms]
+        bonds = [
+            (int(l[0:3]) - 1, int(l[3:6]) - 1)
+                for l in lines[4+n_atoms:4+n_atoms+n_bonds]
+        ]
+
+        # Properties block, and data items
+        properties, key = {}, None
+        for line in lines[4+n_atoms+n_bonds:]:
+            if line.startswith(b"M  CHG"):
+                fields = line.split()[3:]
+                for index, charge in zip(fields[::2], fields[1::2]):
+                    formal[int(index) - 1] = int(charge)
+            elif line.startswith(b">"):
+                start = line.find(b"<")
+                key = line[start+1:line.find(b">", start)].decode('utf-8')
+                properties[key] = []
+            elif key is not None:
+                if line.strip():
+                    properties[key].append(line.rstrip(b"\r\n").decode('utf-8'))
+                else:
+                    key = None
+        properties = {k: "\n".join(v) for k, v in properties.items()}
+
+        fields = [charges_field] if charges_field is not None else cls.CHARGES_FIELDS
+        field = next((f for f in fields if f in properties), None)
+        if field is not None:
+            charges = cls._parse_charges(properties[field], n_atoms)
+        elif charges_field is not None:
+            raise KeyError("Could not find data item: {}".format(charges_field))
+        else:
+            charges = formal
+
+        return cls(
+            lines[0].strip().decode('utf-8'), elements, positions, charges,
+            bonds, properties,
+        )
+
+    @classmethod
+    def iter_sdf(cls, handle, charges_field=None):
+        """Yield each molecule of an SDF file handle.
+
+        Records are read and parsed one at a time, so that memory usage
+        does not depend on the size of the file.
+
+        Arguments:
+            handle (file handle): a file-like object opened in
+                binary read mode (must be line-by-line iterable).
+
+        Keyword Arguments:
+            charges_field (`str`, optional): the name of the data item
+                with the partial charges of the atoms. If not given,
+                the items listed in `Ligand.CHARGES_FIELDS` are checked,
+                and the formal charges of the MOL block are used when
+                none of them is found.
+
+        Yields:
+            `Ligand`: each molecule of the file, in order.
+
+        Raises:
+            ValueError: when a record is not a valid V2000 MOL block.
+            KeyError: when ``charges_field`` is given but missing
+                from a record.
+        """
+        lines = []
+        for line in handle:
+            if line.startswith(b"$$$$"):
+                yield cls._from_sdf_record(lines, charges_field)
+                lines = []
+            else:
+                lines.append(line)
+        if any(line.strip() for line in lines):
+            yield cls._from_sdf_record(lines, charges_field)
+
+    @classmethod
+    def iter_sdf_file(cls, path, charges_field=None):
+        """Yield each molecule of an SDF file (plain or gzipped).
+
+        See Also:
+            `Ligand.iter_sdf` for a description of the arguments.
+        """
+        with (gzip.open if path.endswith('.gz') else open)(path, 'rb') as sdf_file:
+            for ligand in cls.iter_sdf(sdf_file, charges_field):
+                yield ligand
+
+    @classmethod
+    def from_sdf(cls, handle, charges_field=None):
+        """Create a new Ligand from the first molecule of an SDF / MOL file handle.
+        """
+        return next(cls.iter_sdf(handle, charges_field))
+
+    @classmethod
+    def from_sdf_file(cls, path, charges_field=None):
+        """Create a new Ligand from the first molecule of an SDF / MOL file.
+        """
+        return next(cls.iter_sdf_file(path, charges_field))
+
+    def transform(self, matrix, inplace=False):
+        """Apply a 4x4 transformation matrix to every atom of ``self``.
+
+        Keyword Arguments:
+            inplace (`bool`): move the atoms of ``self`` instead of
+                returning a moved copy.
+
+        Returns:
+            `Ligand`: a new molecule sharing the arrays of ``self``
+            other than ``positions``, or ``self`` when ``inplace`` is
+            `True` (see `Protein.transform`).
+        """
+        positions = matrices.apply_transform(self.positions, matrix)
+        if not inplace:
+            ligand = type(self)(
+                self.name, self.elements, positions, self.charges, self.bonds, self.properties)
+            ligand._vectors = self._vectors
+            return ligand
+        self.positions[...] = positions
+        return self
+
+    def _read_from_constants(self, key, table):
+        # Read a parameter of each atom from ``table`` only once, so that
+        # the same vector is returned to every `Pose` of the molecule
+        vector = self._vectors.get(key)
+        if vector is None:
+            try:
+                vector = numpy.array([
+                    table[self.ELEMENT_TYPES.get(e, e)] for e in self.elements.tolist()
+                ], dtype=float)
+            except KeyError as err:
+                six.raise_from(KeyError("Unknown element: {}".format(err.args[0])), None)
+            self._vectors[key] = vector
+        return vector
+
+    def atom_charges(self):
+        """The vector of the partial charge of each atom of the molecule.
+        """
+        return self.charges
+
+    def atom_pwd(self):
+        """The vector of the potential well depth of each atom of the molecule.
+        """
+        return self._read_from_constants('pwd', constants.ATOMIC_POTENTIAL_WELL_DEPTH)
+
+    def atom_positions(self):
+        """The matrix of the positions of each atom of the molecule.
+        """
+        return self.positions
+
+    def atom_radius(self):
+        """The vector of the Van der Waals radius of each atom of the molecule.
+        """
+        return self._read_from_constants('radius', constants.ATOMIC_RADIUS)
@@ -13,10 +13,13 @@ from .protein import Protein
 from .residue import Residue
 from .chain import Chain
 from .atom import Atom
+from .archive import DecoyArchive
+from .dcd import DCDTrajectory
+from . import cache
 
 __author__ = "althonos"
 __author_email__ = "martin.larralde@ens-cachan.fr"
 __version__ = "0.1.0"
 __license__ = "GPLv3"
 
-__all__ = ["Protein", "Residue", "Chain", "Atom"]
+__all__ = ["Protein", "Residue", "Chain", "Atom", "DecoyArchive", "DCDTrajectory"]
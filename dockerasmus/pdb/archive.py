@@ -0,0 +1,194 @@
+# coding: utf-8
+"""
+archive
+=======
+
+Compact storage of rigid-body decoys of a single structure.
+
+A decoy archive stores a template structure once, as `dict` of column
+arrays (see `Protein._parse_pdb_atom_columns`), together with a stack of
+4x4 transformation matrices, one per decoy. A decoy is obtained by
+applying its matrix to the template, with the same semantics as
+`dockerasmus.spatial.apply_transformation_matrix`.
+"""
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import division
+
+import numpy
+import six
+
+from ..utils import matrices
+from ..utils.files import atomic_open
+from .protein import Protein
+
+
+ARCHIVE_VERSION = 1
+
+
+class DecoyArchive(object):
+    """A template `Protein` and the rigid-body transforms of its decoys.
+
+    Example:
+        >>> from dockerasmus.spatial import TranslationMatrix
+        >>> archive = DecoyArchive(barstar, [TranslationMatrix(dx=i) for i in range(3)])
+        >>> len(archive)
+        3
+        >>> archive.positions().shape
+        (3, 1402, 3)
+        >>> archive[2].atom(1).x - barstar.atom(1).x
+        2.0
+    """
+
+    def __init__(self, template, transforms, names=None):
+        """Create a new decoy archive.
+
+        Arguments:
+            template (`Protein`): the structure the decoys are
+                transformations of.
+            transforms (`numpy.ndarray`): an array of shape (N, 4, 4)
+                with the transformation matrix of each decoy.
+
+        Keyword Arguments:
+            names (`list` of `str`, optional): the name of each decoy
+                (e.g. the name of the file it was loaded from).
+        """
+        self.template = template
+        self.transforms = numpy.asarray(transforms, dtype=float).reshape(-1, 4, 4)
+        self.names = numpy.array(
+            names if names is not None else [""] * len(self.transforms),
+            dtype=six.text_type,
+        )
+        if len(self.names) != len(self.transforms):
+            raise ValueError("Expected {} names, found {}".format(
+                len(self.transforms), len(self.names)))
+        self._columns = template._to_columns()
+
+    @classmethod
+    def from_poses(cls, poses, names=None, tolerance=1e-2):
+        """Create a new decoy archive from rigid-body poses of a protein.
+
+        The first pose is used as the template, and the transform of
+        each pose is found by superposing the template onto the pose
+        (using the Kabsch algorithm).
+
+        Arguments:
+            poses (iterable of `Protein`): poses of the same protein,
+                with their atoms in the same order.
+
+        Keyword Arguments:
+            names (`list` of `str`, optional): the name of each pose.
+            tolerance (`float`): the maximum RMSD allowed between a pose
+                and the transformed template.
+
+        Raises:
+            ValueError: when a pose does not have the same atoms as the
+                template, or when it cannot be obtained as a rigid-body
+                transformation of the template.
+        """
+        poses = iter(poses)
+        template = next(poses)
+        reference = template._to_columns()
+        positions = reference['positions']
+        center = positions.mean(axis=0)
+        centered = positions - center
+
+        transforms = [numpy.identity(4)]
+        for pose in poses:
+            columns = pose._to_columns()
+            if not numpy.array_equal(columns['name'], reference['name']) \
+            or not numpy.array_equal(columns['resSeq'], reference['resSeq']):
+                raise ValueError("Pose atoms do not match the template atoms")
+            target = columns['positions']
+            target_center = target.mean(axis=0)
+            u, _, vt = numpy.linalg.svd(centered.T.dot(target - target_center))
+            d = numpy.sign(numpy.linalg.det(vt.T.dot(u.T)))
+            rotation = vt.T.dot(numpy.diag([1, 1, d])).dot(u.T)
+            matrix = numpy.identity(4)
+            matrix[:3, :3] = rotation
+            matrix[:3, 3] = target_center - rotation.dot(center)
+            error = positions.dot(rotation.T) + matrix[:3, 3] - target
+            if numpy.sqrt((error ** 2).sum(axis=1).mean()) > tolerance:
+                raise ValueError("Pose is not a rigid-body transform of the template")
+            transforms.append(matrix)
+
+        return cls(template, transforms, names)
+
+    @classmethod
+    def load(cls, path):
+        """Load a decoy archive from ``path``.
+
+        Raises:
+            ValueError: when the file is not a decoy archive, or when it
+                was written by an incompatible version.
+        """
+        with numpy.load(path, allow_pickle=False) as archive:
+            if '__version__' not in archive.files \
+            or archive['__version__'].item() != ARCHIVE_VERSION:
+                raise ValueError("Not a decoy archive: {}".format(path))
+            arrays = {k: archive[k] for k in archive.files}
+        columns = {
+            k[len('template.'):]: v for k, v in arrays.items()
+                if k.startswith('template.')
+        }
+        return cls(Protein._from_columns(columns), arrays['transforms'], arrays['names'])
+
+    def dump(self, path):
+        """Write the decoy archive to ``path``.
+
+        The archive is written to a temporary file first, and then
+        moved in place.
+        """
+        arrays = {'template.{}'.format(k): v for k, v in self._columns.items()}
+        arrays.update({
+            '__version__': numpy.array(ARCHIVE_VERSION),
+            'transforms': self.transforms,
+            'names': self.names,
+        })
+        with atomic_open(path) as f:
+            numpy.savez(f, **arrays)
+
+    def __len__(self):
+        return len(self.transforms)
+
+    def __getitem__(self, index):
+        """Return the decoy at ``index`` as a new `Protein`.
+        """
+        positions = self.positions(index, index+1 or None)[0]
+        protein = Protein._from_columns(dict(self._columns, positions=positions))
+        protein.id, protein.name = self.template.id, self.names[index].item()
+        return protein
+
+    def __iter__(self):
+        """Yield each decoy as a new `Protein`, building them lazily.
+        """
+        for index in six.moves.range(len(self)):
+            yield self[index]
+
+    def positions(self, start=0, stop=None):
+        """Return the atom positions of a range of decoys.
+
+        Keyword Arguments:
+            start (`int`): the index of the first decoy.
+            stop (`int`, optional): the index after the last decoy,
+                or `None` to stop after the last decoy.
+
+        Returns:
+            `numpy.ndarray`: an array of shape (n_decoys, n_atoms, 3),
+            with atoms ordered as in `Protein.iteratoms`.
+        """
+        return matrices.apply_transform(self._columns['positions'], self.transforms[start:stop])
+
+    def iter_positions(self, batch_size=1024):
+        """Yield the atom positions of the decoys in batches.
+
+        Keyword Arguments:
+            batch_size (`int`): the maximum number of decoys per batch.
+
+        Yields:
+            `numpy.ndarray`: arrays of shape (batch_size, n_atoms, 3),
+            the last one possibly being smaller.
+        """
+        for start in six.moves.range(0, len(self), batch_size):
+            yield self.positions(start, start + batch_size)
@@ -10,7 +10,15 @@ from ..utils.decorators import method_requires
 
 
 class Atom(object):
-    __slots__ = ("id", "name", "x", "y", "z", "residue")
+    """An atom of a protein.
+
+    Atoms of a protein created from column arrays (a parsed file, for
+    instance) are views on a row of the `AtomStore` of the protein:
+    their coordinates are stored in the positions array of the protein,
+    and moving an atom moves it in `Protein.atom_positions` as well.
+    """
+
+    __slots__ = ("_id", "_name", "_residue", "_coords", "_store", "_index")
 
     def __init__(self, x, y, z, id, name=None, residue=None):
         """Instantiate a new `Atom` object.
@@ -28,12 +36,113 @@ class Atom(object):
                 the residue of the Atom is required to access
                 the `charge`, `epsilon` and `radius` properties.
         """
-        self.id = id
-        self.name = name
-        self.x = x
-        self.y = y
-        self.z = z
-        self.residue = residue
+        self._id = id
+        self._name = name
+        self._residue = residue
+        self._coords = [x, y, z]
+        self._store = self._index = None
+
+    @classmethod
+    def _bound(cls, store, index, id, name, residue):
+        """Create a new `Atom` viewing the row ``index`` of ``store``.
+        """
+        atom = cls.__new__(cls)
+        atom._id, atom._name, atom._residue = id, name, residue
+        atom._coords, atom._store, atom._index = None, store, index
+        return atom
+
+    def _bind(self, store, index):
+        """Make ``self`` a view on the row ``index`` of ``store``.
+        """
+        self._coords, self._store, self._index = None, store, index
+
+    def _changed(self):
+        # Mark the stores of the atom and of its residue as stale,
+        # and return the index of the store of the residue (if any)
+        residue_store = getattr(self._residue, '_store', None)
+        for store in (self._store, residue_store):
+            if store is not None:
+                store.edited()
+        return residue_store.index if residue_store is not None else None
+
+    def _get(self, axis):
+        if self._store is None:
+            return self._coords[axis]
+        return self._store.positions.item(self._index, axis)
+
+    def _set(self, axis, value):
+        if self._store is None:
+            self._coords[axis] = value
+            self._changed()
+        else:
+            self._store.set_position(self._index, axis, value)
+
+    @property
+    def id(self):
+        """The id of the atom in the protein.
+        """
+        return self._id
+
+    @id.setter
+    def id(self, value):
+        index = self._changed()
+        if index is not None:
+            index.remove_atom(self)
+        self._id = value
+        if index is not None:
+            index.add_atom(self)
+
+    @property
+    def name(self):
+        """The name of the atom.
+        """
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._changed()
+        self._name = value
+
+    @property
+    def residue(self):
+        """The residue the atom is part of.
+        """
+        return self._residue
+
+    @residue.setter
+    def residue(self, value):
+        self._changed()
+        self._residue = value
+
+    @property
+    def x(self):
+        """The position of the atom on the x-axis.
+        """
+        return self._get(0)
+
+    @x.setter
+    def x(self, value):
+        self._set(0, value)
+
+    @property
+    def y(self):
+        """The position of the atom on the y-axis.
+        """
+        return self._get(1)
+
+    @y.setter
+    def y(self, value):
+        self._set(1, value)
+
+    @property
+    def z(self):
+        """The position of the atom on the z-axis.
+        """
+        return self._get(2)
+
+    @z.setter
+    def z(self, value):
+        self._set(2, value)
 
     def __repr__(self):
         return "Atom {}({}, {}, {})".format(self.id, self.x, self.y, self.z)
@@ -69,8 +178,13 @@ class Atom(object):
     @property
     def pos(self):
         """The position of the atom.
+
+        This is a copy of the position: use the `x`, `y` and `z`
+        attributes to move the atom.
         """
-        return numpy.array([self.x, self.y, self.z])
+        if self._store is None:
+            return numpy.array(self._coords)
+        return numpy.array(self._store.positions[self._index])
 
     @property
     def radius(self):
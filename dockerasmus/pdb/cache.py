@@ -0,0 +1,181 @@
+# coding: utf-8
+"""
+cache
+=====
+
+Caching of parsed structures, in memory and on disk.
+
+Parsed structures are cached as `dict` of column arrays (see
+`Protein._parse_pdb_atom_columns`), both in an in-process LRU cache
+and in a binary *sidecar* file written next to the original file.
+Entries are keyed by the path of the file, its modification time and
+its size; when those do not match, the SHA-1 of the file is used to
+decide whether a sidecar can still be used.
+"""
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import collections
+import functools
+import hashlib
+import os
+import warnings
+
+import numpy
+
+from ..utils.files import atomic_open
+
+
+SIDECAR_EXTENSION = ".npz"
+SIDECAR_VERSION = 2
+
+
+class LRUCache(collections.OrderedDict):
+    """A mapping that only keeps the ``maxsize`` most recently used items.
+
+    Example:
+        >>> lru = LRUCache(maxsize=2)
+        >>> lru['a'], lru['b'] = 1, 2
+        >>> _ = lru['a']
+        >>> lru['c'] = 3
+        >>> sorted(lru)
+        [u'a', u'c']
+    """
+
+    def __init__(self, maxsize=16):
+        super(LRUCache, self).__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        value = super(LRUCache, self).pop(key)
+        super(LRUCache, self).__setitem__(key, value)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self:
+            super(LRUCache, self).pop(key)
+        super(LRUCache, self).__setitem__(key, value)
+        while len(self) > max(self.maxsize, 0):
+            self.popitem(last=False)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+#: The in-process cache of parsed columns, shared by every `Protein`
+#: loaded with ``cached=True``. Set its ``maxsize`` attribute to change
+#: the number of structures kept in memory.
+CACHE = LRUCache()
+
+
+def sidecar_path(path):
+    """The path to the sidecar file of the structure file at ``path``.
+    """
+    return path + SIDECAR_EXTENSION
+
+
+def file_key(path):
+    """The key identifying the current version of the file at ``path``.
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime, stat.st_size
+
+
+def file_hash(path):
+    """The SHA-1 hexdigest of the raw content of the file at ``path``.
+    """
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(functools.partial(f.read, 1 << 20), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def load_sidecar(path, key=None):
+    """Load the columns stored in the sidecar of ``path``.
+
+    When the file was only touched (its modification time changed but
+    not its content), the metadata of the sidecar is updated, so that
+    the file is not hashed again on the next load.
+
+    Returns:
+        `dict`: the columns stored in the sidecar, or `None` if there
+        is no sidecar, or if it was created for another version of
+        the file at ``path``.
+    """
+    key = key or file_key(path)
+    try:
+        archive = numpy.load(sidecar_path(path), allow_pickle=False)
+    except (IOError, OSError, ValueError):
+        return None
+    with archive:
+        meta = {k: archive[k].item() for k in archive.files if k.startswith('__')}
+        if meta.get('__version__') != SIDECAR_VERSION:
+            return None
+        touched = (meta['__mtime__'], meta['__size__']) != key[1:]
+        if touched:
+            if meta['__size__'] != key[2] or meta['__sha1__'] != file_hash(path):
+                return None
+        columns = {k: archive[k] for k in archive.files if not k.startswith('__')}
+    if touched:
+        dump_sidecar(path, columns, key, digest=meta['__sha1__'])
+    return columns
+
+
+def dump_sidecar(path, columns, key=None, digest=None):
+    """Write ``columns`` to the sidecar of ``path``.
+
+    The sidecar is written to a temporary file first, and then moved
+    in place, so that concurrent readers never see a partial sidecar.
+    A warning is issued if the sidecar cannot be written.
+
+    Keyword Arguments:
+        key (`tuple`): the key of the file (see `file_key`).
+        digest (`str`): the SHA-1 hexdigest of the file, if already
+            known, so that the file is not read again to hash it.
+    """
+    key = key or file_key(path)
+    arrays = dict(columns)
+    arrays.update({
+        '__version__': numpy.array(SIDECAR_VERSION),
+        '__mtime__': numpy.array(key[1]),
+        '__size__': numpy.array(key[2]),
+        '__sha1__': numpy.array(digest or file_hash(path)),
+    })
+    target = sidecar_path(path)
+    try:
+        with atomic_open(target) as f:
+            numpy.savez(f, **arrays)
+    except (IOError, OSError) as err:
+        warnings.warn("Could not write {}: {}".format(target, err), UserWarning)
+
+
+def load_columns(path, parse):
+    """Load the columns of the structure at ``path`` using the caches.
+
+    Arguments:
+        path (`str`): the path to a structure file.
+        parse (callable): a function that returns the columns of the
+            structure from the raw content of the file at ``path``
+            (as `bytes`), when it is neither cached in memory nor in a
+            sidecar file. The file is read only once, to be both
+            parsed and hashed.
+
+    Returns:
+        `dict`: the columns of the structure at ``path``. The arrays
+        are shared with the cache, and are therefore read-only.
+    """
+    key = file_key(path)
+    columns = CACHE.get(key)
+    if columns is None:
+        columns = load_sidecar(path, key)
+        if columns is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            columns = parse(data)
+            dump_sidecar(path, columns, key, digest=hashlib.sha1(data).hexdigest())
+        for array in columns.values():
+            array.setflags(write=False)
+        CACHE[key] = columns
+    return columns
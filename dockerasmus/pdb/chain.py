@@ -7,30 +7,53 @@ import six
 
 from .residue import Residue
 from .atom import Atom
+from .store import StoredMapping
 
 
 
-class Chain(collections.OrderedDict):
-    __slots__ = ("id", "name")
+class Chain(StoredMapping, collections.OrderedDict):
+    __slots__ = ("id", "name", "_store")
 
     def __init__(self, id, name=None, residues=None):
+        self._store = None
         super(Chain, self).__init__(residues or [])
         self.id = id
         self.name = name
 
+    @staticmethod
+    def residue_key(res_seq, icode=''):
+        """The key of a residue in a chain.
+
+        Residues are referenced by their residue number, or by a
+        (residue number, insertion code) tuple for residues with an
+        insertion code.
+
+        Example:
+            >>> Chain.residue_key(27), Chain.residue_key(27, 'A')
+            (27, (27, u'A'))
+        """
+        return (res_seq, icode) if icode else res_seq
+
     def __contains__(self, item):
-        if isinstance(item, int):
+        if isinstance(item, (int, tuple)):
             return super(Chain, self).__contains__(item)
         elif isinstance(item, Atom):
             return any(item in res for res in self.itervalues())
         elif isinstance(item, Residue):
-            return any(item == res for res in self.itervalues())
+            res = self.get(self.residue_key(item.id, item.icode))
+            return res is item or (res is not None and res == item)
         else:
             raise TypeError(
                 "'in <Chain>' requires Residue, Atom or int"
                 " as left operand, not {}".format(type(item).__name__)
             )
 
+    def _index_item(self, index, residue):
+        index.add_residue(self.id, residue)
+
+    def _unindex_item(self, index, residue):
+        index.remove_residue(self.id, residue)
+
     @property
     def mass(self):
         """The mass of the chain.
@@ -0,0 +1,148 @@
+# coding: utf-8
+"""
+dcd
+===
+
+Memory-mapped reader for binary DCD trajectories (CHARMM / NAMD / X-PLOR).
+
+A DCD file is made of Fortran unformatted records: a header with the
+number of frames and atoms, followed by one block per frame with an
+optional unit cell record and the X, Y and Z coordinates records, each
+record being enclosed by its size as a 32-bit integer. Since every
+frame block has the same size, the coordinates of every frame can be
+exposed as a strided view over the memory-mapped file, without reading
+or copying any frame.
+"""
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import division
+
+import struct
+
+import numpy
+import six
+
+from .protein import Protein
+
+
+class DCDTrajectory(object):
+    """A DCD trajectory bound to a topology `Protein`.
+
+    Atoms of the trajectory must be in the order of the atoms of the
+    topology, as returned by `Protein.iteratoms`.
+
+    Attributes:
+        topology (`Protein`): the protein the trajectory is a
+            trajectory of.
+        frames (`numpy.ndarray`): a read-only array of shape
+            (n_frames, n_atoms, 3) with the positions of each atom in
+            each frame, as a view over the memory-mapped file.
+        unit_cells (`numpy.ndarray`): a read-only array of shape
+            (n_frames, 6) with the unit cell of each frame, or `None`
+            if the trajectory has no unit cell information.
+        timestep (`float`): the time between two integration steps.
+        interval (`int`): the number of integration steps between
+            two frames.
+    """
+
+    def __init__(self, path, topology):
+        """Open the DCD trajectory at ``path``.
+
+        Arguments:
+            path (`str`): the path to a DCD file.
+            topology (`Protein`): the protein the trajectory is a
+                trajectory of.
+
+        Raises:
+            ValueError: when the file is not a valid DCD file, when it
+                has fixed atoms or 4D coordinates (not supported), or
+                when it does not have as many atoms as ``topology``.
+        """
+        self.path = path
+        self.topology = topology
+        mmap = numpy.memmap(path, dtype=numpy.uint8, mode='r')
+
+        # Find the byte order from the size of the first record
+        for order in '<>':
+            if numpy.frombuffer(mmap[:4].tobytes(), dtype=order + 'i4')[0] == 84:
+                break
+        else:
+            raise ValueError("Not a DCD file: {}".format(path))
+        int32 = numpy.dtype(order + 'i4')
+
+        def record(offset):
+            # Return the content and the end offset of a Fortran record
+            size = int(numpy.frombuffer(mmap[offset:offset+4].tobytes(), dtype=int32)[0])
+            end = offset + 4 + size + 4
+            if end > len(mmap):
+                raise ValueError("Truncated DCD file: {}".format(path))
+            return mmap[offset+4:offset+4+size].tobytes(), end
+
+        header, offset = record(0)
+        fields = struct.unpack(str(order + "4s9if10i"), header)
+        magic, control = fields[0], fields[1:]
+        if magic != b"CORD":
+            raise ValueError("Not a DCD file: {}".format(path))
+        charmm = control[19] != 0
+        if control[8]:
+            raise ValueError("DCD files with fixed atoms are not supported")
+        if charmm and control[11]:
+            raise ValueError("DCD files with 4D coordinates are not supported")
+        has_cell = charmm and control[10] != 0
+        self.interval = control[2]
+        self.timestep = control[9]
+
+        _, offset = record(offset)  # title record
+        natom, offset = record(offset)
+        n_atoms = int(numpy.frombuffer(natom, dtype=int32)[0])
+
+        n_topology = len(topology.atom_positions())
+        if n_atoms != n_topology:
+            raise ValueError("Trajectory has {} atoms, topology has {}".format(
+                n_atoms, n_topology))
+
+        float32 = numpy.dtype(order + 'f4')
+        coords_size = 4 + 4 * n_atoms + 4
+        cell_size = 4 + 48 + 4 if has_cell else 0
+        frame_size = cell_size + 3 * coords_size
+        n_frames = (len(mmap) - offset) // frame_size
+
+        # Frame i, atom j, axis k is at:
+        #   offset + i*frame_size + cell_size + k*coords_size + 4 + j*4
+        self.frames = numpy.ndarray(
+            shape=(n_frames, n_atoms, 3), dtype=float32, buffer=mmap,
+            offset=offset + cell_size + 4,
+            strides=(frame_size, 4, coords_size),
+        )
+        self.unit_cells = numpy.ndarray(
+            shape=(n_frames, 6), dtype=numpy.dtype(order + 'f8'), buffer=mmap,
+            offset=offset + 4, strides=(frame_size, 8),
+        ) if has_cell else None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        """Return the frame at ``index`` as a `Protein`.
+
+        The frame shares the topology arrays of the topology, and its
+        atoms are views on the coordinates of the frame in the
+        memory-mapped file (`Protein.atom_positions` returns them
+        without copy). Moving an atom of the frame copies its
+        coordinates first, and never modifies the file.
+        """
+        return self.topology._with_positions(self.frames[index])
+
+    def __iter__(self):
+        """Yield each frame as a `Protein` (see `DCDTrajectory.__getitem__`).
+        """
+        for index in six.moves.range(len(self)):
+            yield self[index]
+
+    def to_protein(self, index):
+        """Return the frame at ``index`` as a new, independent `Protein`.
+        """
+        columns = self.topology._to_columns()
+        columns['positions'] = self.frames[index].astype(float)
+        return Protein._from_columns(columns)
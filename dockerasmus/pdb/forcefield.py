@@ -0,0 +1,129 @@
+# coding: utf-8
+"""
+forcefield
+==========
+
+The per-atom parameters of the force field, compiled into arrays.
+
+`Atom.charge`, `Atom.pwd` and `Atom.radius` read the parameters of a
+single atom from the nested dictionaries of `dockerasmus.constants`.
+To get the parameters of every atom of a protein, those dictionaries
+are compiled once into a `ParameterTable`, indexed by integer codes of
+the residue types and atom names, and the parameters are read from the
+`AtomStore` of the protein with a single gather.
+"""
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import collections
+
+import numpy
+import six
+
+from .. import constants
+from .residue import Residue
+
+
+class ParameterTable(object):
+    """Per-atom parameters indexed by residue type and atom name codes.
+
+    Attributes:
+        keys (`tuple`): the name of each parameter.
+        residue_codes (`dict`): the code of each residue type.
+        atom_codes (`dict`): the code of each atom name.
+        values (`numpy.ndarray`): an array of shape (n_residue_types + 1,
+            n_atom_names + 1, n_parameters) with the parameters of each
+            atom name in each residue type. The last row and column are
+            filled with NaN, and are used for unknown residue types and
+            atom names (code -1).
+
+    Example:
+        >>> table = ParameterTable({'radius': {'GLY': {'CA': 1.908}}})
+        >>> table.values[table.residue_codes['GLY'], table.atom_codes['CA']]
+        array([ 1.908])
+    """
+
+    __slots__ = ("keys", "residue_codes", "atom_codes", "values")
+
+    def __init__(self, tables):
+        self.keys = tuple(tables)
+        residues = sorted({r for table in tables.values() for r in table})
+        atoms = sorted({
+            atom for table in tables.values()
+                for parameters in table.values()
+                    for atom in parameters
+        })
+        self.residue_codes = {name: code for code, name in enumerate(residues)}
+        self.atom_codes = {name: code for code, name in enumerate(atoms)}
+        self.values = numpy.full((len(residues)+1, len(atoms)+1, len(self.keys)), numpy.nan)
+        for axis, key in enumerate(self.keys):
+            for residue, parameters in six.iteritems(tables[key]):
+                for atom, value in six.iteritems(parameters):
+                    self.values[self.residue_codes[residue], self.atom_codes[atom], axis] = value
+
+    @staticmethod
+    def _encode(names, codes):
+        # Encode each name of ``names`` with a lookup per distinct name
+        unique, inverse = numpy.unique(names, return_inverse=True)
+        unique_codes = [codes.get(name, -1) for name in unique.tolist()]
+        return numpy.array(unique_codes, dtype=numpy.intp)[inverse]
+
+    def _residue_codes(self, store):
+        """Return the residue type code and terminus code of each atom.
+
+        The type of a residue is given by its name (histidines are
+        typed as HID or HIE depending on their protonation, like in
+        `Residue.name`), and its terminus code is the code of the NTER
+        or CTER types if the residue has terminal atoms, or -1.
+        """
+        columns, offsets = store.columns, store.residue_offsets()
+        names = columns['name']
+
+        def residue_has(atom_names):
+            found = numpy.isin(names, list(atom_names))
+            return numpy.repeat(
+                numpy.logical_or.reduceat(found, offsets[:-1]), numpy.diff(offsets))
+
+        codes = self._encode(columns['resName'], self.residue_codes)
+        his = columns['resName'] == 'HIS'
+        if his.any():
+            protonated = residue_has({"HD1"})
+            codes[his & protonated] = self.residue_codes.get('HID', -1)
+            codes[his & ~protonated] = self.residue_codes.get('HIE', -1)
+
+        terminus = numpy.full(len(names), -1, dtype=numpy.intp)
+        terminus[residue_has(Residue.CTER_ATOMS)] = self.residue_codes.get('CTER', -1)
+        terminus[residue_has(Residue.NTER_ATOMS)] = self.residue_codes.get('NTER', -1)
+        return codes, terminus
+
+    def gather(self, store):
+        """Return the parameters of each atom of an `AtomStore`.
+
+        Arguments:
+            store (`AtomStore`): the atoms of a protein.
+
+        Returns:
+            `collections.OrderedDict`: a vector with the parameters of
+            each atom for each key of the table. The parameters of
+            atoms not found in the table are NaN.
+        """
+        if not len(store):
+            return collections.OrderedDict((key, numpy.zeros(0)) for key in self.keys)
+        codes, terminus = self._residue_codes(store)
+        atoms = self._encode(store.columns['name'], self.atom_codes)
+        values = self.values[codes, atoms]
+        missing = numpy.isnan(values)
+        values[missing] = self.values[terminus, atoms][missing]
+        return collections.OrderedDict(
+            (key, values[:, axis].copy()) for axis, key in enumerate(self.keys)
+        )
+
+
+#: The charges, potential well depths and Van der Waals radii of the
+#: atoms of the amino acids (see `Atom.charge`, `Atom.pwd`, `Atom.radius`).
+AMINOACID_PARAMETERS = ParameterTable(collections.OrderedDict([
+    ('charges', constants.AMINOACID_CHARGES),
+    ('pwd', constants.AMINOACID_POTENTIAL_WELL_DEPTH),
+    ('radius', constants.AMINOACID_RADIUS),
+]))
@@ -6,18 +6,22 @@ import six
 import numpy
 
 from .atom import Atom
+from .store import StoredMapping
 
 
-class Residue(dict):
-    __slots__ = ("id", "_name")
+class Residue(StoredMapping, dict):
+    __slots__ = ("id", "_name", "icode", "_store")
 
+    BACKBONE_ATOMS = frozenset({"N", "CA", "C", "O"})
     CTER_ATOMS = frozenset({"OXT"})
     NTER_ATOMS = frozenset({"H1", "H2", "H3"})
 
-    def __init__(self, id, name=None, atoms=None):
+    def __init__(self, id, name=None, atoms=None, icode=''):
+        self._store = None
         super(Residue, self).__init__(atoms or {})
         self.id = id
         self._name = name
+        self.icode = icode
 
     def __contains__(self, item):
         """Check if `item` is contained in the residue.
@@ -25,10 +29,17 @@ class Residue(dict):
         Arguments:
             item: either an atom_id (`int`) or an `Atom` object
                 to check if present within the residue.
+
+        Note:
+            An `Atom` is looked up by name first, and only compared
+            to the other atoms of the residue if it is not found.
         """
         if isinstance(item, six.text_type):
             return super(Residue, self).__contains__(item)
         elif isinstance(item, Atom):
+            atom = self.get(item.name)
+            if atom is item or (atom is not None and atom == item):
+                return True
             return any(item == atom for atom in self.itervalues())
         elif isinstance(item, int):
             return any(item == atom.id for atom in self.itervalues())
@@ -40,6 +51,12 @@ class Residue(dict):
                     six.text_type.__name__,type(item).__name__)
             )
 
+    def _index_item(self, index, atom):
+        index.add_atom(atom)
+
+    def _unindex_item(self, index, atom):
+        index.remove_atom(atom)
+
     def __hash__(self):
         return hash(hash(frozenset(self)) + hash(self.id) + hash(self.name))
 
@@ -0,0 +1,464 @@
+# coding: utf-8
+"""
+store
+=====
+
+Contiguous storage of the atoms of a `Protein`.
+
+Proteins created from column arrays (by the PDB and mmCIF parsers, the
+cache, the decoy archives or the DCD trajectories) keep their atoms in
+an `AtomStore`, and their `Atom` objects are views on the rows of the
+store: the coordinates of an atom are read from and written to the
+``positions`` array of the store, so that `Protein.atom_positions` can
+return that array without copying it.
+
+The store of a protein also holds an `AtomIndex`, to find its atoms and
+residues in constant time. The chains and residues of the protein keep
+a reference to the store, so that inserting or deleting any of their
+items updates the index, and marks the arrays of the store as stale.
+"""
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import numpy
+import six
+
+from ..utils import matrices
+
+
+class AtomStore(object):
+    """The atoms of a protein, as contiguous column arrays.
+
+    Rows are ordered as in `Protein.iteratoms`.
+
+    Attributes:
+        columns (`dict`): the topology columns of the atoms (see
+            `Protein._parse_pdb_atom_columns`), without ``positions``.
+        positions (`numpy.ndarray`): an array of shape (n_atoms, 3) with
+            the position of each atom. A read-only array is copied the
+            first time an atom is moved (*copy-on-write*).
+        cache (`dict`): vectors computed from the topology only (such
+            as the charge of each atom), shared by every store with
+            the same ``columns``.
+        geometry (`dict`): values computed from the positions (such as
+            the mass center of the protein), cleared when an atom of
+            the store is moved.
+        version (`int`): the number of times atoms of the store
+            were moved.
+        edits (`int`): the number of changes of the chains, residues
+            or atoms tracked by the store.
+        stale (`bool`): whether the chains, residues or atoms of the
+            protein changed since the store was created, in which case
+            the store must be rebuilt from the `Atom` objects.
+        retired (`bool`): whether the store was replaced by a new store
+            of its protein (the atoms bound to the store are then bound
+            to the new store).
+        index (`AtomIndex`): the index of the atoms and residues of
+            the protein, or `None` if it was not built yet.
+        sources (`tuple`): the other stores the atoms of the protein are
+            bound to (the stores of a parent protein, or of proteins
+            sharing chains with the protein), with their version when
+            the positions of ``self`` were read from them.
+        owners (`tuple`): the other stores tracking the changes of the
+            chains and residues of the protein (the stores of proteins
+            sharing chains with the protein), with their number of
+            `edits` when ``self`` was built.
+        base (`AtomStore`): the store all the atoms of the protein are
+            bound to, if any, in which case ``rows`` are the rows of the
+            atoms in ``base`` (see `AtomStore.take`).
+        shared (`bool`): whether ``positions`` is writable but shared
+            with copies of the store (see `AtomStore.copy`), in which
+            case the store copies it before writing to it or returning
+            it from `AtomStore.writable_positions`.
+    """
+
+    __slots__ = (
+        "columns", "positions", "cache", "geometry", "version", "edits",
+        "stale", "retired", "index", "sources", "owners", "base", "rows", "shared",
+    )
+
+    #: The cached vectors with a value per atom, concatenated by
+    #: `AtomStore.concatenate`.
+    _ATOM_VECTORS = ('charges', 'pwd', 'radius', 'masses')
+
+    #: The cached CSR offsets, concatenated by `AtomStore.concatenate`.
+    _OFFSETS = ('residue_offsets', 'chain_offsets')
+
+    #: The columns not every store has, with the value of atoms without one.
+    _OPTIONAL_COLUMNS = {'occupancy': 1.0, 'tempFactor': 0.0}
+
+    def __init__(self, columns, positions=None, cache=None):
+        self.columns = {k: v for k, v in columns.items() if k != 'positions'}
+        self.positions = columns['positions'] if positions is None else positions
+        self.cache = {} if cache is None else cache
+        self.geometry = {}
+        self.version = self.edits = 0
+        self.stale = self.retired = False
+        self.index = None
+        self.sources = self.owners = ()
+        self.base = self.rows = None
+        self.shared = False
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _offsets(self, key, columns):
+        # Compute the offsets of the runs of rows with equal ``columns``
+        offsets = self.cache.get(key)
+        if offsets is None:
+            new = numpy.ones(len(self), dtype=bool)
+            new[1:] = False
+            for column in (self.columns[name] for name in columns):
+                new[1:] |= column[1:] != column[:-1]
+            offsets = numpy.append(numpy.flatnonzero(new), len(self))
+            self.cache[key] = offsets
+        return offsets
+
+    def residue_offsets(self):
+        """Return the offsets of the residues of the store.
+
+        The atoms of the residue ``i`` are the rows ``offsets[i]`` to
+        ``offsets[i+1]`` of the store (like the row pointers of a CSR
+        matrix), with residues ordered as in `Protein.iteratoms`.
+        """
+        return self._offsets('residue_offsets', ('chainID', 'resSeq', 'iCode'))
+
+    def chain_offsets(self):
+        """Return the offsets of the chains of the store.
+
+        See Also:
+            `AtomStore.residue_offsets`
+        """
+        return self._offsets('chain_offsets', ('chainID',))
+
+    def with_positions(self, positions):
+        """Return a store with the topology of ``self`` and other positions.
+        """
+        return type(self)(self.columns, positions, self.cache)
+
+    def copy(self):
+        """Return a store sharing the positions of ``self`` copy-on-write.
+
+        The copy gets a read-only view on the positions, which it copies
+        the first time one of its atoms is moved. The positions of
+        ``self`` stay writable, but are marked as `shared`, so that
+        ``self`` copies them before moving an atom or returning them
+        from `AtomStore.writable_positions`. The positions of a store
+        taken from another store are copied right away, since they are
+        a view on the positions of its base.
+        """
+        if self.base is not None:
+            return self.with_positions(numpy.array(self.positions, dtype=float))
+        if not self.positions.flags.writeable:
+            return self.with_positions(self.positions)
+        positions = self.positions.view()
+        positions.flags.writeable = False
+        self.shared = True
+        return self.with_positions(positions)
+
+    def _own_positions(self):
+        # Copy the positions if they are shared or read-only, before
+        # writing to them
+        if self.shared or not self.positions.flags.writeable:
+            self.positions = numpy.array(self.positions, dtype=float)
+            self.shared = False
+
+    def writable_positions(self):
+        """Return the positions, first copying them if they are `shared`.
+
+        Writing to the returned array never changes the positions of
+        a copy of the store made before the call. Read-only positions
+        (such as the positions of a cached structure) are returned
+        as-is.
+        """
+        if self.shared:
+            self._own_positions()
+        return self.positions
+
+    @classmethod
+    def concatenate(cls, stores):
+        """Return a store with the atoms of each store of ``stores``, in order.
+
+        The per-atom vectors and the offsets cached by every store of
+        ``stores`` are concatenated as well, so that they do not have
+        to be computed again.
+        """
+        keys = set(stores[0].columns).union(*(
+            set(store.columns).intersection(cls._OPTIONAL_COLUMNS) for store in stores))
+        columns = {
+            key: numpy.concatenate([cls._column(store, key) for store in stores])
+                for key in keys
+        }
+        positions = numpy.concatenate([store.positions for store in stores])
+        cached = set.intersection(*(set(store.cache) for store in stores))
+        cache = {
+            key: numpy.concatenate([store.cache[key] for store in stores])
+                for key in cached.intersection(cls._ATOM_VECTORS)
+        }
+        starts = numpy.cumsum([0] + [len(store) for store in stores])
+        for key in cached.intersection(cls._OFFSETS):
+            cache[key] = numpy.concatenate([stores[0].cache[key][:1]] + [
+                store.cache[key][1:] + start for store, start in zip(stores, starts)
+            ])
+        return cls(columns, positions, cache)
+
+    @classmethod
+    def _column(cls, store, key):
+        # Return a column of ``store``, filling a missing optional column
+        if key in store.columns or key not in cls._OPTIONAL_COLUMNS:
+            return store.columns[key]
+        return numpy.full(len(store), cls._OPTIONAL_COLUMNS[key])
+
+    def _gather(self, rows):
+        # Return the positions of ``rows``, as a view if they are contiguous
+        if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+            return self.positions[rows[0]:rows[-1]+1]
+        return self.positions[rows].reshape(len(rows), 3)
+
+    def take(self, rows):
+        """Return a store with the given rows of ``self``.
+
+        The atoms of the new store are bound to the rows of ``self``
+        (or of the `base` of ``self``): moving one of them moves the
+        atom of ``self``, and the positions of the new store are read
+        again from ``self`` when an atom of ``self`` is moved.
+
+        Arguments:
+            rows (`numpy.ndarray`): the indices of the rows to take,
+                in increasing order.
+        """
+        rows = numpy.asarray(rows, dtype=numpy.intp)
+        base = self if self.base is None else self.base
+        base_rows = rows if self.base is None else self.rows[rows]
+        columns = {key: column[rows] for key, column in six.iteritems(self.columns)}
+        cache = {
+            key: self.cache[key][rows]
+                for key in self._ATOM_VECTORS if key in self.cache
+        }
+        store = type(self)(columns, base._gather(base_rows), cache)
+        store.base, store.rows = base, base_rows
+        store.sources = ((base, base.version),)
+        return store
+
+    def outdated(self):
+        """Check whether atoms were moved in the ``sources`` of ``self``.
+        """
+        return any(s.retired or s.version != v for s, v in self.sources)
+
+    def edited(self):
+        """Mark the store as stale after a change of its chains, residues or atoms.
+        """
+        self.stale = True
+        self.edits += 1
+
+    def needs_rebuild(self):
+        """Check whether the store must be rebuilt from the `Atom` objects.
+
+        This is the case when the store is stale, or when chains or
+        residues shared with another protein (and tracked by the store
+        of that protein, one of the ``owners`` of ``self``) changed
+        since ``self`` was built.
+        """
+        return self.stale or any(s.retired or s.edits != e for s, e in self.owners)
+
+    def refresh(self):
+        """Read the positions of the atoms from the `base` of ``self`` again.
+        """
+        self.positions = self.base._gather(self.rows)
+        self.sources = ((self.base, self.base.version),)
+        self.moved()
+
+    def moved(self):
+        """Clear the values computed from the positions of the store.
+
+        Called when an atom is moved: code writing to ``positions``
+        directly must call it as well.
+        """
+        self.version += 1
+        self.geometry.clear()
+
+    def set_position(self, index, axis, value):
+        """Set the coordinate of an atom on an axis.
+        """
+        self._own_positions()
+        self.positions[index, axis] = value
+        self.moved()
+
+    def transform(self, matrix, rows=None):
+        """Apply a 4x4 transformation matrix to the positions of atoms.
+
+        Like `set_position`, read-only or `shared` positions are
+        replaced and not written to. The atoms of a store taken from another
+        store are moved in its `base`, since they are bound to it.
+
+        Arguments:
+            matrix (`numpy.ndarray`): a 4x4 affine transformation matrix.
+
+        Keyword Arguments:
+            rows (`numpy.ndarray`, optional): the rows of the atoms to
+                move, or `None` to move every atom.
+        """
+        if self.base is not None:
+            self.base.transform(matrix, self.rows if rows is None else self.rows[rows])
+            return self.refresh()
+        if rows is None:
+            moved = matrices.apply_transform(self.positions, matrix)
+            if self.positions.flags.writeable and not self.shared:
+                self.positions[...] = moved
+            else:
+                self.positions, self.shared = moved, False
+        else:
+            self._own_positions()
+            self.positions[rows] = matrices.apply_transform(self.positions[rows], matrix)
+        self.moved()
+
+
+class AtomIndex(object):
+    """Hash indexes of the atoms and residues of a protein.
+
+    Attributes:
+        store (`AtomStore`): the store of the protein.
+        atoms (`dict`): the atoms of the protein, by serial number.
+        residues (`dict`): the residues of the protein, by chain id,
+            residue number and insertion code.
+        exact (`bool`): whether the index is known to reference every
+            atom and residue of the protein exactly once. When it is
+            not (duplicate serial numbers, or chains and residues shared
+            with another protein), lookups missing the index must fall
+            back to a linear scan.
+    """
+
+    __slots__ = ("store", "atoms", "residues", "exact")
+
+    def __init__(self, store):
+        self.store = store
+        self.atoms = {}
+        self.residues = {}
+        self.exact = True
+
+    def _claim(self, mapping):
+        # Make the changes of ``mapping`` update the index
+        if mapping._store is None:
+            mapping._store = self.store
+        elif mapping._store is not self.store:
+            self.exact = False
+
+    def _release(self, mapping):
+        if mapping._store is self.store:
+            mapping._store = None
+
+    def add_atom(self, atom):
+        if self.atoms.setdefault(atom.id, atom) is not atom:
+            self.exact = False
+
+    def remove_atom(self, atom):
+        if self.atoms.get(atom.id) is atom:
+            del self.atoms[atom.id]
+
+    def add_residue(self, chain_id, residue):
+        self._claim(residue)
+        key = (chain_id, residue.id, residue.icode)
+        if self.residues.setdefault(key, residue) is not residue:
+            self.exact = False
+        for atom in dict.values(residue):
+            self.add_atom(atom)
+
+    def remove_residue(self, chain_id, residue):
+        self._release(residue)
+        key = (chain_id, residue.id, residue.icode)
+        if self.residues.get(key) is residue:
+            del self.residues[key]
+        for atom in dict.values(residue):
+            self.remove_atom(atom)
+
+    def add_chain(self, chain):
+        self._claim(chain)
+        for residue in dict.values(chain):
+            self.add_residue(chain.id, residue)
+
+    def remove_chain(self, chain):
+        self._release(chain)
+        for residue in dict.values(chain):
+            self.remove_residue(chain.id, residue)
+
+
+class StoredMapping(object):
+    """A mixin for the mappings of the object model of a protein.
+
+    Every change of the mapping marks its ``_store`` (if any) as stale,
+    since the atoms of the store no longer match the atoms of the
+    protein, and updates the index of the store with the inserted and
+    deleted items (see `_index_item` and `_unindex_item`).
+    """
+
+    __slots__ = ()
+
+    def _before_change(self):
+        # Mark the store as stale, and return its index (if any). The
+        # slot is not set yet when pickle restores the items of a mapping
+        store = getattr(self, '_store', None)
+        if store is not None:
+            store.edited()
+            return store.index
+
+    def _index_item(self, index, value):
+        """Add ``value``, inserted in the mapping, to the `AtomIndex` ``index``.
+
+        Subclasses override this hook to add their items (and the items
+        of their items) to the index: it does nothing by default.
+        """
+
+    def _unindex_item(self, index, value):
+        """Remove ``value``, deleted from the mapping, from the `AtomIndex` ``index``.
+
+        Subclasses override this hook like `_index_item`: it does
+        nothing by default.
+        """
+
+    def __setitem__(self, key, value):
+        index = self._before_change()
+        if index is not None:
+            if dict.__contains__(self, key):
+                self._unindex_item(index, dict.__getitem__(self, key))
+            self._index_item(index, value)
+        super(StoredMapping, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        index = self._before_change()
+        if index is not None and dict.__contains__(self, key):
+            self._unindex_item(index, dict.__getitem__(self, key))
+        super(StoredMapping, self).__delitem__(key)
+
+    def pop(self, key, *default):
+        index = self._before_change()
+        if index is not None and dict.__contains__(self, key):
+            self._unindex_item(index, dict.__getitem__(self, key))
+        return super(StoredMapping, self).pop(key, *default)
+
+    def popitem(self, *args):
+        index = self._before_change()
+        item = super(StoredMapping, self).popitem(*args)
+        if index is not None:
+            self._unindex_item(index, item[1])
+        return item
+
+    def clear(self):
+        index = self._before_change()
+        if index is not None:
+            for value in list(dict.values(self)):
+                self._unindex_item(index, value)
+        super(StoredMapping, self).clear()
+
+    def setdefault(self, key, default=None):
+        if not dict.__contains__(self, key):
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(*args, **kwargs):
+        self, other = args[0], args[1] if len(args) > 1 else ()
+        items = other.items() if hasattr(other, 'keys') else other
+        for key, value in items:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
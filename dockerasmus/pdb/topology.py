@@ -0,0 +1,151 @@
+# coding: utf-8
+"""
+topology
+========
+
+The covalent bonds between the atoms of a protein.
+
+PDB files do not record the bonds of standard residues, so they are
+inferred from the positions of the atoms: two atoms are bonded when
+they are closer than the sum of their covalent radii (see
+`dockerasmus.constants.ATOMIC_COVALENT_RADIUS`), plus a tolerance.
+Close atoms are found with a `CellList`, so that the bonds of a protein
+are found in linear time, and stored as index arrays in a `BondGraph`.
+"""
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import numpy
+
+from .. import constants
+from ..utils import grid
+
+
+def _segments(starts, counts):
+    # Return the owner and the index of every item of the segments
+    # ``[starts[k], starts[k] + counts[k])``, concatenated
+    owners = numpy.repeat(numpy.arange(len(starts)), counts)
+    shift = numpy.repeat(starts - (numpy.cumsum(counts) - counts), counts)
+    return owners, shift + numpy.arange(counts.sum(), dtype=numpy.intp)
+
+
+def nearest_in_segments(rows, starts, counts, candidates, positions):
+    """Find the candidate nearest to each row, in a segment of rows.
+
+    Arguments:
+        rows (`numpy.ndarray`): the rows to find a neighbor for.
+        starts (`numpy.ndarray`): the start of the segment of each row,
+            as an index in ``candidates``.
+        counts (`numpy.ndarray`): the length of the segment of each row.
+        candidates (`numpy.ndarray`): the candidate rows, in segments.
+        positions (`numpy.ndarray`): the position of every row.
+
+    Returns:
+        `numpy.ndarray`: the candidate nearest to each row (the first
+        one on ties), or -1 when the segment of a row is empty.
+    """
+    owners, items = _segments(numpy.asarray(starts), numpy.asarray(counts))
+    found = candidates[items]
+    distances = ((positions[found] - positions[rows][owners])**2).sum(axis=1)
+    order = numpy.lexsort((distances, owners))
+    owners, found = owners[order], found[order]
+    unique, first = numpy.unique(owners, return_index=True)
+    nearest = numpy.full(len(rows), -1, dtype=numpy.intp)
+    nearest[unique] = found[first]
+    return nearest
+
+
+class BondGraph(object):
+    """The covalent bonds between atoms, as an adjacency list.
+
+    Attributes:
+        bonds (`numpy.ndarray`): an array of shape (n_bonds, 2) with the
+            rows ``(i, j)`` of each couple of bonded atoms, where
+            ``i < j``, sorted by ``i`` then ``j``.
+        offsets (`numpy.ndarray`): the neighbors of the atom ``i`` are
+            ``neighbors[offsets[i]:offsets[i+1]]`` (like the row
+            pointers of a CSR matrix).
+        neighbors (`numpy.ndarray`): the bonded neighbors of each atom,
+            in increasing order.
+
+    Example:
+        >>> positions = numpy.array([ (0, 0, 0), (1.3, 0, 0), (2.5, 0, 0) ])
+        >>> graph = BondGraph(['N', 'C', 'O'], positions)
+        >>> graph.bonds.tolist()
+        [[0, 1], [1, 2]]
+        >>> graph.neighbors_of(1).tolist()
+        [0, 2]
+    """
+
+    __slots__ = ("bonds", "offsets", "neighbors")
+
+    def __init__(self, elements, positions, tolerance=0.45):
+        """Infer the bonds between atoms from their positions.
+
+        Arguments:
+            elements (`numpy.ndarray`): the element of each atom. Atoms
+                of elements without a covalent radius are not bonded.
+            positions (`numpy.ndarray`): the position of each atom, as
+                an array of shape (n, 3).
+
+        Keyword Arguments:
+            tolerance (`float`): the distance allowed over the sum of
+                the covalent radii of two bonded atoms.
+        """
+        positions = numpy.asarray(positions, dtype=float).reshape(-1, 3)
+        unique, inverse = numpy.unique(numpy.asarray(elements), return_inverse=True)
+        unique_radii = [
+            constants.ATOMIC_COVALENT_RADIUS.get(e, numpy.nan) for e in unique.tolist()]
+        radii = numpy.array(unique_radii, dtype=float)[inverse.ravel()]
+
+        empty = numpy.zeros(0, dtype=numpy.intp)
+        i = j = empty
+        if numpy.isfinite(radii).any():
+            cutoff = 2 * numpy.nanmax(radii) + tolerance
+            i, j, d = grid.CellList(positions, cutoff).pairs(positions, cutoff)
+            with numpy.errstate(invalid='ignore'):
+                bonded = (i < j) & (d < radii[i] + radii[j] + tolerance)
+            i, j = i[bonded], j[bonded]
+
+        self.bonds = numpy.stack([i, j], axis=1)
+        sources, targets = numpy.concatenate([i, j]), numpy.concatenate([j, i])
+        self.neighbors = targets[numpy.lexsort((targets, sources))]
+        counts = numpy.bincount(sources, minlength=len(positions))
+        self.offsets = numpy.append(0, numpy.cumsum(counts))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def degrees(self):
+        """Return the number of bonds of each atom.
+        """
+        return numpy.diff(self.offsets)
+
+    def neighbors_of(self, row):
+        """Return the rows of the atoms bonded to the atom ``row``.
+        """
+        return self.neighbors[self.offsets[row]:self.offsets[row+1]]
+
+    def nearest_neighbors(self, rows, candidates, positions):
+        """Find the nearest candidate bonded to each atom of ``rows``.
+
+        Arguments:
+            rows (`numpy.ndarray`): the rows of the atoms.
+            candidates (`numpy.ndarray`): a boolean vector with an
+                element per atom, selecting the candidate neighbors.
+            positions (`numpy.ndarray`): the position of each atom.
+
+        Returns:
+            `numpy.ndarray`: the row of the nearest candidate bonded to
+            each atom of ``rows``, or -1 if it has none.
+        """
+        rows = numpy.asarray(rows, dtype=numpy.intp)
+        starts, counts = self.offsets[rows], numpy.diff(self.offsets)[rows]
+        owners, items = _segments(starts, counts)
+        # Drop the neighbors which are not candidates from the segments
+        kept = candidates[self.neighbors[items]]
+        counts = numpy.bincount(owners[kept], minlength=len(rows))
+        return nearest_in_segments(
+            rows, numpy.cumsum(counts) - counts, counts,
+            self.neighbors[items[kept]], positions)
@@ -0,0 +1,143 @@
+# coding: utf-8
+"""
+pose
+====
+
+Rigid-body poses of a molecule, scored without creating new atoms.
+
+A `Pose` pairs a template molecule (a `dockerasmus.pdb.Protein` or a
+`dockerasmus.ligand.Ligand`) with a 4x4 transformation matrix, and
+implements the methods of the template used by the scoring
+requirements: the positions of the atoms are transformed on demand,
+and every other vector (charges, radii, potential well depths, ...)
+is read from the template, so that it is shared by all the poses of a
+template. A `Pose` can therefore be passed to a `ScoringFunction` in
+place of the transformed molecule.
+"""
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import numpy
+
+from .utils.matrices import apply_transform
+
+
+class Pose(object):
+    """A template molecule moved by a rigid-body transform.
+
+    Attributes:
+        template (`Protein` or `Ligand`): the molecule in its
+            original position.
+        transform (`numpy.ndarray`): the read-only 4x4 transformation
+            matrix of the pose (see `dockerasmus.spatial`).
+
+    Example:
+        >>> from dockerasmus.spatial import TranslationMatrix
+        >>> pose = Pose(barstar, TranslationMatrix(dx=2))
+        >>> (pose.atom_positions() - barstar.atom_positions())[0].tolist()
+        [2.0, 0.0, 0.0]
+        >>> pose.atom_charges() is barstar.atom_charges()
+        True
+    """
+
+    __slots__ = ("template", "transform", "_positions", "_key")
+
+    def __init__(self, template, transform=None):
+        """Create a new pose of ``template``.
+
+        Arguments:
+            template (`Protein` or `Ligand`): the molecule to move.
+
+        Keyword Arguments:
+            transform (`numpy.ndarray`, optional): the 4x4 transformation
+                matrix of the pose, or `None` for the identity.
+
+        Raises:
+            ValueError: when ``transform`` is not a 4x4 matrix.
+        """
+        transform = numpy.identity(4) if transform is None \
+               else numpy.array(transform, dtype=float)
+        if transform.shape != (4, 4):
+            raise ValueError("Invalid transform shape: {}".format(transform.shape))
+        transform.flags.writeable = False
+        self.template = template
+        self.transform = transform
+        self._positions = self._key = None
+
+    def __len__(self):
+        return len(self.template.atom_positions())
+
+    def __repr__(self):
+        return "Pose({!r})".format(self.template)
+
+    def _template_key(self):
+        # Identify the positions of a template protein, to know whether
+        # its atoms were moved since the positions of the pose were cached
+        atom_store = getattr(self.template, '_atom_store', None)
+        if atom_store is not None:
+            store = atom_store()
+            return store, store.version
+
+    def atom_positions(self):
+        """The matrix of the positions of each atom of the pose.
+
+        The positions of a pose of a `Protein` are cached until an atom
+        of the template is moved, and are read-only.
+        """
+        key = self._template_key()
+        if key is None:
+            return apply_transform(self.template.atom_positions(), self.transform)
+        if self._key is None or self._key[0] is not key[0] or self._key[1] != key[1]:
+            self._positions = apply_transform(self.template.atom_positions(), self.transform)
+            self._positions.flags.writeable = False
+            self._key = key
+        return self._positions
+
+    def atom_charges(self):
+        """The vector of the charge of each atom of the template.
+        """
+        return self.template.atom_charges()
+
+    def atom_pwd(self):
+        """The vector of the potential well depth of each atom of the template.
+        """
+        return self.template.atom_pwd()
+
+    def atom_radius(self):
+        """The vector of the Van der Waals radius of each atom of the template.
+        """
+        return self.template.atom_radius()
+
+    def carbonyl_pairs(self):
+        """The oxygen and carbon atoms of the template (see `Protein.carbonyl_pairs`).
+
+        A rigid-body transform does not change the bonds of the
+        template, so the pairs of the template are valid for the pose.
+        """
+        return self.template.carbonyl_pairs()
+
+    def nitrogen_rows(self, backbone=False):
+        """The nitrogen atoms of the template (see `Protein.nitrogen_rows`).
+        """
+        return self.template.nitrogen_rows(backbone=backbone)
+
+    def compose(self, matrix):
+        """Return the pose of the template moved by ``matrix`` after ``self``.
+
+        Example:
+            >>> from dockerasmus.spatial import TranslationMatrix
+            >>> pose = Pose(barstar).compose(TranslationMatrix(dx=1))
+            >>> pose.compose(TranslationMatrix(dx=1)).transform[:3, 3].tolist()
+            [2.0, 0.0, 0.0]
+        """
+        return type(self)(self.template, numpy.dot(matrix, self.transform))
+
+    def materialize(self):
+        """Return the pose as a new molecule, with atoms at their moved positions.
+
+        See Also:
+            `Protein.transform`, which shares the topology of the
+            template with the new protein.
+        """
+        return self.template.transform(self.transform)
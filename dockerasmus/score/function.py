@@ -41,13 +41,17 @@ class ScoringFunction(object):
         >>> g = ScoringFunction(LennardJones, Fabiola, weights=[1, 3])
         >>> g(barnase, barstar)
         -118.54...
+
+    Any object implementing the methods of `Protein` used by the
+    requirements can be scored, such as a `dockerasmus.pose.Pose`, to
+    score rigid-body poses of a protein without creating new atoms.
     """
 
     def __init__(self, *components, **kwargs):
         self.components = []
         self.weights = kwargs.get('weights') or [1 for _ in range(len(components))]
         for component in components:
-            if issubclass(component, BaseComponent):
+            if isinstance(component, type) and issubclass(component, BaseComponent):
                 logging.debug("Creating new {} instance...".format(component.__name__))
                 self.components.append(component())
             elif isinstance(component, BaseComponent):
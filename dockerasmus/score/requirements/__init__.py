@@ -30,19 +30,24 @@ def charge(protein1, protein2):
 
 def ocn_atoms_positions(protein1, protein2):
     """The positions of *O*, *C* and *N* atoms in ``protein1`` and ``protein2``.
-    """
-    import numpy
 
+    The *C* atoms are the carbons bonded to each *O* atom (see
+    `Protein.carbonyl_pairs`), so all positions are gathered from the
+    `Protein.atom_positions` matrix of each protein.
+    """
+    oxygens1, carbons1 = protein1.carbonyl_pairs()
+    oxygens2, carbons2 = protein2.carbonyl_pairs()
+    positions1, positions2 = protein1.atom_positions(), protein2.atom_positions()
     return (
         # Position of O atoms
-        numpy.array([atom.pos for atom in protein1.iteratoms() if atom.name.startswith('O')] or numpy.zeros((0,3))),
-        numpy.array([atom.pos for atom in protein2.iteratoms() if atom.name.startswith('O')] or numpy.zeros((0,3))),
+        positions1[oxygens1],
+        positions2[oxygens2],
 
         # Positions of C atoms linked to each O atom
-        numpy.array([atom.nearest("C").pos for atom in protein1.iteratoms() if atom.name.startswith('O')] or numpy.zeros((0,3))),
-        numpy.array([atom.nearest("C").pos for atom in protein2.iteratoms() if atom.name.startswith('O')] or numpy.zeros((0,3))),
+        positions1[carbons1],
+        positions2[carbons2],
 
         # Positions of N atoms
-        numpy.array([atom.pos for atom in protein1.iteratoms() if atom.name.startswith('N')] or numpy.zeros((0,3))),
-        numpy.array([atom.pos for atom in protein2.iteratoms() if atom.name.startswith('N')] or numpy.zeros((0,3))),
+        positions1[protein1.nitrogen_rows()],
+        positions2[protein2.nitrogen_rows()],
     )
@@ -2,52 +2,302 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import hashlib
+import os
+import warnings
+
 import numpy
-from .pdb import Atom, Chain, Protein, Residue
+
+from .utils.files import atomic_open
+from .utils.matrices import apply_transform
+
+
+#: The version of the sampling grids, changed when their algorithm
+#: changes so that grids cached on disk are computed again.
+GRID_VERSION = 1
 
 
 def TranslationMatrix(dx=0, dy=0, dz=0):
     """Return a translation matrix.
+
+    Any argument can be a vector, in which case a stack of translation
+    matrices of shape (N, 4, 4) is returned.
     """
-    return numpy.array([
-        [1, 0, 0, dx],
-        [0, 1, 0, dy],
-        [0, 0, 1, dz],
-        [0, 0, 0,  1],
-    ])
+    dx, dy, dz = numpy.broadcast_arrays(dx, dy, dz)
+    matrix = numpy.zeros(dx.shape + (4, 4), dtype=numpy.result_type(dx, dy, dz, int))
+    matrix[..., range(4), range(4)] = 1
+    matrix[..., 0, 3], matrix[..., 1, 3], matrix[..., 2, 3] = dx, dy, dz
+    return matrix
 
 
 def RotationMatrix(theta_x=0, theta_y=0, theta_z=0):
     """Return a rotation matrix.
+
+    Any argument can be a vector, in which case a stack of rotation
+    matrices of shape (N, 4, 4) is returned.
     """
     cos = numpy.cos
     sin = numpy.sin
 
-    rx = numpy.array([
-        [1,            0,            0, 0],
-        [0, cos(theta_x),-sin(theta_x), 0],
-        [0, sin(theta_x), cos(theta_x), 0],
-        [0,            0,            0, 1]
-    ])
+    theta_x, theta_y, theta_z = numpy.broadcast_arrays(theta_x, theta_y, theta_z)
+    rx, ry, rz = (numpy.zeros(theta_x.shape + (4, 4)) for _ in range(3))
+
+    rx[..., 0, 0] = rx[..., 3, 3] = 1
+    rx[..., 1, 1], rx[..., 1, 2] = cos(theta_x), -sin(theta_x)
+    rx[..., 2, 1], rx[..., 2, 2] = sin(theta_x), cos(theta_x)
+
+    ry[..., 1, 1] = ry[..., 3, 3] = 1
+    ry[..., 0, 0], ry[..., 0, 2] = cos(theta_y), sin(theta_y)
+    ry[..., 2, 0], ry[..., 2, 2] = -sin(theta_y), cos(theta_y)
+
+    rz[..., 2, 2] = rz[..., 3, 3] = 1
+    rz[..., 0, 0], rz[..., 0, 1] = cos(theta_z), -sin(theta_z)
+    rz[..., 1, 0], rz[..., 1, 1] = sin(theta_z), cos(theta_z)
+
+    return numpy.matmul(numpy.matmul(rx, ry), rz)
+
+
+def QuaternionMatrix(quaternion):
+    """Return the rotation matrix of a quaternion.
+
+    Arguments:
+        quaternion (`numpy.ndarray`): a quaternion ``(w, x, y, z)``, or
+            an array of shape (N, 4) of quaternions. Quaternions are
+            normalized, so they do not need to be unit quaternions.
+
+    Returns:
+        `numpy.ndarray`: a 4x4 rotation matrix, or a stack of shape
+        (N, 4, 4) of rotation matrices.
+
+    Example:
+        >>> angle = numpy.pi / 3
+        >>> q = [numpy.cos(angle/2), 0, 0, numpy.sin(angle/2)]
+        >>> numpy.allclose(QuaternionMatrix(q), RotationMatrix(theta_z=angle))
+        True
+    """
+    q = numpy.asarray(quaternion, dtype=float)
+    w, x, y, z = numpy.moveaxis(q / numpy.linalg.norm(q, axis=-1)[..., None], -1, 0)
+    matrix = numpy.zeros(q.shape[:-1] + (4, 4))
+    matrix[..., 0, 0] = 1 - 2*(y*y + z*z)
+    matrix[..., 0, 1] = 2*(x*y - w*z)
+    matrix[..., 0, 2] = 2*(x*z + w*y)
+    matrix[..., 1, 0] = 2*(x*y + w*z)
+    matrix[..., 1, 1] = 1 - 2*(x*x + z*z)
+    matrix[..., 1, 2] = 2*(y*z - w*x)
+    matrix[..., 2, 0] = 2*(x*z - w*y)
+    matrix[..., 2, 1] = 2*(y*z + w*x)
+    matrix[..., 2, 2] = 1 - 2*(x*x + y*y)
+    matrix[..., 3, 3] = 1
+    return matrix
+
+
+def TransformMatrix(rotation=None, translation=None):
+    """Return the matrix of a rotation followed by a translation.
+
+    Arguments:
+        rotation (`numpy.ndarray`): a 3x3 or 4x4 rotation matrix (such
+            as a `RotationMatrix`), or a stack of shape (N, 3, 3) or
+            (N, 4, 4) of rotation matrices.
+        translation (`numpy.ndarray`): a translation vector, or an
+            array of shape (N, 3) of translation vectors.
+
+    Returns:
+        `numpy.ndarray`: a 4x4 matrix, or a stack of shape (N, 4, 4)
+        if any argument is a stack.
+
+    Example:
+        >>> m = TransformMatrix(RotationMatrix(theta_z=[0, numpy.pi]), [1, 0, 0])
+        >>> apply_transform(numpy.array([ (1, 0, 0) ]), m).round(3)
+        array([[[ 2.,  0.,  0.]],
+        <BLANKLINE>
+               [[ 0.,  0.,  0.]]])
+    """
+    rotation = numpy.identity(3) if rotation is None else numpy.asarray(rotation, dtype=float)
+    translation = numpy.zeros(3) if translation is None else numpy.asarray(translation, dtype=float)
+    shape = numpy.broadcast(rotation[..., 0, 0], translation[..., 0]).shape
+    matrix = numpy.zeros(shape + (4, 4))
+    matrix[..., :3, :3] = rotation[..., :3, :3]
+    matrix[..., :3, 3] = translation
+    matrix[..., 3, 3] = 1
+    return matrix
 
-    ry = numpy.array([
-        [ cos(theta_y), 0, sin(theta_y), 0],
-        [            0, 1,            0, 0],
-        [-sin(theta_y), 0, cos(theta_y), 0],
-        [            0, 0,            0, 1]
-    ])
 
-    rz = numpy.array([
-        [cos(theta_z), -sin(theta_z), 0, 0],
-        [sin(theta_z),  cos(theta_z), 0, 0],
-        [           0,             0, 1, 0],
-        [           0,             0, 0, 1]
-    ])
+def pose_positions(molecule, transforms, out=None):
+    """Return the atom positions of a molecule in a stack of poses.
+
+    The positions of every pose are computed with a single matrix
+    product, without creating any molecule.
+
+    Arguments:
+        molecule (`dockerasmus.pdb.Protein` or `dockerasmus.ligand.Ligand`):
+            the molecule to transform, or a matrix of positions.
+        transforms (`numpy.ndarray`): an array of shape (N, 4, 4) with
+            the transformation matrix of each pose (see
+            `RotationMatrix`, `TranslationMatrix` and `TransformMatrix`).
+
+    Keyword Arguments:
+        out (`numpy.ndarray`, optional): a float array of shape
+            (N, n_atoms, 3) to write the positions to.
 
-    return rx.dot(ry).dot(rz)
+    Returns:
+        `numpy.ndarray`: an array of shape (N, n_atoms, 3), with
+        the positions of the atoms of the molecule in each pose.
+
+    Example:
+        >>> poses = pose_positions(barstar, TranslationMatrix(dx=numpy.arange(3)))
+        >>> poses.shape
+        (3, 1402, 3)
+        >>> poses[2, 0, 0] - barstar.atom(1).x
+        2.0
+    """
+    positions = getattr(molecule, 'atom_positions', lambda: molecule)()
+    transforms = numpy.asarray(transforms, dtype=float).reshape(-1, 4, 4)
+    return apply_transform(positions, transforms, out=out)
+
+
+def iter_pose_positions(molecule, transforms, batch_size=1024):
+    """Yield the atom positions of a molecule in a stack of poses, in batches.
+
+    Only one batch is kept in memory at once (see `pose_positions`),
+    and its buffer is reused for every batch of the same size: copy
+    a batch to keep it after the next one was computed.
+
+    Keyword Arguments:
+        batch_size (`int`): the maximum number of poses per batch.
+
+    Yields:
+        `numpy.ndarray`: arrays of shape (batch_size, n_atoms, 3), the
+        last one possibly being smaller.
+    """
+    positions = getattr(molecule, 'atom_positions', lambda: molecule)()
+    transforms = numpy.asarray(transforms, dtype=float).reshape(-1, 4, 4)
+    buffer = None
+    for start in range(0, len(transforms), batch_size):
+        batch = transforms[start:start+batch_size]
+        if buffer is None or len(buffer) != len(batch):
+            buffer = numpy.empty((len(batch),) + positions.shape)
+        yield apply_transform(positions, batch, out=buffer)
 
 
-def transform_cartesian(protein, x=0, y=0, z=0, sigma=0, rho=0):
+def _cached_grid(cache_dir, name, parameters, compute):
+    # Load a grid from ``cache_dir``, or compute it and write it there
+    if cache_dir is None:
+        return compute()
+    key = numpy.asarray(parameters, dtype=float).tobytes()
+    path = os.path.join(cache_dir, "{}-v{}-{}.npy".format(
+        name, GRID_VERSION, hashlib.sha1(key).hexdigest()[:16]))
+    try:
+        return numpy.load(path, allow_pickle=False)
+    except (IOError, OSError, ValueError):
+        grid = compute()
+    try:
+        with atomic_open(path) as f:
+            numpy.save(f, grid)
+    except (IOError, OSError) as err:
+        warnings.warn("Could not write {}: {}".format(path, err), UserWarning)
+    return grid
+
+
+def fibonacci_sphere(n):
+    """Return ``n`` points evenly spread on the unit sphere.
+
+    Points are placed on a Fibonacci spiral, so that each point covers
+    about the same area of the sphere, for any ``n``.
+
+    Returns:
+        `numpy.ndarray`: an array of shape (n, 3) of unit vectors.
+
+    Example:
+        >>> points = fibonacci_sphere(100)
+        >>> numpy.allclose(numpy.linalg.norm(points, axis=1), 1)
+        True
+        >>> numpy.allclose(points.mean(axis=0), 0, atol=1e-2)
+        True
+    """
+    i = numpy.arange(n) + 0.5
+    z = 1 - 2 * i / n
+    r = numpy.sqrt(1 - z**2)
+    azimuth = numpy.pi * (3 - numpy.sqrt(5)) * i
+    return numpy.stack([r * numpy.cos(azimuth), r * numpy.sin(azimuth), z], axis=1)
+
+
+def translation_shells(radii, spacing, cache_dir=None):
+    """Return translations on concentric spherical shells.
+
+    Each shell is sampled with a Fibonacci sphere (see
+    `fibonacci_sphere`), with enough points for neighboring points to
+    be about ``spacing`` apart.
+
+    Arguments:
+        radii (`numpy.ndarray`): the radius of each shell.
+        spacing (`float`): the distance between neighboring points.
+
+    Keyword Arguments:
+        cache_dir (`str`, optional): a directory to cache the shells
+            in, so that they are only computed once.
+
+    Returns:
+        `numpy.ndarray`: an array of shape (N, 3) with the translations
+        of every shell, ordered by shell.
+    """
+    radii = numpy.atleast_1d(numpy.asarray(radii, dtype=float))
+
+    def compute():
+        counts = numpy.maximum(1, numpy.ceil(4 * numpy.pi * radii**2 / spacing**2)).astype(int)
+        shells = [radius * fibonacci_sphere(n) for radius, n in zip(radii, counts)]
+        return numpy.concatenate(shells) if shells else numpy.zeros((0, 3))
+
+    return _cached_grid(cache_dir, 'shells', numpy.append(radii, spacing), compute)
+
+
+def rotation_grid(resolution, cache_dir=None):
+    """Return a set of rotations evenly covering every orientation.
+
+    Rotations are sampled on the Hopf fibration of the sphere of unit
+    quaternions: the direction the z axis is rotated to is sampled on
+    a Fibonacci sphere (see `fibonacci_sphere`), and the rotation
+    around that direction is sampled uniformly, so that neighboring
+    rotations are about ``resolution`` radians apart.
+
+    Arguments:
+        resolution (`float`): the angle between neighboring rotations,
+            **in radians**.
+
+    Keyword Arguments:
+        cache_dir (`str`, optional): a directory to cache the grid in,
+            so that it is only computed once.
+
+    Returns:
+        `numpy.ndarray`: an array of shape (N, 4) of unit quaternions
+        (see `QuaternionMatrix` to get the rotation matrices).
+
+    Example:
+        >>> grid = rotation_grid(numpy.radians(30))
+        >>> grid.shape
+        (552, 4)
+        >>> QuaternionMatrix(grid).shape
+        (552, 4, 4)
+    """
+    def compute():
+        n_circle = max(1, int(numpy.ceil(2 * numpy.pi / resolution)))
+        n_sphere = max(1, int(numpy.ceil(4 * numpy.pi / resolution**2)))
+        x, y, z = fibonacci_sphere(n_sphere).T
+        theta = numpy.arccos(numpy.clip(z, -1, 1))[:, None]
+        phi = numpy.arctan2(y, x)[:, None]
+        psi = 2 * numpy.pi * numpy.arange(n_circle) / n_circle
+        cos_theta, sin_theta = numpy.cos(theta / 2), numpy.sin(theta / 2)
+        quaternions = numpy.stack(numpy.broadcast_arrays(
+            cos_theta * numpy.cos(psi / 2),
+            cos_theta * numpy.sin(psi / 2),
+            sin_theta * numpy.cos(phi + psi / 2),
+            sin_theta * numpy.sin(phi + psi / 2),
+        ), axis=-1)
+        return quaternions.reshape(-1, 4)
+
+    return _cached_grid(cache_dir, 'rotations', [resolution], compute)
+
+
+def transform_cartesian(protein, x=0, y=0, z=0, sigma=0, rho=0, tau=0):
     """Rotate and translate the protein.
 
     Arguments:
@@ -62,12 +312,14 @@ def transform_cartesian(protein, x=0, y=0, z=0, sigma=0, rho=0):
             **in radians**
         rho (`int`): the angle to rotate the protein along the y axis,
             **in radians**
+        tau (`int`): the angle to rotate the protein along the z axis,
+            **in radians**
     """
-    matrix = RotationMatrix(sigma, rho).dot(TranslationMatrix(x, y, z))
+    matrix = RotationMatrix(sigma, rho, tau).dot(TranslationMatrix(x, y, z))
     return apply_transformation_matrix(protein, matrix)
 
 
-def transform_spherical(protein, r=0, phi=0, theta=0, sigma=0, rho=0):
+def transform_spherical(protein, r=0, phi=0, theta=0, sigma=0, rho=0, tau=0):
     """Rotate and translate the protein.
 
     Arguments:
@@ -82,25 +334,25 @@ def transform_spherical(protein, r=0, phi=0, theta=0, sigma=0, rho=0):
             **in radians**.
         rho (`int`): the angle to rotate the protein along the y axis,
             **in radians**.
+        tau (`int`): the angle to rotate the protein along the z axis,
+            **in radians**.
     """
     x = r * numpy.sin(phi) * numpy.cos(theta)
     y = r * numpy.sin(theta) * numpy.sin(phi)
-    z = r * numpy.cos(theta)
-    return transform_cartesian(protein, x, y, z, sigma, rho)
+    z = r * numpy.cos(phi)
+    return transform_cartesian(protein, x, y, z, sigma, rho, tau)
 
 
-def apply_transformation_matrix(protein, matrix):
+def apply_transformation_matrix(protein, matrix, inplace=False):
     """Apply a 4x4 transformation matrix to a protein model.
+
+    Arguments:
+        protein (`dockerasmus.pdb.Protein` or `dockerasmus.ligand.Ligand`):
+            the molecule to transform.
+        matrix (`numpy.ndarray`): the 4x4 transformation matrix.
+
+    Keyword Arguments:
+        inplace (`bool`): move the atoms of ``protein`` instead of
+            returning a moved copy (see `Protein.transform`).
     """
-    new_prot = Protein()
-    for chain in protein.values():
-        new_prot[chain.id] = Chain(chain.id, chain.name)
-        for res in chain.values():
-            new_prot[chain.id][res.id] = new_res = Residue(res.id, res.name)
-            for atom in res.values():
-                old_pos = numpy.append(atom.pos, [1]) # 4 coords vector
-                new_pos = matrix.dot(old_pos)[:3]
-                new_prot[chain.id][res.id][atom.name] = Atom(
-                    *new_pos, id=atom.id, name=atom.name, residue=new_res
-                )
-    return new_prot
+    return protein.transform(matrix, inplace=inplace)
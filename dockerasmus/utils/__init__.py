@@ -7,13 +7,17 @@ import six
 import inspect
 
 from . import decorators
+from . import files
+from . import formatting
+from . import grid
 from . import iterators
 from . import matrices
+from . import parsing
 
 
 
 
-__all__ = ["decorators", "iterators", "matrices", "maybe_import", "getargspec"]
+__all__ = ["decorators", "files", "formatting", "grid", "iterators", "matrices", "parsing", "maybe_import", "getargspec"]
 
 
 getargspec = inspect.getargspec if six.PY2 else inspect.getfullargspec
@@ -0,0 +1,39 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import contextlib
+import os
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode='wb'):
+    """Open a temporary file, moved to ``path`` once written.
+
+    Concurrent readers of ``path`` never see a partially written file:
+    the file is written next to ``path``, and only moved in place when
+    the ``with`` block exits without error (the temporary file is
+    removed otherwise).
+
+    Example:
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'hello.txt')
+        >>> with atomic_open(path, 'w') as f:
+        ...     _ = f.write('hello')
+        >>> open(path).read() == 'hello'
+        True
+    """
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(tmp, mode) as f:
+            yield f
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # os.rename does not replace an existing file on Windows
+            os.remove(path)
+            os.rename(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,235 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import division
+
+import numpy
+
+
+_SPACE = numpy.uint8(ord(b" "))
+_MINUS = numpy.uint8(ord(b"-"))
+_ZERO = numpy.uint8(ord(b"0"))
+
+#: The lookup tables of `format_decimals`, by field width and precision.
+_DECIMAL_TABLES = {}
+
+
+def _zero_padded(magnitude, width):
+    """Return a byte matrix with the ``width`` last digits of ``magnitude``.
+    """
+    powers = 10 ** numpy.arange(width - 1, -1, -1, dtype=numpy.int64)
+    return ((magnitude[..., None] // powers) % 10).astype(numpy.uint8) + _ZERO
+
+
+def _right_aligned(magnitude, negative, width):
+    """Return a byte matrix with the right-aligned digits of ``magnitude``.
+
+    Leading zeros are replaced with spaces, except for the last digit,
+    and a minus sign is written before the first digit where ``negative``
+    is `True`.
+    """
+    if numpy.any(magnitude >= 10 ** (width - negative.astype(numpy.int64))):
+        raise ValueError("Value too large for a field of width {}".format(width))
+    mx = _zero_padded(magnitude, width)
+    leading = magnitude[..., None] < 10 ** numpy.arange(width - 1, -1, -1, dtype=numpy.int64)
+    leading[..., -1] = False
+    mx[leading] = _SPACE
+    # the sign goes right before the first digit
+    sign = numpy.nonzero(negative)
+    mx[sign + (leading[sign].sum(axis=-1) - 1,)] = _MINUS
+    return mx
+
+
+def format_integers(values, width):
+    """Format an array of integers as right-aligned fixed-width fields.
+
+    Arguments:
+        values (`numpy.ndarray`): an array of integers.
+        width (`int`): the width of each field.
+
+    Returns:
+        `numpy.ndarray`: an array of `numpy.uint8` with an additional
+        last dimension of size ``width`` spanning the characters of
+        each field.
+
+    Raises:
+        ValueError: when a value does not fit in ``width`` characters.
+
+    Example:
+        >>> mx = format_integers(numpy.array([32, -3, 12345]), 5)
+        >>> print(mx.tobytes().decode('ascii'))
+           32   -312345
+    """
+    values = numpy.asarray(values, dtype=numpy.int64)
+    return _right_aligned(numpy.abs(values), values < 0, width)
+
+
+def format_decimals(values, width, precision):
+    """Format an array of numbers as right-aligned fixed-point fields.
+
+    The result is the same as formatting each value with
+    ``'{:{width}.{precision}f}'``, values being rounded half to even
+    to the given ``precision``, except that values rounded to zero are
+    never written with a minus sign.
+
+    Arguments:
+        values (`numpy.ndarray`): an array of numbers.
+        width (`int`): the width of each field.
+        precision (`int`): the number of digits after the decimal point.
+
+    Returns:
+        `numpy.ndarray`: an array of `numpy.uint8` with an additional
+        last dimension of size ``width`` spanning the characters of
+        each field.
+
+    Raises:
+        ValueError: when a value does not fit in ``width`` characters.
+
+    Example:
+        >>> mx = format_decimals(numpy.array([11.281, -0.5, 1000]), 8, 3)
+        >>> print(mx.tobytes().decode('ascii'))
+          11.281  -0.5001000.000
+    """
+    scaled = numpy.rint(numpy.asarray(values, dtype=float) * 10 ** precision)
+    magnitude = numpy.abs(scaled).astype(numpy.int64)
+    negative = scaled < 0
+    if not precision:
+        return _right_aligned(magnitude, negative, width)
+    integer, fraction = numpy.divmod(magnitude, 10 ** precision)
+    if width - precision - 1 <= 5 and precision <= 4:
+        return _tabulated_decimals(integer, fraction, negative, width, precision)
+    dot = numpy.full(scaled.shape + (1,), ord(b"."), dtype=numpy.uint8)
+    return numpy.concatenate([
+        _right_aligned(integer, negative, width - precision - 1),
+        dot,
+        _zero_padded(fraction, precision),
+    ], axis=-1)
+
+
+def _decimal_tables(width, precision):
+    """Return the formatted integer and fractional parts of small decimals.
+
+    The integer parts are the rows ``0`` to ``10**digits - 1`` of the
+    first table for positive numbers, followed by the rows of negative
+    numbers (with a minus sign), and the fractional parts (with the
+    decimal point) are the rows of the second table, as `numpy.void`
+    scalars of the width of each part.
+    """
+    key = (width, precision)
+    if key not in _DECIMAL_TABLES:
+        digits = width - precision - 1
+        positive = numpy.arange(10 ** digits, dtype=numpy.int64)
+        negative = numpy.arange(10 ** (digits - 1), dtype=numpy.int64)
+        integers = numpy.concatenate([
+            _right_aligned(positive, numpy.zeros(len(positive), dtype=bool), digits),
+            _right_aligned(negative, numpy.ones(len(negative), dtype=bool), digits),
+        ])
+        fractions = numpy.concatenate([
+            numpy.full((10 ** precision, 1), ord(b"."), dtype=numpy.uint8),
+            _zero_padded(numpy.arange(10 ** precision, dtype=numpy.int64), precision),
+        ], axis=1)
+        _DECIMAL_TABLES[key] = (
+            integers.view("V{}".format(digits)).ravel(),
+            fractions.view("V{}".format(precision + 1)).ravel(),
+        )
+    return _DECIMAL_TABLES[key]
+
+
+def _tabulated_decimals(integer, fraction, negative, width, precision):
+    """Format fixed-point fields by looking up their parts in tables.
+
+    Arguments:
+        integer (`numpy.ndarray`): the integer part of each magnitude.
+        fraction (`numpy.ndarray`): the fractional part of each
+            magnitude, scaled by ``10**precision``.
+        negative (`numpy.ndarray`): whether each value is negative.
+    """
+    digits = width - precision - 1
+    if integer.size and integer.max() >= 10 ** (digits - 1):
+        if numpy.any(integer >= numpy.where(negative, 10 ** (digits - 1), 10 ** digits)):
+            raise ValueError("Value too large for a field of width {}".format(width))
+    integers, fractions = _decimal_tables(width, precision)
+    fields = numpy.empty(integer.shape, dtype=[
+        ('integer', integers.dtype), ('fraction', fractions.dtype)])
+    fields['integer'] = integers[integer + negative * 10 ** digits]
+    fields['fraction'] = fractions[fraction]
+    return fields.view(numpy.uint8).reshape(integer.shape + (width,))
+
+
+def format_strings(values, width, justify='left'):
+    """Format an array of strings as fixed-width fields.
+
+    Each distinct string is only formatted and encoded once.
+
+    Arguments:
+        values (`numpy.ndarray`): an array of strings.
+        width (`int`): the width of each field.
+
+    Keyword Arguments:
+        justify (`str`): either ``'left'`` or ``'right'``.
+
+    Returns:
+        `numpy.ndarray`: an array of `numpy.uint8` with an additional
+        last dimension of size ``width`` spanning the characters of
+        each field.
+
+    Raises:
+        ValueError: when a string does not fit in ``width`` characters.
+
+    Example:
+        >>> mx = format_strings(numpy.array(['CA', 'N', 'CA']), 3)
+        >>> print(mx.tobytes().decode('ascii').replace(' ', '_'))
+        CA_N__CA_
+    """
+    values = numpy.asarray(values)
+    unique, inverse = numpy.unique(values, return_inverse=True)
+    pad = (lambda s: s.ljust(width)) if justify == 'left' else (lambda s: s.rjust(width))
+    formatted = [pad(s).encode('ascii') for s in unique.tolist()]
+    if any(len(s) > width for s in formatted):
+        raise ValueError("String too large for a field of width {}".format(width))
+    mx = numpy.array(formatted or [b" " * width], dtype="S{}".format(width))
+    mx = mx.view(numpy.uint8).reshape(-1, width)
+    return mx[inverse.ravel()].reshape(values.shape + (width,))
+
+
+def format_hybrid36(values, width):
+    """Format an array of integers as fixed-width hybrid-36 fields.
+
+    Numbers which fit in a field of width ``width`` are written in
+    decimal, and the following ones are written in base 36 (see
+    `dockerasmus.utils.parsing.parse_hybrid36`).
+
+    Arguments:
+        values (`numpy.ndarray`): an array of integers.
+        width (`int`): the width of each field.
+
+    Returns:
+        `numpy.ndarray`: an array of `numpy.uint8` with an additional
+        last dimension of size ``width`` spanning the characters of
+        each field.
+
+    Raises:
+        ValueError: when a value does not fit in ``width`` characters.
+
+    Example:
+        >>> mx = format_hybrid36(numpy.array([99999, 100000, 43770016]), 5)
+        >>> print(mx.tobytes().decode('ascii'))
+        99999A0000a0000
+    """
+    values = numpy.asarray(values, dtype=numpy.int64)
+    encoded = values >= 10 ** width
+    if not encoded.any():
+        return format_integers(values, width)
+
+    mx = format_integers(numpy.where(encoded, 0, values), width)
+    offset = values[encoded] - 10 ** width
+    upper = offset < 26 * 36 ** (width - 1)
+    offset += 10 * 36 ** (width - 1) - numpy.where(upper, 0, 26 * 36 ** (width - 1))
+    if numpy.any(offset >= 36 ** width):
+        raise ValueError("Value too large for a field of width {}".format(width))
+
+    powers = 36 ** numpy.arange(width - 1, -1, -1, dtype=numpy.int64)
+    digits = (offset[..., None] // powers) % 36
+    letters = numpy.where(upper, ord(b"A") - 10, ord(b"a") - 10)[..., None]
+    mx[encoded] = numpy.where(digits < 10, digits + ord(b"0"), digits + letters)
+    return mx
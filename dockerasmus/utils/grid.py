@@ -0,0 +1,206 @@
+# coding: utf-8
+"""
+grid
+====
+
+A uniform grid of cells (a *cell list*) to find neighboring points.
+"""
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import division
+
+import numpy
+
+
+class CellList(object):
+    """A spatial index of points, on a uniform grid of cubic cells.
+
+    Points are sorted by cell, and only the cells containing at least
+    one point are stored, so that the points of the cells around a
+    query point are found with a binary search. Every query is
+    vectorized over a matrix of query points, and only compares each
+    query point to the points of the cells around it.
+
+    Attributes:
+        points (`numpy.ndarray`): a copy of the indexed points, as an
+            array of shape (n, 3).
+        cell_size (`float`): the length of the edges of the cells.
+
+    Example:
+        >>> grid = CellList(numpy.array([ (0, 0, 0), (0, 0, 1), (9, 9, 9) ]))
+        >>> grid.query([0, 0, 0.8])
+        (0.19999999999999996, 1)
+        >>> grid.query_radius(numpy.array([ (0, 0, 0), (5, 5, 5) ]), 2)
+        [array([0, 1]), array([], dtype=int64)]
+    """
+
+    __slots__ = ("points", "cell_size", "_origin", "_shape", "_order", "_keys", "_offsets")
+
+    def __init__(self, points, cell_size=5.0):
+        """Index a set of points.
+
+        Arguments:
+            points (`numpy.ndarray`): an array of shape (n, 3).
+
+        Keyword Arguments:
+            cell_size (`float`): the length of the edges of the cells.
+                Queries are the fastest for distances close to the
+                size of the cells.
+        """
+        self.points = numpy.array(points, dtype=float).reshape(-1, 3)
+        self.cell_size = float(cell_size)
+        self._origin = self.points.min(axis=0) if len(self.points) else numpy.zeros(3)
+        cells = self._cells(self.points)
+        self._shape = cells.max(axis=0) + 1 if len(cells) else numpy.ones(3, dtype=numpy.int64)
+        ids = self._ravel(cells)
+        self._order = numpy.argsort(ids, kind='mergesort')
+        self._keys, starts = numpy.unique(ids[self._order], return_index=True)
+        self._offsets = numpy.append(starts, len(ids))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cells(self, points):
+        return numpy.floor((points - self._origin) / self.cell_size).astype(numpy.int64)
+
+    def _ravel(self, cells):
+        return (cells[..., 0] * self._shape[1] + cells[..., 1]) * self._shape[2] + cells[..., 2]
+
+    def _candidates(self, points, reach, block_size=2**16):
+        # Yield (query, point) index pairs for every indexed point in the
+        # cells at most ``reach`` cells away from the cell of each query
+        r = numpy.arange(-reach, reach + 1)
+        around = numpy.stack(numpy.meshgrid(r, r, r, indexing='ij'), axis=-1).reshape(-1, 3)
+        cells = self._cells(points)
+        step = max(1, block_size // len(around))
+        for start in range(0, len(points), step):
+            block = cells[start:start+step, numpy.newaxis] + around
+            valid = ((block >= 0) & (block < self._shape)).all(axis=2)
+            queries = numpy.nonzero(valid)[0] + start
+            ids = self._ravel(block[valid])
+            slots = numpy.minimum(numpy.searchsorted(self._keys, ids), len(self._keys) - 1)
+            found = self._keys[slots] == ids
+            queries, slots = queries[found], slots[found]
+            counts = self._offsets[slots+1] - self._offsets[slots]
+            shift = numpy.repeat(self._offsets[slots] - (numpy.cumsum(counts) - counts), counts)
+            yield numpy.repeat(queries, counts), self._order[shift + numpy.arange(counts.sum())]
+
+    def _pairs(self, points, cutoff):
+        # Return the (query, point, distance) of the pairs closer than cutoff
+        empty = numpy.zeros(0, dtype=numpy.intp)
+        parts = [(empty, empty, numpy.zeros(0))]
+        if len(self.points) and len(points):
+            reach = max(1, int(numpy.ceil(cutoff / self.cell_size)))
+            for queries, rows in self._candidates(points, reach):
+                distances = numpy.sqrt(((points[queries] - self.points[rows])**2).sum(axis=1))
+                close = distances < cutoff
+                parts.append((queries[close], rows[close], distances[close]))
+        return tuple(numpy.concatenate(arrays) for arrays in zip(*parts))
+
+    @staticmethod
+    def _as_points(points):
+        points = numpy.asarray(points, dtype=float)
+        return points.reshape(-1, 3), points.ndim == 1
+
+    def pairs(self, points, cutoff):
+        """Find every pair of a query point and an indexed point closer than ``cutoff``.
+
+        Arguments:
+            points (`numpy.ndarray`): the query points, as an array of
+                shape (m, 3).
+            cutoff (`float`): the distance threshold.
+
+        Returns:
+            `tuple`: three vectors ``(i, j, d)``, where ``d[k]`` is the
+            distance between the query point ``i[k]`` and the indexed
+            point ``j[k]``, sorted by ``i`` then ``j``.
+        """
+        points, _ = self._as_points(points)
+        queries, rows, distances = self._pairs(points, cutoff)
+        order = numpy.lexsort((rows, queries))
+        return queries[order], rows[order], distances[order]
+
+    def within(self, points, cutoff):
+        """Check which query points are closer than ``cutoff`` to an indexed point.
+
+        Returns:
+            `numpy.ndarray`: a boolean vector with an element per
+            query point.
+        """
+        points, _ = self._as_points(points)
+        result = numpy.zeros(len(points), dtype=bool)
+        result[self._pairs(points, cutoff)[0]] = True
+        return result
+
+    def query_radius(self, points, radius):
+        """Find the indexed points closer than ``radius`` to each query point.
+
+        Returns:
+            `list`: the sorted indices of the indexed points closer than
+            ``radius`` to each query point.
+        """
+        points, _ = self._as_points(points)
+        if not len(points):
+            return []
+        queries, rows, _ = self.pairs(points, radius)
+        return numpy.split(rows, numpy.searchsorted(queries, numpy.arange(1, len(points))))
+
+    def query(self, points, k=1):
+        """Find the ``k`` indexed points nearest to each query point.
+
+        The cells around each query point are searched in a growing
+        radius, until at least ``k`` indexed points are found in that
+        radius (up to 4 cells away). Query points farther from the
+        indexed points are compared to every indexed point.
+
+        Arguments:
+            points (`numpy.ndarray`): a query point, or an array of
+                shape (m, 3) of query points.
+
+        Keyword Arguments:
+            k (`int`): the number of neighbors to find.
+
+        Returns:
+            `tuple`: the distances to the nearest indexed points, and
+            their indices, as arrays of shape (m, k), sorted by distance
+            (the ``k`` axis is dropped when ``k`` is 1, and the ``m``
+            axis when a single query point is given).
+
+        Raises:
+            ValueError: when ``k`` is greater than the number of
+                indexed points.
+        """
+        points, single = self._as_points(points)
+        if not 0 < k <= len(self.points):
+            raise ValueError("Cannot find {} neighbors among {} points".format(k, len(self.points)))
+        distances = numpy.empty((len(points), k))
+        indices = numpy.empty((len(points), k), dtype=numpy.intp)
+
+        todo, radius = numpy.arange(len(points)), self.cell_size
+        while len(todo) and radius <= 4 * self.cell_size:
+            queries, rows, found = self._pairs(points[todo], radius)
+            order = numpy.lexsort((rows, found, queries))
+            queries, rows, found = queries[order], rows[order], found[order]
+            counts = numpy.bincount(queries, minlength=len(todo))
+            done = counts >= k
+            # keep the k first (nearest) pairs of each complete query
+            starts = numpy.cumsum(counts) - counts
+            first = starts[done][:, numpy.newaxis] + numpy.arange(k)
+            distances[todo[done]], indices[todo[done]] = found[first], rows[first]
+            todo, radius = todo[~done], radius * 2
+
+        # Compare the remaining query points to every indexed point
+        step = max(1, 2**20 // len(self.points))
+        for start in range(0, len(todo), step):
+            block = todo[start:start+step]
+            squared = ((points[block, numpy.newaxis] - self.points)**2).sum(axis=2)
+            nearest = numpy.argsort(squared, axis=1, kind='mergesort')[:, :k]
+            indices[block] = nearest
+            distances[block] = numpy.sqrt(numpy.take_along_axis(squared, nearest, axis=1))
+
+        if k == 1:
+            distances, indices = distances[:, 0], indices[:, 0]
+        if single:
+            distances, indices = distances[0], indices[0]
+        return distances, indices
@@ -56,6 +56,42 @@ def distance(u, v):
     return numpy.sqrt(sum(d_components))
 
 
+def apply_transform(points, matrix, out=None):
+    """Apply a 4x4 transformation matrix to a matrix of points.
+
+    This is the same as multiplying the matrix with the homogeneous
+    coordinates of each point, but with a single matrix product. Given
+    a stack of matrices, the points are transformed by every matrix
+    of the stack at once.
+
+    Arguments:
+        points (`numpy.ndarray`): an array of shape (n, 3).
+        matrix (`numpy.ndarray`): a 4x4 affine transformation matrix,
+            or an array of shape (N, 4, 4) of matrices.
+
+    Keyword Arguments:
+        out (`numpy.ndarray`, optional): a float array of the shape of
+            the result, to write the transformed points to.
+
+    Returns:
+        `numpy.ndarray`: an array of shape (n, 3) with the transformed
+        points, or (N, n, 3) given a stack of matrices.
+
+    Example:
+        >>> matrix = numpy.array([ [0, -1, 0, 1], [1, 0, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1] ])
+        >>> apply_transform(numpy.array([ (1, 0, 0), (0, 0, 2) ]), matrix)
+        array([[ 1.,  1.,  0.],
+               [ 1.,  0.,  2.]])
+        >>> apply_transform(numpy.zeros((5, 3)), numpy.stack([matrix] * 2)).shape
+        (2, 5, 3)
+    """
+    matrix = numpy.asarray(matrix, dtype=float)
+    points = numpy.asarray(points, dtype=float)
+    out = numpy.matmul(points, numpy.swapaxes(matrix[..., :3, :3], -1, -2), out=out)
+    out += matrix[..., numpy.newaxis, :3, 3]
+    return out
+
+
 def normalized(a, axis=-1, order=2):
     """Return an array of normalized vectors.
 
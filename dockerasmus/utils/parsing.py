@@ -0,0 +1,211 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import division
+
+import numpy
+
+
+def _as_matrix(fields):
+    """Return a contiguous byte matrix from an array of fixed-size `bytes`.
+
+    The null bytes used by `numpy` to pad shorter `bytes` are
+    replaced with spaces. Byte matrices are copied if they are not
+    contiguous (such as a column slice of a matrix of lines), since
+    every following operation is several times faster on a
+    contiguous matrix.
+    """
+    fields = numpy.asarray(fields)
+    if fields.dtype.kind == 'S':
+        width = fields.dtype.itemsize
+        fields = numpy.ascontiguousarray(fields)
+        mx = fields.view(numpy.uint8).reshape(fields.shape + (width,))
+        return numpy.where(mx == 0, numpy.uint8(ord(b" ")), mx)
+    return numpy.ascontiguousarray(fields)
+
+
+def _fallback(mx, dtype):
+    """Parse a byte matrix field by field with the builtin constructors.
+    """
+    values = numpy.ascontiguousarray(mx).view("S{}".format(mx.shape[-1]))
+    return numpy.array(
+        [dtype(v) for v in values.ravel().tolist()], dtype=dtype
+    ).reshape(mx.shape[:-1])
+
+
+def _digits(mx):
+    """Return the digit values and the digit mask of a byte matrix.
+
+    Returns `None` if any character is not a digit, a sign,
+    a space or a decimal point.
+    """
+    values = mx - numpy.uint8(ord(b"0"))
+    digits = values < 10
+    valid = digits | (mx == ord(b" ")) | (mx == ord(b".")) \
+                   | (mx == ord(b"-")) | (mx == ord(b"+"))
+    if not valid.all():
+        return None
+    return values * digits, digits
+
+
+def _dot(mx, weights):
+    """Return the dot product of the last axis of ``mx`` with ``weights``.
+
+    The matrix is flattened to 2D first, so that `numpy` uses a single
+    BLAS matrix-vector product instead of a slow N-dimensional loop.
+    The values of ``mx`` must be digits (or booleans), and ``weights``
+    non-negative integers, so that the product is computed in single
+    precision whenever every partial sum is exactly representable.
+    """
+    width = mx.shape[-1]
+    dtype = numpy.float32 if 9 * numpy.sum(weights) < 2**24 else float
+    product = mx.reshape(-1, width).astype(dtype).dot(numpy.asarray(weights, dtype=dtype))
+    return product.astype(float).reshape(mx.shape[:-1])
+
+
+def _count(mask):
+    """Count the `True` values along the last axis of a boolean array.
+    """
+    return _dot(mask, numpy.ones(mask.shape[-1]))
+
+
+def parse_decimals(fields):
+    """Parse an array of fixed-width decimal fields in bulk.
+
+    Arguments:
+        fields (`numpy.ndarray`): either an array of fixed-size `bytes`,
+            or an array of `numpy.uint8` which last dimension spans
+            the characters of each field.
+
+    Returns:
+        `numpy.ndarray`: an array of `float` with one element per field.
+        Values are exactly the ones `float` would return on each field,
+        since they are obtained as the quotient of the integer mantissa
+        by a power of 10.
+
+    Raises:
+        ValueError: when a field is not a valid decimal number.
+
+    Example:
+        >>> parse_decimals(numpy.array([b" 11.281", b"-86.699", b"   1.5 "]))
+        array([ 11.281, -86.699,   1.5  ])
+    """
+    mx = _as_matrix(fields)
+    width = mx.shape[-1]
+    parsed = _digits(mx)
+    if parsed is None or not mx.size:
+        return _fallback(mx, float)
+    values, digits = parsed
+
+    dots = mx == ord(b".")
+    first = dots.reshape(-1, width)[0]
+    column = numpy.flatnonzero(first)
+    same_dots = numpy.count_nonzero(dots) == len(column) * (mx.size // width) \
+                and dots[..., column].all()
+    if digits[..., -1].all() and same_dots:
+        # Fast path: every field has its decimal point at the same position
+        # and ends with a digit, so every character has the same weight in
+        # every field, and the mantissa is a single (exact) dot product.
+        rank = numpy.cumsum(~first[::-1])[::-1] - 1
+        mantissa = _dot(values, numpy.where(first, 0, 10.0 ** rank))
+        decimals = numpy.count_nonzero(numpy.cumsum(first) > 0) - first.any()
+    else:
+        if not digits.any(axis=-1).all():
+            return _fallback(mx, float)
+        rank = numpy.cumsum(digits[..., ::-1], axis=-1)[..., ::-1] - 1
+        mantissa = numpy.sum(values * 10.0 ** rank.clip(0), axis=-1)
+        decimals = numpy.sum(digits & (numpy.cumsum(dots, axis=-1) > 0), axis=-1)
+
+    sign = 1 - 2 * _count(mx == ord(b"-"))
+    return sign * mantissa / 10.0 ** decimals
+
+
+def parse_integers(fields):
+    """Parse an array of fixed-width integer fields in bulk.
+
+    Arguments:
+        fields (`numpy.ndarray`): either an array of fixed-size `bytes`,
+            or an array of `numpy.uint8` which last dimension spans
+            the characters of each field.
+
+    Returns:
+        `numpy.ndarray`: an array of `int` with one element per field.
+
+    Raises:
+        ValueError: when a field is not a valid integer.
+
+    Example:
+        >>> parse_integers(numpy.array([b"   32", b"   -3", b"12345"]))
+        array([   32,    -3, 12345])
+    """
+    mx = _as_matrix(fields)
+    width = mx.shape[-1]
+    parsed = _digits(mx)
+    if parsed is None or not mx.size or numpy.any(mx == ord(b".")):
+        return _fallback(mx, int)
+    values, digits = parsed
+
+    if digits[..., -1].all():
+        # Fast path: right-aligned digits have the same weight in every field
+        mantissa = _dot(values, 10.0 ** numpy.arange(width - 1, -1, -1))
+    else:
+        if not digits.any(axis=-1).all():
+            return _fallback(mx, int)
+        rank = numpy.cumsum(digits[..., ::-1], axis=-1)[..., ::-1] - 1
+        mantissa = numpy.sum(values * 10.0 ** rank.clip(0), axis=-1)
+
+    sign = 1 - 2 * _count(mx == ord(b"-"))
+    return (sign * mantissa).astype(numpy.int64)
+
+
+def parse_hybrid36(fields):
+    """Parse an array of fixed-width hybrid-36 integer fields in bulk.
+
+    The hybrid-36 encoding is used by PDB files to store numbers which
+    do not fit in a field in decimal: with a field of width 5, numbers
+    up to 99999 are written in decimal, and the following ones are
+    written in base 36, starting with ``A0000`` (uppercase digits first,
+    then lowercase digits, starting with ``a0000``).
+
+    Arguments:
+        fields (`numpy.ndarray`): either an array of fixed-size `bytes`,
+            or an array of `numpy.uint8` which last dimension spans
+            the characters of each field.
+
+    Returns:
+        `numpy.ndarray`: an array of `int` with one element per field.
+
+    Raises:
+        ValueError: when a field is not a valid hybrid-36 integer.
+
+    Example:
+        >>> parse_hybrid36(numpy.array([b"99999", b"A0000", b"a0000", b"   -3"]))
+        array([   99999,   100000, 43770016,       -3])
+    """
+    mx = _as_matrix(fields)
+    width = mx.shape[-1]
+    if not mx.size or mx.max() < ord(b"A"):
+        # Fast path: no letter, every field is written in decimal
+        return parse_integers(mx)
+    upper = (mx >= ord(b"A")) & (mx <= ord(b"Z"))
+    lower = (mx >= ord(b"a")) & (mx <= ord(b"z"))
+    encoded = (upper | lower).any(axis=-1)
+    if not encoded.any():
+        return parse_integers(mx)
+
+    values = numpy.empty(mx.shape[:-1], dtype=numpy.int64)
+    values[~encoded] = parse_integers(mx[~encoded])
+
+    mx, upper, lower = mx[encoded], upper[encoded], lower[encoded]
+    digits = (mx >= ord(b"0")) & (mx <= ord(b"9"))
+    is_lower = lower.any(axis=-1)
+    if not (digits | upper | lower).all() or not (upper | lower)[:, 0].all() \
+    or (is_lower & upper.any(axis=-1)).any():
+        raise ValueError("Invalid hybrid-36 field")
+
+    mx = mx.astype(numpy.int64)
+    mx -= numpy.where(digits, ord(b"0"), numpy.where(upper, ord(b"A") - 10, ord(b"a") - 10))
+    decoded = mx.dot(36 ** numpy.arange(width - 1, -1, -1, dtype=numpy.int64))
+    values[encoded] = decoded - 10 * 36 ** (width - 1) + 10 ** width \
+                    + is_lower * 26 * 36 ** (width - 1)
+    return values
@@ -47,11 +47,6 @@ if __name__ == "__main__":
     ligand = Protein.from_pdb_file(args['-l'])
     test = Protein.from_pdb_file(args['-t'])
 
-    # Create two Proteins containing only the residues
-    # in the Receptor/Ligand interface
-    interface_ligand = ligand.copy()
-    interface_test = test.copy()
-
     print(
         "Number of atoms in Ligand: ",
         len(list(test.iteratoms()))
@@ -62,13 +57,11 @@ if __name__ == "__main__":
         len(list(receptor.iteratoms()))
     )
 
-    # Remove the residues not in the interface from the copies
-    interface_residues = {res1 for res1, _ in ligand.interface(receptor)}
-    for chain in ligand.itervalues():
-        for res in chain.itervalues():
-            if res not in interface_residues:
-                del interface_test[chain.id][res.id]
-                del interface_ligand[chain.id][res.id]
+    # Create two Proteins containing only the residues
+    # in the Receptor/Ligand interface
+    interface = ligand.select(near=receptor, by_residue=True)
+    interface_ligand = ligand.subset(interface)
+    interface_test = test.subset(interface)
 
     print(
         "Number of atoms in Ligand (interface only): ",
@@ -3,11 +3,16 @@
 """
 Usage:
     score-conformations.py -i IN -r REF [-o OUT] [-q]
+    score-conformations.py -a ARCHIVE -r REF [-o OUT] [-q]
     score-conformations.py (-h | --help)
 
 Positional Arguments:
     -i IN, --input IN           The path to the directory
                                 containing ligand PDB files.
+    -a ARCHIVE, --archive ARCHIVE
+                                The path to a decoy archive
+                                with the ligand poses (see
+                                `dockerasmus.pdb.DecoyArchive`).
     -r REF, --reference REF     The path to the PDB file of
                                 the receptor.
     -o OUT, --output OUT        The directory in which to
@@ -23,7 +28,6 @@ Optional Arguments:
 import sys
 import os
 import glob
-import operator
 import shutil
 
 # update sys.path to make dockerasmus importable
@@ -44,7 +48,8 @@ except ImportError:
 
 
 # Import dockerasmus
-from dockerasmus.pdb import Protein
+from dockerasmus.pdb import DecoyArchive, Protein
+from dockerasmus.pose import Pose
 from dockerasmus.score import ScoringFunction, components
 
 
@@ -52,7 +57,7 @@ if __name__ == "__main__":
 
     # Parse the CLI arguments
     args = docopt.docopt(__doc__)
-    ref = Protein.from_pdb_file(args["--reference"])
+    ref = Protein.from_pdb_file(args["--reference"], cached=True)
     indir = args['--input']
     outdir = args['--output']
 
@@ -66,52 +71,65 @@ if __name__ == "__main__":
     sf_custom = ScoringFunction(components.Fabiola, components.ScreenedCoulomb,
                                 weights=[4, 1])
 
-    # Compute the score for every protein in the input directory
-    scores_cornell = {}
-    scores_custom = {}
-
-    # Get a list of files to score
-    files = glob.glob(os.path.join(indir, '*.pdb'))
+    # Get the names and the poses of the decoys to score, either from
+    # the files in the input directory or from a decoy archive (scored
+    # as poses of the template, without creating a protein per decoy)
+    if args['--archive']:
+        archive = DecoyArchive.load(args['--archive'])
+        names = [name or "decoy{}.pdb".format(i) for i, name in enumerate(archive.names)]
+        decoys = (Pose(archive.template, transform) for transform in archive.transforms)
+    else:
+        files = glob.glob(os.path.join(indir, '*.pdb'))
+        names = [os.path.basename(filename) for filename in files]
+        decoys = (Protein.from_pdb_file(filename) for filename in files)
 
     # Create a progressbar if not quiet
     if not args["--quiet"]:
-        pb = progressbar.ProgressBar()
-        files = pb(files)
-
-    # Score each file
-    for filename in files:
-        prot = Protein.from_pdb_file(filename)
-        scores_cornell[os.path.basename(filename)] = sf_cornell(ref, prot)
-        scores_custom[os.path.basename(filename)] = sf_custom(ref, prot)
+        pb = progressbar.ProgressBar(max_value=len(names))
+        decoys = pb(decoys)
+
+    # Compute the score of every decoy, in the order of `names`
+    scores_cornell = []
+    scores_custom = []
+    for prot in decoys:
+        scores_cornell.append(sf_cornell(ref, prot))
+        scores_custom.append(sf_custom(ref, prot))
+
+    def export(index, path):
+        # Copy the decoy file, or write the decoy pose from the archive
+        if args['--archive']:
+            archive[index].to_pdb_file(path)
+        else:
+            shutil.copy(files[index], path)
+
+    def ranking(scores):
+        # The indices of the decoys, from the best to the worst score
+        return sorted(range(len(scores)), key=scores.__getitem__)
 
     ###########
     # CORNELL #
     ###########
 
     # Write the ordered results in a .tsv file
+    ranks = ranking(scores_cornell)
     with open(os.path.join(outdir, 'scoring_Cornell', 'scores.tsv'), 'w') as f:
         f.write("file\tscore\n")
-        for filename, score in sorted(scores_cornell.items(), key=operator.itemgetter(1)):
-            f.write("{}\t{}\n".format(filename, score))
+        for index in ranks:
+            f.write("{}\t{}\n".format(names[index], scores_cornell[index]))
 
     # Copy the best result (lower is better !)
-    shutil.copy(
-        os.path.join(indir, min(scores_cornell.keys(), key=scores_cornell.get)),
-        os.path.join(outdir, 'scoring_Cornell', "complexe_predit_score1.pdb")
-    )
+    export(ranks[0], os.path.join(outdir, 'scoring_Cornell', "complexe_predit_score1.pdb"))
 
     ##########
     # CUSTOM #
     ##########
 
     # Write the ordered results in a .tsv file
+    ranks = ranking(scores_custom)
     with open(os.path.join(outdir, 'scoring_maison', 'scores.tsv'), 'w') as f:
         f.write("file\tscore\n")
-        for filename, score in sorted(scores_custom.items(), key=operator.itemgetter(1)):
-            f.write("{}\t{}\n".format(filename, score))
+        for index in ranks:
+            f.write("{}\t{}\n".format(names[index], scores_custom[index]))
 
     # Copy the best result (lower is better !)
-    shutil.copy(
-        os.path.join(indir, min(scores_custom, key=scores_custom.get)),
-        os.path.join(outdir, 'scoring_maison', "complexe_predit_score2.pdb")
-    )
+    export(ranks[0], os.path.join(outdir, 'scoring_maison', "complexe_predit_score2.pdb"))
@@ -19,6 +19,9 @@ import types
 import dockerasmus
 import dockerasmus.score
 import dockerasmus.pdb
+import dockerasmus.ligand
+import dockerasmus.pose
+import dockerasmus.spatial
 
 
 from .utils import DATADIR
@@ -74,8 +77,18 @@ def load_tests(loader, tests, ignore):
         'nth': dockerasmus.utils.iterators.nth,
         'wordrange': dockerasmus.utils.iterators.wordrange,
         'method_requires': dockerasmus.utils.decorators.method_requires,
+        'apply_transform': dockerasmus.utils.matrices.apply_transform,
         'distance': dockerasmus.utils.matrices.distance,
         'normalized': dockerasmus.utils.matrices.normalized,
+        'CellList': dockerasmus.utils.grid.CellList,
+        'atomic_open': dockerasmus.utils.files.atomic_open,
+        'format_decimals': dockerasmus.utils.formatting.format_decimals,
+        'format_hybrid36': dockerasmus.utils.formatting.format_hybrid36,
+        'format_integers': dockerasmus.utils.formatting.format_integers,
+        'format_strings': dockerasmus.utils.formatting.format_strings,
+        'parse_decimals': dockerasmus.utils.parsing.parse_decimals,
+        'parse_hybrid36': dockerasmus.utils.parsing.parse_hybrid36,
+        'parse_integers': dockerasmus.utils.parsing.parse_integers,
         'maybe_import': dockerasmus.utils.maybe_import,
 
         # globs for dockerasmus.score
@@ -84,8 +97,28 @@ def load_tests(loader, tests, ignore):
         'Fabiola': dockerasmus.score.components.Fabiola,
         'Coulomb': dockerasmus.score.components.Coulomb,
 
+        # globs for ligand
+        'Ligand': dockerasmus.ligand.Ligand,
+
+        # globs for pose
+        'Pose': dockerasmus.pose.Pose,
+
+        # globs for spatial
+        'RotationMatrix': dockerasmus.spatial.RotationMatrix,
+        'TranslationMatrix': dockerasmus.spatial.TranslationMatrix,
+        'TransformMatrix': dockerasmus.spatial.TransformMatrix,
+        'pose_positions': dockerasmus.spatial.pose_positions,
+        'QuaternionMatrix': dockerasmus.spatial.QuaternionMatrix,
+        'fibonacci_sphere': dockerasmus.spatial.fibonacci_sphere,
+        'rotation_grid': dockerasmus.spatial.rotation_grid,
+
         # globs for pdb:
         'Protein': dockerasmus.pdb.Protein,
+        'Chain': dockerasmus.pdb.Chain,
+        'LRUCache': dockerasmus.pdb.cache.LRUCache,
+        'ParameterTable': dockerasmus.pdb.forcefield.ParameterTable,
+        'BondGraph': dockerasmus.pdb.topology.BondGraph,
+        'DecoyArchive': dockerasmus.pdb.DecoyArchive,
 
         # locals
         'arginine': dockerasmus.pdb.Protein.from_pdb_file(os.path.join(DATADIR, 'arginine.pdb'))['A'][-3],
@@ -0,0 +1,102 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import io
+import os
+import unittest
+import numpy
+
+from dockerasmus.ligand import Ligand
+from dockerasmus.pdb import Protein
+from dockerasmus.score import requirements
+
+from .utils import DATADIR
+
+
+class TestSDFReader(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.path = os.path.join(DATADIR, 'ligands.sdf')
+        with open(cls.path, 'rb') as f:
+            cls.data = f.read()
+
+    def test_iter(self):
+        ligands = list(Ligand.iter_sdf_file(self.path))
+        self.assertEqual([l.name for l in ligands], ['ethanol'] * 3 + ['acetate'])
+        self.assertEqual([len(l) for l in ligands], [4, 4, 4, 4])
+
+    def test_atoms(self):
+        ethanol = Ligand.from_sdf_file(self.path)
+        self.assertEqual(ethanol.elements.tolist(), ['C', 'C', 'O', 'H'])
+        self.assertEqual(ethanol.positions.shape, (4, 3))
+        self.assertEqual(ethanol.positions[0].tolist(), [0.0234, -0.0209, 0.0324])
+        self.assertEqual(ethanol.bonds.tolist(), [[0, 1], [1, 2], [2, 3]])
+        self.assertEqual(ethanol.properties['PUBCHEM_COMPOUND_CID'], '702')
+
+    def test_partial_charges(self):
+        ethanol = Ligand.from_sdf(io.BytesIO(self.data))
+        self.assertEqual(ethanol.atom_charges().tolist(), [0.28, 0.28, -0.68, 0.4])
+
+    def test_formal_charges(self):
+        acetate = list(Ligand.iter_sdf(io.BytesIO(self.data)))[-1]
+        self.assertEqual(acetate.atom_charges().tolist(), [0, 0, 0, -1])
+
+    def test_charges_field(self):
+        with self.assertRaises(KeyError):
+            Ligand.from_sdf(io.BytesIO(self.data), charges_field='missing')
+        sdf = self.data.replace(b"PUBCHEM_COMPOUND_CID>\n702", b"q>\n1 2 3 4")
+        ethanol = Ligand.from_sdf(io.BytesIO(sdf), charges_field='q')
+        self.assertEqual(ethanol.atom_charges().tolist(), [1, 2, 3, 4])
+
+    def test_streaming(self):
+        # records are parsed as soon as they are read
+        lines = iter(self.data.splitlines(True))
+        ligands = Ligand.iter_sdf(lines)
+        next(ligands)
+        self.assertTrue(next(lines).startswith(b"ethanol"))
+
+    def test_no_trailing_delimiter(self):
+        sdf = self.data[:self.data.index(b"$$$$")]
+        self.assertEqual(len(list(Ligand.iter_sdf(io.BytesIO(sdf)))), 1)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Ligand.from_sdf(io.BytesIO(self.data[:200] + b"$$$$\n"))
+        v3000 = self.data.replace(b"0999 V2000", b"0999 V3000", 1)
+        with self.assertRaises(ValueError):
+            Ligand.from_sdf(io.BytesIO(v3000))
+
+
+class TestLigand(unittest.TestCase):
+
+    def test_parameters(self):
+        ligand = Ligand("test", ["C", "N", "S"], numpy.zeros((3, 3)))
+        self.assertEqual(ligand.atom_charges().tolist(), [0, 0, 0])
+        self.assertEqual(ligand.atom_pwd().tolist(), [0.1094, 0.17, 0.25])
+        self.assertEqual(ligand.atom_radius().tolist(), [1.908, 1.824, 2.0])
+
+    def test_halogens(self):
+        ligand = Ligand("test", ["C", "F", "Cl", "Br", "I", "P"], numpy.zeros((6, 3)))
+        self.assertEqual(ligand.atom_pwd().tolist(), [0.1094, 0.061, 0.265, 0.32, 0.4, 0.2])
+        self.assertEqual(ligand.atom_radius().tolist(), [1.908, 1.75, 1.948, 2.22, 2.35, 2.1])
+
+    def test_cached_parameters(self):
+        ligand = Ligand("test", ["C", "N", "S"], numpy.zeros((3, 3)))
+        self.assertIs(ligand.atom_pwd(), ligand.atom_pwd())
+        self.assertIs(ligand.atom_radius(), ligand.atom_radius())
+        moved = ligand.transform(numpy.identity(4))
+        self.assertIs(moved.atom_radius(), ligand.atom_radius())
+
+    def test_unknown_element(self):
+        ligand = Ligand("test", ["Xe"], numpy.zeros((1, 3)))
+        with self.assertRaises(KeyError):
+            ligand.atom_pwd()
+
+    def test_requirements(self):
+        receptor = Protein.from_pdb_file(os.path.join(DATADIR, 'barstar.native.pdb.gz'))
+        ligand = Ligand.from_sdf_file(os.path.join(DATADIR, 'ligands.sdf'))
+        self.assertEqual(requirements.distance(receptor, ligand).shape, (1402, 4))
+        for func in (requirements.charge, requirements.vdw_radius, requirements.potential_well_depth):
+            self.assertEqual([len(v) for v in func(receptor, ligand)], [1402, 4])
@@ -0,0 +1,100 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+
+from dockerasmus import spatial
+from dockerasmus.pdb import Protein, DecoyArchive
+
+from ..utils import DATADIR
+
+
+class TestDecoyArchive(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.template = Protein.from_pdb_file(os.path.join(DATADIR, 'barstar.native.pdb.gz'))
+        cls.transforms = [
+            spatial.RotationMatrix(0.1 * i, -0.2 * i, 0.3 * i).dot(
+                spatial.TranslationMatrix(i, 2 * i, -i))
+                    for i in range(4)
+        ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.archive = DecoyArchive(
+            self.template, self.transforms, names=["d{}.pdb".format(i) for i in range(4)])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assertSamePose(self, p1, p2):
+        self.assertEqual([a.id for a in p1.iteratoms()], [a.id for a in p2.iteratoms()])
+        self.assertEqual([a.name for a in p1.iteratoms()], [a.name for a in p2.iteratoms()])
+        numpy.testing.assert_allclose(
+            numpy.array([a.pos for a in p1.iteratoms()]),
+            numpy.array([a.pos for a in p2.iteratoms()]),
+            atol=1e-9,
+        )
+
+    def test_getitem(self):
+        for i, matrix in enumerate(self.transforms):
+            expected = spatial.apply_transformation_matrix(self.template, matrix)
+            self.assertSamePose(self.archive[i], expected)
+            self.assertEqual(self.archive[i].name, "d{}.pdb".format(i))
+        self.assertSamePose(self.archive[-1], self.archive[3])
+        with self.assertRaises(IndexError):
+            self.archive[4]
+
+    def test_iter(self):
+        poses = list(self.archive)
+        self.assertEqual(len(poses), len(self.archive))
+        for pose, matrix in zip(poses, self.transforms):
+            self.assertSamePose(pose, spatial.apply_transformation_matrix(self.template, matrix))
+
+    def test_positions(self):
+        positions = self.archive.positions()
+        self.assertEqual(positions.shape, (4, len(list(self.template.iteratoms())), 3))
+        for pose, expected in zip(positions, self.archive):
+            numpy.testing.assert_allclose(
+                pose, numpy.array([a.pos for a in expected.iteratoms()]))
+        batches = list(self.archive.iter_positions(batch_size=3))
+        self.assertEqual([len(b) for b in batches], [3, 1])
+        numpy.testing.assert_array_equal(numpy.concatenate(batches), positions)
+
+    def test_dump_load(self):
+        path = os.path.join(self.tmpdir, 'decoys.npz')
+        self.archive.dump(path)
+        loaded = DecoyArchive.load(path)
+        self.assertEqual(loaded.names.tolist(), self.archive.names.tolist())
+        numpy.testing.assert_array_equal(loaded.transforms, self.archive.transforms)
+        for pose, expected in zip(loaded, self.archive):
+            self.assertSamePose(pose, expected)
+        self.assertEqual(os.listdir(self.tmpdir), ['decoys.npz'])
+
+    def test_load_invalid(self):
+        path = os.path.join(self.tmpdir, 'other.npz')
+        numpy.savez(path, x=numpy.zeros(3))
+        with self.assertRaises(ValueError):
+            DecoyArchive.load(path)
+
+    def test_from_poses(self):
+        archive = DecoyArchive.from_poses(self.archive)
+        numpy.testing.assert_allclose(archive.transforms, self.archive.transforms, atol=1e-9)
+        numpy.testing.assert_allclose(archive.positions(), self.archive.positions(), atol=1e-9)
+
+    def test_from_poses_not_rigid(self):
+        pose = self.archive[1]
+        next(pose.iteratoms()).x += 5
+        with self.assertRaises(ValueError):
+            DecoyArchive.from_poses([self.template, pose])
+
+    def test_names(self):
+        self.assertEqual(DecoyArchive(self.template, self.transforms).names.tolist(), [""] * 4)
+        with self.assertRaises(ValueError):
+            DecoyArchive(self.template, self.transforms, names=["a"])
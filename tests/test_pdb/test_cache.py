@@ -0,0 +1,99 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from dockerasmus.pdb import Protein, cache
+
+from ..utils import DATADIR, mock
+
+
+class TestCachedLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, '1brs.pdb.gz')
+        shutil.copy(os.path.join(DATADIR, '1brs.pdb.gz'), self.path)
+        cache.CACHE.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        cache.CACHE.clear()
+
+    def _load_counting_parses(self):
+        parse = Protein._parse_pdb_atom_columns
+        with mock.patch.object(Protein, '_parse_pdb_atom_columns', side_effect=parse) as m:
+            prot = Protein.from_pdb_file(self.path, cached=True)
+        return prot, m.call_count
+
+    def assertSameAtoms(self, prot1, prot2):
+        self.assertEqual(list(prot1.iteratoms()), list(prot2.iteratoms()))
+
+    def test_sidecar_created(self):
+        prot, parses = self._load_counting_parses()
+        self.assertEqual(parses, 1)
+        self.assertTrue(os.path.exists(cache.sidecar_path(self.path)))
+        self.assertSameAtoms(prot, Protein.from_pdb_file(self.path))
+
+    def test_memory_cache(self):
+        prot1, _ = self._load_counting_parses()
+        prot2, parses = self._load_counting_parses()
+        self.assertEqual(parses, 0)
+        self.assertSameAtoms(prot1, prot2)
+        self.assertIsNot(prot1['A'], prot2['A'])
+
+    def test_sidecar_cache(self):
+        prot1, _ = self._load_counting_parses()
+        cache.CACHE.clear()
+        prot2, parses = self._load_counting_parses()
+        self.assertEqual(parses, 0)
+        self.assertSameAtoms(prot1, prot2)
+
+    def test_sidecar_touched(self):
+        self._load_counting_parses()
+        cache.CACHE.clear()
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        _, parses = self._load_counting_parses()
+        self.assertEqual(parses, 0)
+        # the sidecar was updated, so the file is not hashed again
+        cache.CACHE.clear()
+        with mock.patch.object(cache, 'file_hash') as file_hash:
+            _, parses = self._load_counting_parses()
+        self.assertEqual(parses, 0)
+        self.assertFalse(file_hash.called)
+
+    def test_sidecar_hashed_once(self):
+        with mock.patch.object(cache, 'file_hash') as file_hash:
+            self._load_counting_parses()
+        self.assertFalse(file_hash.called)
+        cache.CACHE.clear()
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        _, parses = self._load_counting_parses()
+        self.assertEqual(parses, 0)
+
+    def test_sidecar_outdated(self):
+        self._load_counting_parses()
+        cache.CACHE.clear()
+        shutil.copy(os.path.join(DATADIR, 'barstar.native.pdb.gz'), self.path)
+        prot, parses = self._load_counting_parses()
+        self.assertEqual(parses, 1)
+        self.assertSameAtoms(prot, Protein.from_pdb_file(self.path))
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_eviction(self):
+        lru = cache.LRUCache(maxsize=2)
+        lru[1], lru[2] = 'a', 'b'
+        self.assertEqual(lru[1], 'a')
+        lru[3] = 'c'
+        self.assertEqual(list(lru), [1, 3])
+        lru.maxsize = 1
+        lru[4] = 'd'
+        self.assertEqual(list(lru), [4])
@@ -0,0 +1,129 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import numpy
+
+from dockerasmus.pdb import Protein, DCDTrajectory
+from dockerasmus.score import requirements
+
+from ..utils import DATADIR
+
+
+def write_dcd(path, frames, cells=None, order='<', timestep=0.5, interval=10):
+    """Write a minimal CHARMM-style DCD file with the given frames.
+    """
+    def record(data):
+        size = struct.pack(str(order + 'i'), len(data))
+        return size + data + size
+    control = [len(frames), 0, interval, 0, 0, 0, 0, 0, 0]
+    header = struct.pack(
+        str(order + '4s9if10i'), b'CORD', *(control + [timestep, int(cells is not None)] + [0] * 8 + [24]))
+    title = struct.pack(str(order + 'i'), 1) + b'test'.ljust(80)
+    with open(path, 'wb') as f:
+        f.write(record(header) + record(title) + record(struct.pack(str(order + 'i'), frames.shape[1])))
+        for i, frame in enumerate(frames):
+            if cells is not None:
+                f.write(record(numpy.asarray(cells[i], dtype=order + 'f8').tobytes()))
+            for axis in range(3):
+                f.write(record(numpy.asarray(frame[:, axis], dtype=order + 'f4').tobytes()))
+
+
+class TestDCDTrajectory(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.barstar = Protein.from_pdb_file(os.path.join(DATADIR, 'barstar.native.pdb.gz'))
+        cls.barnase = Protein.from_pdb_file(os.path.join(DATADIR, 'barnase.native.pdb.gz'))
+        positions = cls.barstar.atom_positions()
+        cls.frames = numpy.stack([positions + i for i in range(5)]).astype(numpy.float32)
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'traj.dcd')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_frames(self):
+        for order in '<>':
+            write_dcd(self.path, self.frames, order=order)
+            traj = DCDTrajectory(self.path, self.barstar)
+            self.assertEqual(len(traj), 5)
+            self.assertEqual(traj.frames.shape, self.frames.shape)
+            numpy.testing.assert_array_equal(traj.frames, self.frames)
+            self.assertIsNone(traj.unit_cells)
+            self.assertEqual(traj.interval, 10)
+            self.assertEqual(traj.timestep, 0.5)
+
+    def test_unit_cells(self):
+        cells = numpy.arange(30, dtype=float).reshape(5, 6)
+        write_dcd(self.path, self.frames, cells=cells)
+        traj = DCDTrajectory(self.path, self.barstar)
+        numpy.testing.assert_array_equal(traj.frames, self.frames)
+        numpy.testing.assert_array_equal(traj.unit_cells, cells)
+
+    def test_zero_copy(self):
+        write_dcd(self.path, self.frames)
+        traj = DCDTrajectory(self.path, self.barstar)
+        frame = traj[3]
+        self.assertTrue(numpy.shares_memory(frame.atom_positions(), traj.frames))
+        self.assertFalse(traj.frames.flags.writeable)
+        numpy.testing.assert_array_equal(frame.atom_positions(), self.frames[3])
+        atom = next(frame.iteratoms())
+        numpy.testing.assert_array_equal(atom.pos, self.frames[3][0])
+        self.assertIsNot(atom, next(self.barstar.iteratoms()))
+
+    def test_move_atom(self):
+        write_dcd(self.path, self.frames)
+        traj = DCDTrajectory(self.path, self.barstar)
+        frame = traj[1]
+        next(frame.iteratoms()).x += 1
+        self.assertEqual(frame.atom_positions()[0, 0], self.frames[1, 0, 0] + 1)
+        numpy.testing.assert_array_equal(traj.frames, self.frames)
+        numpy.testing.assert_array_equal(traj[1].atom_positions(), self.frames[1])
+
+    def test_to_protein(self):
+        write_dcd(self.path, self.frames)
+        traj = DCDTrajectory(self.path, self.barstar)
+        protein = traj.to_protein(2)
+        self.assertEqual(
+            [a.name for a in protein.iteratoms()], [a.name for a in self.barstar.iteratoms()])
+        numpy.testing.assert_array_equal(protein.atom_positions(), self.frames[2])
+
+    def test_scoring_requirements(self):
+        write_dcd(self.path, self.frames)
+        traj = DCDTrajectory(self.path, self.barstar)
+        for i, frame in enumerate(traj):
+            expected = traj.to_protein(i)
+            numpy.testing.assert_allclose(
+                requirements.distance(self.barnase, frame),
+                requirements.distance(self.barnase, expected),
+                rtol=1e-6,
+            )
+            for func in (requirements.charge, requirements.vdw_radius,
+                         requirements.potential_well_depth):
+                for actual, desired in zip(func(self.barnase, frame), func(self.barnase, expected)):
+                    numpy.testing.assert_array_equal(actual, desired)
+
+    def test_truncated_frame(self):
+        write_dcd(self.path, self.frames)
+        with open(self.path, 'ab') as f:
+            f.write(b'\x00' * 100)
+        self.assertEqual(len(DCDTrajectory(self.path, self.barstar)), 5)
+
+    def test_invalid(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\x00' * 100)
+        with self.assertRaises(ValueError):
+            DCDTrajectory(self.path, self.barstar)
+
+    def test_wrong_topology(self):
+        write_dcd(self.path, self.frames)
+        with self.assertRaises(ValueError):
+            DCDTrajectory(self.path, self.barnase)
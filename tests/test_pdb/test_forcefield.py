@@ -0,0 +1,46 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import unittest
+import numpy
+
+from dockerasmus.pdb import Protein, Chain, Residue, Atom
+from dockerasmus.pdb.forcefield import AMINOACID_PARAMETERS
+
+from ..utils import DATADIR
+
+
+class TestParameterTable(unittest.TestCase):
+
+    def assertSameAsAtoms(self, protein):
+        parameters = AMINOACID_PARAMETERS.gather(protein._atom_store())
+        for key, attr in [('charges', 'charge'), ('pwd', 'pwd'), ('radius', 'radius')]:
+            expected = [getattr(atom, attr) for atom in protein.iteratoms()]
+            numpy.testing.assert_array_equal(parameters[key], expected)
+
+    def test_same_as_atoms(self):
+        for name in ('1brs.pdb.gz', 'barnase.native.pdb.gz', 'barstar.native.pdb.gz'):
+            self.assertSameAsAtoms(Protein.from_pdb_file(os.path.join(DATADIR, name)))
+
+    def test_histidine(self):
+        protein = Protein.from_pdb_file(os.path.join(DATADIR, 'barnase.native.pdb.gz'))
+        residue = protein.residue(18)
+        self.assertEqual(residue.name, 'HIE')
+        del residue['HE2']
+        residue['HD1'] = Atom(0, 0, 0, 99999, 'HD1', residue)
+        self.assertEqual(residue.name, 'HID')
+        self.assertSameAsAtoms(protein)
+
+    def test_unknown_atom(self):
+        residue = Residue(1, "GLY")
+        residue["XX"] = Atom(0, 0, 0, 1, "XX", residue)
+        protein = Protein(chains={"A": Chain("A", residues={1: residue})})
+        parameters = AMINOACID_PARAMETERS.gather(protein._atom_store())
+        self.assertTrue(numpy.isnan(parameters['charges']).all())
+        with self.assertRaises(KeyError):
+            protein.atom_charges()
+
+    def test_empty(self):
+        self.assertEqual(len(Protein().atom_radius()), 0)
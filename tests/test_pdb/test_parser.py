@@ -2,7 +2,9 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import io
 import os
+import gzip
 import unittest
 import numpy
 
@@ -58,3 +60,312 @@ class TestParserOnArginine(unittest.TestCase):
                 self.arginine[atom_name].pos,
                 numpy.array([pos['x'], pos['y'], pos['z']])
             )
+
+
+class TestVectorizedParser(unittest.TestCase):
+
+    @staticmethod
+    def _load(name, vectorized):
+        path = os.path.join(DATADIR, name)
+        with (gzip.open if path.endswith('.gz') else open)(path, 'rb') as f:
+            return Protein.from_pdb(f, vectorized=vectorized)
+
+    def assertSameProtein(self, prot1, prot2):
+        self.assertEqual(list(prot1.keys()), list(prot2.keys()))
+        for chain1, chain2 in zip(prot1.itervalues(), prot2.itervalues()):
+            self.assertEqual(list(chain1.keys()), list(chain2.keys()))
+            for res1, res2 in zip(chain1.itervalues(), chain2.itervalues()):
+                self.assertEqual(res1.name, res2.name)
+                self.assertEqual(set(res1.keys()), set(res2.keys()))
+        for atom1, atom2 in zip(prot1.iteratoms(), prot2.iteratoms()):
+            self.assertEqual(atom1, atom2)
+            self.assertIs(atom1.residue[atom1.name], atom1)
+
+    def test_arginine(self):
+        self.assertSameProtein(
+            self._load('arginine.pdb', True),
+            self._load('arginine.pdb', False),
+        )
+
+    def test_complex(self):
+        self.assertSameProtein(
+            self._load('1brs.pdb.gz', True),
+            self._load('1brs.pdb.gz', False),
+        )
+
+    def test_columns(self):
+        with open(os.path.join(DATADIR, 'arginine.pdb'), 'rb') as f:
+            columns = Protein._parse_pdb_atom_columns(f.read())
+        self.assertEqual(columns['serial'].tolist(), list(range(32, 54, 2)))
+        self.assertEqual(columns['name'][:3].tolist(), ['N', 'CA', 'C'])
+        self.assertEqual(set(columns['altLoc'].tolist()), {'A'})
+        self.assertEqual(set(columns['resSeq'].tolist()), {-3})
+        numpy.testing.assert_array_equal(
+            columns['positions'][0], [11.281, 86.699, 94.383])
+
+    def test_short_lines(self):
+        buffer = (
+            b"HEADER\n"
+            b"ATOM      1  N   GLY A   1      -1.000   2.500  10.125\r\n"
+            b"ATOM      2  CA  GLY A   1       0.000   0.000   0.000"
+        )
+        prot = Protein.from_pdb(io.BytesIO(buffer))
+        self.assertEqual(set(prot['A'][1].keys()), {'N', 'CA'})
+        numpy.testing.assert_array_equal(prot['A'][1]['N'].pos, [-1, 2.5, 10.125])
+
+    def test_empty(self):
+        self.assertEqual(Protein.from_pdb(io.BytesIO(b"")), Protein())
+
+
+class TestModels(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join(DATADIR, 'arginine.pdb'), 'rb') as f:
+            atoms = [l for l in f if l.startswith(b"ATOM  ")]
+        cls.buffer = b"HEADER    TEST\n"
+        for serial in range(1, 6):
+            cls.buffer += "MODEL     {:4}\n".format(serial).encode('ascii')
+            cls.buffer += b"".join(
+                l[:30] + "{:8.3f}".format(serial).encode('ascii') + l[38:]
+                for l in atoms
+            )
+            cls.buffer += b"ENDMDL\n"
+        cls.buffer += b"END\n"
+
+    def test_iter_models(self):
+        models = list(Protein.iter_pdb_models(io.BytesIO(self.buffer)))
+        self.assertEqual([m.id for m in models], [1, 2, 3, 4, 5])
+        for serial, model in enumerate(models, 1):
+            self.assertEqual(len(list(model.iteratoms())), 11)
+            self.assertTrue(all(a.x == serial for a in model.iteratoms()))
+
+    def test_iter_models_small_blocks(self):
+        models = Protein.iter_pdb_models(io.BytesIO(self.buffer), blocksize=7)
+        self.assertEqual([m.id for m in models], [1, 2, 3, 4, 5])
+
+    def test_iter_models_without_models(self):
+        path = os.path.join(DATADIR, 'arginine.pdb')
+        models = list(Protein.iter_pdb_models_file(path))
+        self.assertEqual(len(models), 1)
+        self.assertIs(models[0].id, None)
+        self.assertEqual(
+            list(models[0].iteratoms()),
+            list(Protein.from_pdb_file(path).iteratoms()),
+        )
+
+    def test_index(self):
+        index = Protein.index_pdb_models(io.BytesIO(self.buffer), blocksize=5)
+        self.assertEqual(len(index), 6)
+        self.assertEqual(index[-1], len(self.buffer))
+        for offset in index[:-1]:
+            self.assertTrue(self.buffer[offset:].startswith(b"MODEL "))
+
+    def test_random_access(self):
+        handle = io.BytesIO(self.buffer)
+        index = Protein.index_pdb_models(handle)
+        for k in (3, 0, -1):
+            model = Protein.from_pdb_model(handle, index, k)
+            self.assertEqual(model.id, [1, 2, 3, 4, 5][k])
+            self.assertEqual(model['A'][-3]['CA'].x, model.id)
+        with self.assertRaises(IndexError):
+            Protein.from_pdb_model(handle, index, 5)
+
+
+class TestMMCIFParser(unittest.TestCase):
+
+    ASSEMBLY = b"""data_TEST
+loop_
+_atom_site.group_PDB
+_atom_site.id
+_atom_site.label_atom_id
+_atom_site.label_comp_id
+_atom_site.label_asym_id
+_atom_site.label_seq_id
+_atom_site.Cartn_x
+_atom_site.Cartn_y
+_atom_site.Cartn_z
+_atom_site.auth_seq_id
+_atom_site.auth_asym_id
+_atom_site.pdbx_PDB_model_num
+ATOM   1 P     A   AAA 1 1.0   -2.5  3.25  10 AAA 1
+ATOM   2 "O5'" A   AAA 1 1.5   2     -3.125 10 AAA 1
+ATOM   3 N     GLY BB  2 0.0   0.0   0.0   11 BB  1
+HETATM 4 O     HOH CCC . 5.0   5.0   5.0   12 CCC 1
+ATOM   5 P     A   AAA 1 9.0   9.0   9.0   10 AAA 2
+#
+loop_
+_other.item
+x
+"""
+
+    def test_arginine(self):
+        cif = Protein.from_mmcif_file(os.path.join(DATADIR, 'arginine.cif'))
+        pdb = Protein.from_pdb_file(os.path.join(DATADIR, 'arginine.pdb'))
+        self.assertEqual(list(cif.keys()), list(pdb.keys()))
+        self.assertEqual(list(cif['A'].keys()), list(pdb['A'].keys()))
+        self.assertEqual(cif['A'][-3].name, 'ARG')
+        self.assertEqual(list(cif.iteratoms()), list(pdb.iteratoms()))
+
+    def test_assembly(self):
+        prot = Protein.from_mmcif(io.BytesIO(self.ASSEMBLY))
+        self.assertEqual(list(prot.keys()), ['AAA', 'BB'])
+        self.assertEqual(set(prot['AAA'][10].keys()), {"P", "O5'"})
+        self.assertEqual(prot['BB'][11].name, 'GLY')
+        numpy.testing.assert_array_equal(
+            prot.atom_positions(),
+            [[1.0, -2.5, 3.25], [1.5, 2, -3.125], [0, 0, 0]],
+        )
+
+    def test_text_fields_and_comments(self):
+        buffer = b"""data_TEST
+loop_
+_atom_site.id
+_atom_site.label_atom_id
+_atom_site.label_comp_id
+_atom_site.label_asym_id
+_atom_site.label_seq_id
+_atom_site.Cartn_x
+_atom_site.Cartn_y
+_atom_site.Cartn_z
+1 N
+;GLY
+;
+A 1 1.0 2.0 3.0
+# a comment inside the loop
+2 CA
+;GLY
+_not_a_tag
+# not a comment
+;
+A 1 4.0 5.0 6.0
+3 '_C' GLY A 1 7.0 8.0 9.0
+_other.item x
+"""
+        prot = Protein.from_mmcif(io.BytesIO(buffer))
+        self.assertEqual(list(prot['A'][1].keys()), ['N', 'CA', '_C'])
+        self.assertEqual(prot['A'][1].name, 'GLY')
+        numpy.testing.assert_array_equal(
+            prot.atom_positions(), numpy.arange(1, 10).reshape(3, 3))
+
+    def test_unterminated_text_field(self):
+        with self.assertRaises(ValueError):
+            Protein.from_mmcif(io.BytesIO(
+                b"data_TEST\nloop_\n_atom_site.id\n_atom_site.Cartn_x\n1\n;text\n"
+            ))
+
+    def test_missing_loop(self):
+        with self.assertRaises(ValueError):
+            Protein.from_mmcif(io.BytesIO(b"data_TEST\n_entry.id TEST\n"))
+
+    def test_malformed_loop(self):
+        with self.assertRaises(ValueError):
+            Protein.from_mmcif(io.BytesIO(
+                b"data_TEST\nloop_\n_atom_site.id\n_atom_site.Cartn_x\n1\n"
+            ))
+
+
+class TestParallelParser(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.path = os.path.join(DATADIR, '1brs.pdb.gz')
+        cls.reference = Protein.from_pdb_file(cls.path)
+
+    def assertSameProtein(self, prot):
+        self.assertEqual(list(prot.keys()), list(self.reference.keys()))
+        self.assertEqual(list(prot.iteratoms()), list(self.reference.iteratoms()))
+        numpy.testing.assert_array_equal(
+            prot.atom_positions(), self.reference.atom_positions())
+
+    def test_threads(self):
+        for jobs in (2, 3, 7):
+            self.assertSameProtein(Protein.from_pdb_file(self.path, jobs=jobs))
+
+    def test_processes(self):
+        self.assertSameProtein(
+            Protein.from_pdb_file(self.path, jobs=3, processes=True))
+
+    def test_more_jobs_than_lines(self):
+        with open(os.path.join(DATADIR, 'arginine.pdb'), 'rb') as f:
+            buffer = f.read()
+        prot = Protein.from_pdb(io.BytesIO(buffer), jobs=32)
+        self.assertEqual(
+            list(prot.iteratoms()),
+            list(Protein.from_pdb(io.BytesIO(buffer)).iteratoms()),
+        )
+
+
+class TestLargeStructures(unittest.TestCase):
+
+    @staticmethod
+    def _columns(n_atoms, n_chains=2):
+        index = numpy.arange(n_atoms)
+        chain = index * n_chains // n_atoms
+        return {
+            'serial': index + 1,
+            'name': numpy.array(['N', 'CA', 'C', 'O'])[index % 4],
+            'altLoc': numpy.full(n_atoms, '', dtype='U1'),
+            'resName': numpy.full(n_atoms, 'GLY'),
+            'chainID': numpy.array(['A', 'B'])[chain],
+            'resSeq': index // 4 + 1,
+            'iCode': numpy.full(n_atoms, '', dtype='U1'),
+            'positions': numpy.zeros((n_atoms, 3)),
+        }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.columns = cls._columns(120000)
+        cls.serials = cls.columns['serial'].tolist()
+        cls.res_seqs = sorted(set(cls.columns['resSeq'].tolist()))
+
+    def test_hybrid36(self):
+        buffer = Protein._format_pdb_atom_columns(self.columns).tobytes()
+        self.assertIn(b"ATOM  A0000  O   GLY", buffer)
+        prot = Protein.from_pdb(io.BytesIO(buffer))
+        self.assertEqual([a.id for a in prot.iteratoms()], self.serials)
+        self.assertEqual(
+            sorted(r.id for c in prot.itervalues() for r in c.itervalues()), self.res_seqs)
+        self.assertEqual(prot.atom(100000).name, 'O')
+
+    def test_hybrid36_line_parser(self):
+        columns = {k: v[99990:100010] for k, v in self.columns.items()}
+        buffer = Protein._format_pdb_atom_columns(columns).tobytes()
+        prot = Protein.from_pdb(io.BytesIO(buffer), vectorized=False)
+        self.assertEqual([a.id for a in prot.iteratoms()], self.serials[99990:100010])
+
+    def test_wrapped_decimal(self):
+        columns = dict(self.columns)
+        columns['serial'] = columns['serial'] % 100000
+        columns['resSeq'] = columns['resSeq'] % 10000
+        buffer = Protein._format_pdb_atom_columns(columns).tobytes()
+        self.assertNotIn(b"A0000", buffer)
+        prot = Protein.from_pdb(io.BytesIO(buffer))
+        serials = [a.id for a in prot.iteratoms()]
+        self.assertEqual(serials, self.serials)
+        # residue numbers are unwrapped within each chain, so that
+        # no two residues of a chain share the same number
+        self.assertEqual(
+            sum(len(c) for c in prot.itervalues()), len(self.res_seqs))
+        self.assertEqual(len(serials), len(self.serials))
+
+    def test_unwrap_groups(self):
+        values = numpy.array([9998, 9999, 0, 1, 5, 6, 9999, 0])
+        groups = numpy.array(['A', 'A', 'A', 'A', 'B', 'B', 'B', 'B'])
+        self.assertEqual(
+            Protein._unwrap_numbers(values, 10000, groups).tolist(),
+            [9998, 9999, 10000, 10001, 5, 6, 9999, 10000],
+        )
+
+    def test_restart_preserved(self):
+        # numbering restarting far from the end of the field is not a wrap
+        values = numpy.array([5000, 5001, 1, 2, 99950, 99999, 3, 4])
+        self.assertEqual(
+            Protein._unwrap_numbers(values, 100000).tolist(),
+            [5000, 5001, 1, 2, 99950, 99999, 100003, 100004],
+        )
+        prot = Protein.from_pdb(io.BytesIO(
+            b"ATOM  60000  CA  GLY A  50       0.000   0.000   0.000\n"
+            b"ATOM      1  CA  GLY B   1       0.000   0.000   0.000\n"
+        ))
+        self.assertEqual([a.id for a in prot.iteratoms()], [60000, 1])
@@ -5,9 +5,12 @@ from __future__ import unicode_literals
 import os
 import unittest
 import collections
+import numpy
 
 from dockerasmus.pdb import Protein, Chain, Atom, Residue
 from dockerasmus.constants import ATOMIC_MASSES
+from dockerasmus.utils import maybe_import
+from dockerasmus.utils.matrices import distance
 
 from ..utils import DATADIR
 
@@ -61,6 +64,23 @@ class TestProperties(TestProtein):
     def test_atom_charges(self):
         self.assertEqual(list(self.prot.atom_charges()), [-0.0518, -0.1102])
 
+    def test_moved_atom(self):
+        prot = self.prot.copy()
+        self.assertEqual(list(prot.mass_center), [0, 0, .5])
+        prot['A'][1]['C2'].z = 3
+        self.assertEqual(list(prot.mass_center), [0, 0, 1.5])
+        self.assertEqual(prot.radius, 1.5)
+
+    def test_residue_geometry(self):
+        self.assertEqual(list(self.prot.residue_masses()), [2*ATOMIC_MASSES['C']])
+        self.assertEqual(self.prot.residue_mass_centers().tolist(), [[0, 0, .5]])
+        self.assertEqual(list(self.prot.residue_gyration_radii()), [.5])
+        inertia = ATOMIC_MASSES['C'] / 2
+        self.assertEqual(
+            self.prot.residue_inertia_tensors().tolist(),
+            [[[inertia, 0, 0], [0, inertia, 0], [0, 0, 0]]]
+        )
+
 
 class TestMagicMethods(TestProtein):
 
@@ -291,3 +311,196 @@ class TestMethods(TestProtein):
         with self.assertRaises(TypeError):
             for r1, r2 in self.prot2.interface(1):
                 pass
+
+
+class TestSelection(unittest.TestCase):
+
+    def setUp(self):
+        self.protein = Protein.from_pdb_file(os.path.join(DATADIR, '1brs.pdb.gz'))
+        self.atoms = list(Protein.from_pdb_file(os.path.join(DATADIR, '1brs.pdb.gz')).iteratoms())
+
+    def assertSelects(self, mask, predicate):
+        self.assertEqual(mask.tolist(), [bool(predicate(atom)) for atom in self.atoms])
+
+    def test_select(self):
+        mask = self.protein.select(chains='A')
+        self.assertTrue(self.protein._lazy)
+        self.assertSelects(mask, lambda a: a.residue in self.protein['A'].values())
+        self.assertSelects(self.protein.select(residues=range(3, 6)), lambda a: 3 <= a.residue.id < 6)
+        self.assertSelects(self.protein.select(resnames=['GLY', 'ALA']), lambda a: a.residue._name in ('GLY', 'ALA'))
+        self.assertSelects(self.protein.select(names='CA'), lambda a: a.name == 'CA')
+        self.assertSelects(self.protein.select(backbone=True, heavy=True), lambda a: a.name in ('N', 'CA', 'C', 'O'))
+        self.assertSelects(self.protein.select(heavy=True), lambda a: not a.name.startswith('H'))
+
+    def test_select_near(self):
+        barstar = self.protein['D':]
+        mask = self.protein.select(chains=['A', 'B', 'C'], near=barstar, distance=5)
+        chains = self.protein.select(chains=['A', 'B', 'C'])
+        distances = distance(self.protein.atom_positions(), barstar.atom_positions())
+        self.assertTrue(mask.any())
+        self.assertEqual(mask.tolist(), (chains & (distances < 5).any(axis=1)).tolist())
+        by_residue = self.protein.select(
+            chains=['A', 'B', 'C'], near=barstar, distance=5, by_residue=True)
+        residues = {id(a.residue) for a, m in zip(self.protein.iteratoms(), mask) if m}
+        self.assertSelects(by_residue, lambda a: id(self.protein.atom(a.id).residue) in residues)
+
+    def test_spatial_index(self):
+        index = self.protein.spatial_index()
+        self.assertIs(self.protein.spatial_index(), index)
+        self.assertTrue(self.protein._lazy)
+        atom = self.protein.atom(1)
+        atom.x += 1
+        self.assertIsNot(self.protein.spatial_index(), index)
+        self.assertIs(self.protein.nearest_atom(atom.pos), atom)
+
+    def test_nearest_atom_lookup(self):
+        atoms = list(self.protein.iteratoms())
+        for atom in atoms[::97]:
+            self.assertIs(self.protein.nearest_atom(atom.pos), atom)
+        # atoms stored under another name are found by serial number
+        residue = atoms[0].residue
+        residue['X'] = atom = residue.pop(atoms[0].name)
+        self.assertIs(self.protein.nearest_atom(atom.pos), atom)
+        # chains and residues stored under another key are found as well
+        self.protein['Z'] = self.protein.pop('D')
+        atom = self.protein['Z'][next(iter(self.protein['Z']))]['CA']
+        self.assertIs(self.protein.nearest_atom(atom.pos), atom)
+        chain = self.protein['A']
+        residue = chain[next(iter(chain))]
+        chain[1000] = chain.pop(next(iter(chain)))
+        self.assertIs(self.protein.nearest_atom(residue['CA'].pos), residue['CA'])
+
+    def test_pairs_within(self):
+        barstar = self.protein['D':]
+        i, j, d = self.protein.pairs_within(barstar, 4.0)
+        expected = distance(self.protein.atom_positions(), barstar.atom_positions())
+        numpy.testing.assert_array_equal((i, j), numpy.nonzero(expected < 4.0))
+        numpy.testing.assert_allclose(d, expected[i, j])
+
+    def test_subset(self):
+        mask = self.protein.select(chains='D', backbone=True)
+        subset = self.protein.subset(mask)
+        self.assertTrue(subset._lazy)
+        numpy.testing.assert_array_equal(subset.atom_positions(), self.protein.atom_positions()[mask])
+        numpy.testing.assert_array_equal(subset.atom_charges(), self.protein.atom_charges()[mask])
+        self.assertEqual(list(subset.keys()), ['D'])
+        self.assertEqual([a.id for a in subset.iteratoms()], [a.id for a, m in zip(self.atoms, mask) if m])
+        with self.assertRaises(ValueError):
+            self.protein.subset(mask[1:])
+
+    def test_subset_shares_coordinates(self):
+        subset = self.protein.subset(self.protein.select(names='CA'))
+        atom = next(subset.iteratoms())
+        atom.x += 10
+        self.assertEqual(self.protein.atom(atom.id).x, atom.x)
+        self.protein.atom(atom.id).y += 10
+        self.assertEqual(subset.atom_positions()[0, 1], atom.y)
+        self.assertEqual(subset.atom_positions()[0].tolist(), self.protein.atom(atom.id).pos.tolist())
+
+    def test_subset_detached(self):
+        subset = self.protein.subset(self.protein.select(names='CA'))
+        positions = subset.atom_positions().copy()
+        atom_id = list(subset.iteratoms())[-1].id
+        del self.protein['A']
+        self.protein.atom_positions()
+        self.protein.atom(atom_id).x += 10
+        numpy.testing.assert_array_equal(subset.atom_positions(), positions)
+
+    def test_slice_positions(self):
+        barstar = self.protein['D':]
+        positions = barstar.atom_positions().copy()
+        atom = next(barstar.iteratoms())
+        self.protein.atom(atom.id).x += 10
+        self.assertEqual(barstar.atom_positions()[0, 0], positions[0, 0] + 10)
+
+    def test_interface_residues(self):
+        barnase, barstar = self.protein['A':'B'], self.protein['D':'E']
+        i, j = barnase.interface_residues(barstar)
+        d = distance(barnase.atom_positions(), barstar.atom_positions())
+        residues_self = [a.residue for a in barnase.iteratoms()]
+        residues_other = [a.residue for a in barstar.iteratoms()]
+        expected = []
+        for k, l in zip(*numpy.nonzero(d < 4.5)):
+            couple = (residues_self[k], residues_other[l])
+            if not any(couple[0] is r1 and couple[1] is r2 for r1, r2 in expected):
+                expected.append(couple)
+        found = list(barnase.interface(barstar))
+        self.assertEqual(len(i), len(expected))
+        self.assertEqual(len(found), len(expected))
+        for (r1, r2), (e1, e2) in zip(found, expected):
+            self.assertIs(r1, e1)
+            self.assertIs(r2, e2)
+        numpy.testing.assert_allclose(
+            barnase.residue_masses()[i], [r.mass for r, _ in expected])
+
+    def test_contact_map_duplicate_numbers(self):
+        barnase, barstar = self.protein['A':'D'], self.protein['D':]
+        cmap = barnase.contact_map(barstar)
+        for r1 in (barnase['C'][3], barnase['C'][50]):
+            for r2 in (barstar['F'][1], barstar['F'][35]):
+                expected = min(a1.distance_to(a2.pos) for a1 in r1.values() for a2 in r2.values())
+                self.assertAlmostEqual(cmap[r1.id, r2.id], expected)
+
+    def test_residue_contacts(self):
+        barnase, barstar = self.protein['A':'B'], self.protein['D':'E']
+        for mode in ('nearest', 'farthest', 'mass_center'):
+            dense = barnase._residue_distances(barstar, mode, block_size=1000)
+            i, j, d = barnase.residue_contacts(barstar, 12.0, mode)
+            expected_i, expected_j = numpy.nonzero(dense < 12.0)
+            self.assertEqual(i.tolist(), expected_i.tolist())
+            self.assertEqual(j.tolist(), expected_j.tolist())
+            numpy.testing.assert_allclose(d, dense[dense < 12.0])
+
+    @unittest.skipUnless(maybe_import('scipy'), 'scipy is not installed')
+    def test_sparse_contact_map(self):
+        barnase, barstar = self.protein['A':'B'], self.protein['D':'E']
+        dense = barnase.contact_map(barstar, mode='farthest')
+        sparse = barnase.contact_map(barstar, mode='farthest', cutoff=12.0).toarray()
+        numpy.testing.assert_allclose(sparse, numpy.where(dense < 12.0, dense, 0))
+
+
+class TestArrays(unittest.TestCase):
+
+    def setUp(self):
+        self.protein = Protein.from_pdb_file(os.path.join(DATADIR, '1brs.pdb.gz'))
+
+    def test_roundtrip(self):
+        records = self.protein.to_arrays()
+        self.assertEqual(len(records), len(self.protein.atom_positions()))
+        positions = numpy.stack([records['x'], records['y'], records['z']], axis=1)
+        protein = Protein.from_arrays(
+            positions, records['name'], records['resName'], records['resSeq'],
+            records['chainID'], records['serial'], records['altLoc'], records['iCode'],
+        )
+        self.assertTrue(protein._lazy)
+        self.assertEqual(protein, self.protein)
+        numpy.testing.assert_array_equal(protein.atom_charges(), self.protein.atom_charges())
+
+    def test_from_arrays(self):
+        positions = numpy.arange(12, dtype=float).reshape(4, 3)
+        protein = Protein.from_arrays(
+            positions, ['N', 'CA', 'N', 'CA'], 'GLY', [2, 2, 1, 1], 'A')
+        self.assertEqual([a.id for a in protein.iteratoms()], [1, 2, 3, 4])
+        self.assertEqual(list(protein['A'].keys()), [2, 1])
+        self.assertEqual(protein.residue(1)['CA'].pos.tolist(), [9, 10, 11])
+        self.assertIs(protein.atom_positions(), positions)
+        protein.atom(1).x = -1
+        self.assertEqual(positions[0, 0], -1)
+
+    def test_from_arrays_invalid(self):
+        with self.assertRaises(ValueError):
+            Protein.from_arrays(numpy.zeros((2, 3)), ['N'], 'GLY', 1, 'A')
+        with self.assertRaises(ValueError):
+            Protein.from_arrays(numpy.zeros((2, 2)), ['N', 'CA'], 'GLY', 1, 'A')
+
+    @unittest.skipUnless(maybe_import('pandas'), "pandas is not installed")
+    def test_dataframe(self):
+        frame = self.protein.to_arrays(dataframe=True)
+        records = self.protein.to_arrays()
+        self.assertEqual(list(frame.columns), list(records.dtype.names))
+        self.assertEqual(frame['name'].tolist(), records['name'].tolist())
+        protein = Protein.from_arrays(
+            frame[['x', 'y', 'z']].values, frame['name'], frame['resName'],
+            frame['resSeq'], frame['chainID'], frame['serial'],
+        )
+        self.assertEqual(protein, self.protein)
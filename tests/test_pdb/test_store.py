@@ -0,0 +1,292 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import io
+import os
+import gzip
+import pickle
+import shutil
+import tempfile
+import unittest
+import numpy
+
+from dockerasmus.pdb import Protein, Chain, Residue, Atom, cache
+
+from ..utils import DATADIR
+
+
+class TestAtomStore(unittest.TestCase):
+
+    def setUp(self):
+        self.protein = Protein.from_pdb_file(os.path.join(DATADIR, '1brs.pdb.gz'))
+
+    @staticmethod
+    def columns(rows):
+        serial, name, chain_id, res_seq = zip(*rows)
+        n = len(rows)
+        return {
+            'serial': numpy.array(serial), 'name': numpy.array(name),
+            'altLoc': numpy.full(n, '', dtype='U1'), 'resName': numpy.full(n, 'GLY'),
+            'chainID': numpy.array(chain_id), 'resSeq': numpy.array(res_seq),
+            'iCode': numpy.full(n, '', dtype='U1'),
+            'positions': numpy.arange(n * 3, dtype=float).reshape(n, 3),
+        }
+
+    def test_lazy_chains(self):
+        self.protein.atom_positions()
+        self.protein.atom_charges()
+        self.assertTrue(self.protein._lazy)
+        self.assertEqual(sorted(self.protein.keys()), ['A', 'B', 'C', 'D', 'E', 'F'])
+        self.assertFalse(self.protein._lazy)
+
+    def test_same_as_line_parser(self):
+        with gzip.open(os.path.join(DATADIR, '1brs.pdb.gz'), 'rb') as pdb_file:
+            expected = Protein.from_pdb(pdb_file, vectorized=False)
+        numpy.testing.assert_array_equal(self.protein.atom_positions(), expected.atom_positions())
+        numpy.testing.assert_array_equal(self.protein.atom_charges(), expected.atom_charges())
+        self.assertEqual(self.protein, expected)
+
+    def test_zero_copy(self):
+        positions = self.protein.atom_positions()
+        atom = self.protein.atom(1)
+        self.assertEqual(atom.pos.tolist(), positions[0].tolist())
+        atom.x += 5
+        self.assertEqual(positions[0, 0], atom.x)
+        self.assertIs(self.protein.atom_positions(), positions)
+
+    def test_structure_change(self):
+        residue = next(iter(self.protein['A'].values()))
+        n_atoms = len(self.protein.atom_positions())
+        del residue['CA']
+        positions = self.protein.atom_positions()
+        self.assertEqual(len(positions), n_atoms - 1)
+        self.assertEqual(len(self.protein.atom_charges()), n_atoms - 1)
+        atom = self.protein.atom(1)
+        atom.y = 0
+        self.assertEqual(positions[0, 1], 0)
+
+    def test_copy(self):
+        copy = self.protein.copy()
+        copy.atom(1).x = 0
+        self.assertNotEqual(self.protein.atom(1).x, 0)
+        self.assertNotEqual(copy.atom_positions()[0, 0], self.protein.atom_positions()[0, 0])
+
+    def test_copy_shares_positions(self):
+        positions = self.protein.atom_positions()
+        copy = self.protein.copy()
+        self.assertTrue(copy._lazy)
+        self.assertTrue(numpy.shares_memory(copy.atom_positions(), positions))
+        self.protein.atom(1).x += 1
+        self.assertFalse(numpy.shares_memory(copy.atom_positions(), self.protein.atom_positions()))
+        self.assertEqual(copy.atom(1).x + 1, self.protein.atom(1).x)
+
+    def test_write_after_copy(self):
+        protein = Protein.from_pdb_file(os.path.join(DATADIR, 'barstar.native.pdb.gz'))
+        x = protein.atom(1).x
+        copy = protein.copy()
+        protein.atom_positions()[0, 0] = x + 1
+        self.assertEqual(protein.atom(1).x, x + 1)
+        self.assertEqual(copy.atom(1).x, x)
+        # only the positions of the copy are read-only
+        self.assertFalse(copy.atom_positions().flags.writeable)
+        copy.atom(1).x = x + 2
+        self.assertEqual((protein.atom(1).x, copy.atom(1).x), (x + 1, x + 2))
+        copy = protein.copy()
+        protein.atom(1).x = x + 3
+        self.assertEqual((protein.atom(1).x, copy.atom(1).x), (x + 3, x + 1))
+
+    def test_position_copy(self):
+        atom = self.protein.atom(1)
+        mass_center, radius = self.protein.mass_center, self.protein.radius
+        pos = atom.pos
+        pos += [10, 0, 0]
+        self.assertEqual(atom.pos.tolist(), (pos - [10, 0, 0]).tolist())
+        self.assertEqual(self.protein.mass_center.tolist(), mass_center.tolist())
+        atom.x += 10
+        self.assertEqual(atom.pos.tolist(), pos.tolist())
+        self.assertNotEqual(self.protein.mass_center.tolist(), mass_center.tolist())
+        self.assertNotEqual(self.protein.radius, radius)
+
+    def test_pickle(self):
+        atom = self.protein.atom(1)
+        copy = pickle.loads(pickle.dumps(atom))
+        self.assertEqual(copy, atom)
+        self.assertEqual(copy.residue.id, atom.residue.id)
+        residue = pickle.loads(pickle.dumps(atom.residue))
+        self.assertEqual(residue, atom.residue)
+        residue[atom.name].x += 1
+        self.assertNotEqual(residue[atom.name].x, atom.x)
+        del residue[atom.name]
+        self.assertEqual(len(residue), len(atom.residue) - 1)
+
+    def test_delete_in_slice_of_subset(self):
+        for owner in ('slice', 'subset'):
+            subset = self.protein.subset(self.protein.select(residues=range(1, 60)))
+            slice_ = subset['A':]
+            slice_.atom_positions()
+            chain = (slice_ if owner == 'slice' else subset)['A']
+            residue = chain[next(iter(chain))]
+            del residue[next(iter(residue))]
+            self.assertEqual(len(slice_.atom_positions()), len(list(slice_.iteratoms())))
+            del chain[next(iter(chain))]
+            self.assertEqual(len(slice_.atom_positions()), len(list(slice_.iteratoms())))
+            self.assertEqual(len(subset.atom_positions()), len(list(subset.iteratoms())))
+            self.assertIs(slice_._atom_store(), slice_._atom_store())
+
+    def test_complex(self):
+        barnase, barstar = self.protein.copy(), self.protein.copy()
+        for chain_id in 'ABC':
+            del barstar[chain_id]
+        for chain_id in 'DEF':
+            del barnase[chain_id]
+        charges = barnase.atom_charges(), barstar.atom_charges()
+        complex_ = barnase + barstar
+        self.assertTrue(complex_._lazy)
+        self.assertEqual(complex_._chain_ids(), ['A', 'B', 'C', 'D', 'E', 'F'])
+        numpy.testing.assert_array_equal(
+            complex_.atom_positions(), self.protein.atom_positions())
+        self.assertIn('charges', complex_._store.cache)
+        numpy.testing.assert_array_equal(
+            complex_.atom_charges(), numpy.concatenate(charges))
+        self.assertEqual(complex_, self.protein)
+        with self.assertRaises(ValueError):
+            barnase + barnase.copy()
+
+    def test_offsets(self):
+        store = self.protein._atom_store()
+        residues = [r for c in self.protein.values() for r in c.values()]
+        chains = [sum(map(len, c.values())) for c in self.protein.values()]
+        numpy.testing.assert_array_equal(
+            store.residue_offsets(), numpy.cumsum([0] + [len(r) for r in residues]))
+        numpy.testing.assert_array_equal(store.chain_offsets(), numpy.cumsum([0] + chains))
+        del residues[0]['CA']
+        self.assertEqual(self.protein._atom_store().residue_offsets()[1], len(residues[0]))
+
+    def test_concatenate_offsets(self):
+        barnase, barstar = self.protein.copy(), self.protein.copy()
+        for chain_id in 'ABC':
+            del barstar[chain_id]
+        for chain_id in 'DEF':
+            del barnase[chain_id]
+        complex_ = barnase + barstar
+        store = self.protein._atom_store()
+        numpy.testing.assert_array_equal(complex_._store.cache['residue_offsets'], store.residue_offsets())
+        numpy.testing.assert_array_equal(complex_._store.cache['chain_offsets'], store.chain_offsets())
+
+    def test_geometry_cache(self):
+        center = self.protein.mass_center
+        self.assertIn('mass_center', self.protein._atom_store().geometry)
+        self.protein.atom(1).x += 1000
+        self.assertNotIn('mass_center', self.protein._atom_store().geometry)
+        expected = center + [1000 * self.protein.atom(1).mass / self.protein.mass, 0, 0]
+        numpy.testing.assert_allclose(self.protein.mass_center, expected)
+
+    def test_copy_on_write(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, '1brs.pdb')
+            self.protein.to_pdb_file(path)
+            protein = Protein.from_pdb_file(path, cached=True)
+            cached = cache.load_columns(path, None)['positions']
+            self.assertFalse(protein.atom_positions().flags.writeable)
+            protein.atom(1).x += 1
+            self.assertEqual(protein.atom_positions()[0, 0], cached[0, 0] + 1)
+            self.assertEqual(Protein.from_pdb_file(path, cached=True).atom(1).x, cached[0, 0])
+        finally:
+            cache.CACHE.clear()
+            shutil.rmtree(tmpdir)
+
+    def test_hand_built(self):
+        residue = Residue(1, "GLY")
+        residue["CA"] = Atom(0, 0, 1, 1, "CA", residue)
+        protein = Protein(chains={"A": Chain("A", residues={1: residue})})
+        numpy.testing.assert_array_equal(protein.atom_positions(), [[0, 0, 1]])
+        self.assertEqual(str(residue["CA"]), "Atom 1(0, 0, 1)")
+        residue["C"] = Atom(0, 0, 2, 2, "C", residue)
+        numpy.testing.assert_array_equal(protein.atom_positions(), [[0, 0, 1], [0, 0, 2]])
+
+    def test_sort_columns(self):
+        columns = self.columns([(1, 'N', 'A', 1), (2, 'CA', 'A', 1), (3, 'N', 'B', 1)])
+        self.assertIs(Protein._sort_columns(columns), columns)
+        columns = self.columns([
+            (3, 'N', 'B', 1), (1, 'CA', 'A', 2), (5, 'N', 'A', 1), (4, 'N', 'A', 2),
+            (2, 'C', 'B', 1), (6, 'CA', 'A', 1), (7, 'CA', 'A', 1),
+        ])
+        rows = Protein._sort_columns(columns)
+        self.assertEqual(rows['serial'].tolist(), [2, 3, 1, 4, 5, 7])
+        self.assertEqual(rows['chainID'].tolist(), ['B', 'B', 'A', 'A', 'A', 'A'])
+        self.assertEqual(rows['positions'][0].tolist(), [12, 13, 14])
+        protein = Protein._from_columns(columns)
+        self.assertEqual([a.id for a in protein.iteratoms()], rows['serial'].tolist())
+
+
+class TestAtomIndex(unittest.TestCase):
+
+    ICODES = b"".join([
+        b"ATOM      1  N   GLY A  27      11.104   6.134  -6.504  1.00  0.00           N\n",
+        b"ATOM      2  CA  GLY A  27      11.639   6.071  -5.147  1.00  0.00           C\n",
+        b"ATOM      3  N   ALA A  27A     12.104   7.134  -6.504  1.00  0.00           N\n",
+        b"ATOM      4  CA  ALA A  27A     12.639   7.071  -5.147  1.00  0.00           C\n",
+        b"ATOM      5  N   SER A  28      13.104   8.134  -6.504  1.00  0.00           N\n",
+    ])
+
+    def setUp(self):
+        self.protein = Protein.from_pdb_file(os.path.join(DATADIR, '1brs.pdb.gz'))
+
+    def test_atom(self):
+        for atom in self.protein.iteratoms():
+            self.assertIs(self.protein.atom(atom.id), atom)
+        self.assertTrue(self.protein._atom_index().exact)
+
+    def test_insert_delete(self):
+        residue = self.protein.residue(3, 'A')
+        atom = residue['CA']
+        del residue['CA']
+        self.assertNotIn(atom, self.protein)
+        with self.assertRaises(KeyError):
+            self.protein.atom(atom.id)
+        residue['CA'] = atom
+        self.assertIs(self.protein.atom(atom.id), atom)
+        atom.id = 99999
+        self.assertIs(self.protein.atom(99999), atom)
+        chain = self.protein.pop('A')
+        self.assertNotIn(atom, self.protein)
+        self.assertNotIn(residue, self.protein)
+        self.protein['A'] = chain
+        self.assertIn(residue, self.protein)
+        self.assertTrue(self.protein._atom_index().exact)
+
+    def test_contains(self):
+        atom = self.protein.atom(1)
+        self.assertIn(atom, self.protein)
+        self.assertIn(Atom(atom.x, atom.y, atom.z, atom.id, atom.name), self.protein)
+        self.assertNotIn(Atom(atom.x, atom.y, atom.z, atom.id, 'CB'), self.protein)
+        self.assertIn(atom.residue, self.protein['A'])
+        self.assertIn(atom.residue, self.protein)
+        self.assertNotIn(Residue(atom.residue.id), self.protein)
+
+    def test_shared_chains(self):
+        barstar = self.protein['D':]
+        del self.protein['D'][1]
+        self.assertFalse(barstar._atom_index().exact)
+        self.assertNotIn(1, barstar['D'])
+        self.assertEqual(barstar.residue(2).id, 2)
+        with self.assertRaises(KeyError):
+            barstar.residue(1, 'D')
+
+    def test_insertion_codes(self):
+        protein = Protein.from_pdb(io.BytesIO(self.ICODES))
+        self.assertEqual(list(protein['A'].keys()), [27, (27, 'A'), 28])
+        self.assertEqual(protein.residue(27).name, 'GLY')
+        self.assertEqual(protein.residue(27, icode='A').name, 'ALA')
+        self.assertEqual(protein.residue(27, 'A', 'A')['CA'].id, 4)
+        with self.assertRaises(KeyError):
+            protein.residue(27, 'B')
+        line = Protein.from_pdb(io.BytesIO(self.ICODES), vectorized=False)
+        self.assertEqual(list(line['A'].keys()), list(protein['A'].keys()))
+        out = io.BytesIO()
+        protein.to_pdb(out)
+        self.assertEqual(
+            [l.rstrip() for l in out.getvalue().splitlines()],
+            self.ICODES.splitlines() + [b"TER       6      SER A  28"])
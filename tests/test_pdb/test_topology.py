@@ -0,0 +1,92 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import unittest
+import numpy
+
+from dockerasmus.pdb import Protein, Chain, Residue, Atom
+from dockerasmus.pdb.topology import BondGraph
+from dockerasmus.score.requirements import ocn_atoms_positions
+
+from ..utils import DATADIR
+
+
+class TestBondGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.protein = Protein.from_pdb_file(os.path.join(DATADIR, 'barnase.native.pdb.gz'))
+        self.atoms = list(self.protein.iteratoms())
+        self.rows = {atom.id: row for row, atom in enumerate(self.atoms)}
+
+    def assertBonded(self, graph, atom1, atom2):
+        self.assertIn(self.rows[atom2.id], graph.neighbors_of(self.rows[atom1.id]).tolist())
+
+    def test_backbone(self):
+        graph = self.protein.bond_graph()
+        residues = list(self.protein['B'].values())
+        for residue in residues:
+            self.assertBonded(graph, residue['N'], residue['CA'])
+            self.assertBonded(graph, residue['CA'], residue['C'])
+            self.assertBonded(graph, residue['C'], residue['O'])
+        for previous, residue in zip(residues, residues[1:]):
+            self.assertBonded(graph, previous['C'], residue['N'])
+
+    def test_adjacency(self):
+        graph = self.protein.bond_graph()
+        self.assertEqual(len(graph), len(self.atoms))
+        self.assertEqual(graph.degrees().sum(), 2 * len(graph.bonds))
+        self.assertTrue((graph.bonds[:, 0] < graph.bonds[:, 1]).all())
+        for i, j in graph.bonds[:50].tolist():
+            self.assertIn(i, graph.neighbors_of(j).tolist())
+            self.assertIn(j, graph.neighbors_of(i).tolist())
+
+    def test_unknown_elements(self):
+        graph = BondGraph(['X', 'X'], numpy.zeros((2, 3)))
+        self.assertEqual(graph.bonds.shape, (0, 2))
+        self.assertEqual(graph.degrees().tolist(), [0, 0])
+
+    def test_cached(self):
+        graph = self.protein.bond_graph()
+        self.protein.atom(1).x += 100
+        self.assertIs(self.protein.bond_graph(), graph)
+        self.assertIs(self.protein.copy().bond_graph(), graph)
+
+
+class TestCarbonylPairs(unittest.TestCase):
+
+    def test_same_as_nearest(self):
+        protein = Protein.from_pdb_file(os.path.join(DATADIR, '1brs.pdb.gz'))
+        atoms = list(protein.iteratoms())
+        oxygens, carbons = protein.carbonyl_pairs()
+        self.assertEqual(
+            [atoms[row].id for row in carbons],
+            [atoms[row].nearest('C').id for row in oxygens])
+
+    def test_unbonded_oxygen(self):
+        residue = Residue(1, "GLY")
+        residue["CA"] = Atom(0, 0, 0, 1, "CA", residue)
+        residue["C"] = Atom(0, 0, 5, 2, "C", residue)
+        residue["O"] = Atom(0, 0, 9, 3, "O", residue)
+        protein = Protein(chains={"A": Chain("A", residues={1: residue})})
+        oxygens, carbons = protein.carbonyl_pairs()
+        self.assertEqual(oxygens.tolist(), [2])
+        self.assertEqual(carbons.tolist(), [1])
+        del residue["C"], residue["CA"]
+        with self.assertRaises(ValueError):
+            protein.carbonyl_pairs()
+
+    def test_ocn_atoms_positions(self):
+        barnase = Protein.from_pdb_file(os.path.join(DATADIR, 'barnase.native.pdb.gz'))
+        barstar = Protein.from_pdb_file(os.path.join(DATADIR, 'barstar.native.pdb.gz'))
+        o1, o2, c1, c2, n1, n2 = ocn_atoms_positions(barnase, barstar)
+        oxygens = [a for a in barnase.iteratoms() if a.name.startswith('O')]
+        numpy.testing.assert_array_equal(o1, [a.pos for a in oxygens])
+        numpy.testing.assert_array_equal(c1, [a.nearest('C').pos for a in oxygens])
+        numpy.testing.assert_array_equal(
+            n2, [a.pos for a in barstar.iteratoms() if a.name.startswith('N')])
+        self.assertEqual(len(n1), len(barnase.nitrogen_rows()))
+        self.assertEqual(
+            len(barnase.nitrogen_rows(backbone=True)),
+            sum(len(chain) for chain in barnase.values()))
@@ -0,0 +1,148 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import io
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+import numpy
+
+from dockerasmus.pdb import Protein, Chain, Residue, Atom
+
+from ..utils import DATADIR
+
+
+class TestWriter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.protein = Protein.from_pdb_file(os.path.join(DATADIR, '1brs.pdb.gz'))
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assertSameProtein(self, p1, p2):
+        self.assertEqual(list(p1.keys()), list(p2.keys()))
+        for chain1, chain2 in zip(p1.itervalues(), p2.itervalues()):
+            self.assertEqual(list(chain1.keys()), list(chain2.keys()))
+        atoms1, atoms2 = list(p1.iteratoms()), list(p2.iteratoms())
+        self.assertEqual([a.id for a in atoms1], [a.id for a in atoms2])
+        self.assertEqual([a.name for a in atoms1], [a.name for a in atoms2])
+        self.assertEqual(
+            [a.residue._name for a in atoms1], [a.residue._name for a in atoms2])
+        self.assertEqual([a.pos.tolist() for a in atoms1], [a.pos.tolist() for a in atoms2])
+
+    def test_roundtrip(self):
+        out = io.BytesIO()
+        self.protein.to_pdb(out)
+        self.assertSameProtein(self.protein, Protein.from_pdb(io.BytesIO(out.getvalue())))
+
+    def test_same_as_line_format(self):
+        out = io.BytesIO()
+        self.protein.to_pdb(out)
+        lines = iter(out.getvalue().decode('ascii').splitlines())
+        columns = self.protein._to_columns()
+        alt_locs = iter(columns['altLoc'].tolist())
+        factors = iter(zip(columns['occupancy'].tolist(), columns['tempFactor'].tolist()))
+        for chain in self.protein.itervalues():
+            for residue in chain.itervalues():
+                for atom in sorted(residue.itervalues(), key=lambda a: a.id):
+                    self.assertEqual(next(lines), (
+                        "ATOM  {:5d} {:<4}{:1}{:>3} {}{:4d}    {:8.3f}{:8.3f}{:8.3f}"
+                        "{:6.2f}{:6.2f}          {:>2}  "
+                    ).format(
+                        atom.id, atom.name if len(atom.name) == 4 else " " + atom.name,
+                        next(alt_locs), residue._name, chain.id, residue.id,
+                        atom.x, atom.y, atom.z, *next(factors) + (atom.name[0],)
+                    ))
+            self.assertEqual(next(lines).rstrip(), "TER   {:5d}      {:>3} {}{:4d}".format(
+                atom.id + 1, residue._name, chain.id, residue.id))
+        self.assertRaises(StopIteration, next, lines)
+
+    def test_occupancy(self):
+        columns = self.protein._to_columns()
+        self.assertTrue((columns['tempFactor'] > 0).all())
+        out = io.BytesIO()
+        self.protein.to_pdb(out)
+        parsed = Protein.from_pdb(io.BytesIO(out.getvalue()))._to_columns()
+        numpy.testing.assert_array_equal(parsed['occupancy'], columns['occupancy'])
+        numpy.testing.assert_array_equal(parsed['tempFactor'], columns['tempFactor'])
+
+    def test_occupancy_kept(self):
+        protein = Protein.from_pdb_file(os.path.join(DATADIR, '1brs.pdb.gz'))
+        factors = protein._to_columns()['tempFactor']
+        residue = protein['A'][3]
+        residue['XX'] = Atom(0, 0, 0, 10000, 'XX', residue)
+        columns = protein._to_columns()
+        new = columns['name'].tolist().index('XX')
+        self.assertEqual(columns['tempFactor'][new], 0.0)
+        self.assertEqual(columns['occupancy'][new], 1.0)
+        numpy.testing.assert_array_equal(numpy.delete(columns['tempFactor'], new), factors)
+
+    def test_file(self):
+        for name in ('1brs.pdb', '1brs.pdb.gz'):
+            path = os.path.join(self.tmpdir, name)
+            self.protein.to_pdb_file(path)
+            with (gzip.open if name.endswith('.gz') else open)(path, 'rb') as f:
+                self.assertTrue(f.read().endswith(b"\nEND\n"))
+            self.assertSameProtein(self.protein, Protein.from_pdb_file(path))
+
+    def test_model(self):
+        out = io.BytesIO()
+        self.protein.to_pdb(out, model=1)
+        self.protein.to_pdb(out, model=2)
+        models = list(Protein.iter_pdb_models(io.BytesIO(out.getvalue())))
+        self.assertEqual([m.id for m in models], [1, 2])
+        self.assertSameProtein(models[1], self.protein)
+
+    def test_models(self):
+        positions = self.protein.atom_positions()
+        poses = positions + numpy.arange(3).reshape(3, 1, 1)
+        out = io.BytesIO()
+        self.protein.to_pdb_models(out, poses, start=5)
+        models = list(Protein.iter_pdb_models(io.BytesIO(out.getvalue())))
+        self.assertEqual([m.id for m in models], [5, 6, 7])
+        for model, pose in zip(models, poses):
+            numpy.testing.assert_allclose(model.atom_positions(), pose, atol=5e-4)
+        with self.assertRaises(ValueError):
+            self.protein.to_pdb_models(out, poses[:, 1:])
+
+    def test_handmade(self):
+        protein = Protein(chains={'A': Chain('A')})
+        residue = protein['A'][1] = Residue(1, 'GLY')
+        residue['CA'] = Atom(1, -2, 0.5, 1, 'CA', residue)
+        out = io.BytesIO()
+        protein.to_pdb(out)
+        self.assertEqual(
+            out.getvalue(),
+            b"ATOM      1  CA  GLY A   1       1.000  -2.000   0.500  1.00  0.00           C  \n"
+            b"TER       2      GLY A   1                                                      \n",
+        )
+
+    def test_long_chain_id(self):
+        protein = Protein(chains={'AB': Chain('AB')})
+        residue = protein['AB'][1] = Residue(1, 'GLY')
+        residue['CA'] = Atom(0, 0, 0, 1, 'CA', residue)
+        with self.assertRaises(ValueError):
+            protein.to_pdb(io.BytesIO())
+
+    def test_empty(self):
+        out = io.BytesIO()
+        Protein().to_pdb(out)
+        self.assertEqual(out.getvalue(), b"")
+
+    def test_hybrid36(self):
+        protein = Protein(chains={'A': Chain('A')})
+        residue = protein['A'][12345] = Residue(12345, 'GLY')
+        residue['CA'] = Atom(0, 0, 0, 123456, 'CA', residue)
+        out = io.BytesIO()
+        protein.to_pdb(out)
+        self.assertEqual(out.getvalue()[6:27], b"A0I3K  CA  GLY AA1T5 ")
+        atom = next(Protein.from_pdb(io.BytesIO(out.getvalue())).iteratoms())
+        self.assertEqual((atom.id, atom.residue.id), (123456, 12345))
@@ -0,0 +1,83 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import unittest
+import numpy
+
+from dockerasmus import spatial
+from dockerasmus.ligand import Ligand
+from dockerasmus.pdb import Protein
+from dockerasmus.pose import Pose
+from dockerasmus.score import ScoringFunction
+from dockerasmus.score.components import Coulomb, Fabiola, LennardJones
+
+from .utils import DATADIR
+
+
+class TestPose(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.barnase = Protein.from_pdb_file(os.path.join(DATADIR, 'barnase.native.pdb.gz'))
+
+    def setUp(self):
+        self.barstar = Protein.from_pdb_file(os.path.join(DATADIR, 'barstar.native.pdb.gz'))
+        self.matrix = spatial.RotationMatrix(0.1, -0.2, 0.3).dot(spatial.TranslationMatrix(1, 2, 3))
+        self.pose = Pose(self.barstar, self.matrix)
+
+    def test_positions(self):
+        expected = self.barstar.transform(self.matrix).atom_positions()
+        numpy.testing.assert_allclose(self.pose.atom_positions(), expected)
+        self.assertIs(self.pose.atom_positions(), self.pose.atom_positions())
+        self.assertFalse(self.pose.atom_positions().flags.writeable)
+        self.assertEqual(len(self.pose), len(expected))
+
+    def test_template_moved(self):
+        positions = self.pose.atom_positions()
+        self.barstar.atom(1).x += 10
+        self.assertIsNot(self.pose.atom_positions(), positions)
+        numpy.testing.assert_allclose(
+            self.pose.atom_positions(), self.barstar.transform(self.matrix).atom_positions())
+
+    def test_template_vectors(self):
+        self.assertIs(self.pose.atom_charges(), self.barstar.atom_charges())
+        self.assertIs(self.pose.atom_radius(), self.barstar.atom_radius())
+        self.assertIs(self.pose.atom_pwd(), self.barstar.atom_pwd())
+        self.assertIs(self.pose.carbonyl_pairs(), self.barstar.carbonyl_pairs())
+
+    def test_invalid_transform(self):
+        with self.assertRaises(ValueError):
+            Pose(self.barstar, numpy.identity(3))
+        with self.assertRaises(ValueError):
+            self.pose.transform[0, 0] = 2
+
+    def test_compose(self):
+        translation = spatial.TranslationMatrix(5, 0, 0)
+        pose = self.pose.compose(translation)
+        self.assertIs(pose.template, self.barstar)
+        numpy.testing.assert_allclose(
+            pose.atom_positions(), self.pose.atom_positions() + [5, 0, 0])
+        numpy.testing.assert_allclose(
+            pose.materialize().atom_positions(), pose.atom_positions())
+
+    def test_ligand(self):
+        ligand = Ligand("water", ["O", "H", "H"], numpy.eye(3), [-0.8, 0.4, 0.4])
+        pose = Pose(ligand, spatial.TranslationMatrix(1, 0, 0))
+        numpy.testing.assert_allclose(pose.atom_positions(), numpy.eye(3) + [1, 0, 0])
+        ligand.transform(spatial.TranslationMatrix(0, 1, 0), inplace=True)
+        numpy.testing.assert_allclose(pose.atom_positions(), numpy.eye(3) + [1, 1, 0])
+        self.assertIs(pose.atom_charges(), ligand.charges)
+        self.assertIs(pose.atom_radius(), ligand.atom_radius())
+        self.assertIs(pose.compose(numpy.identity(4)).atom_pwd(), ligand.atom_pwd())
+
+    def test_scoring_function(self):
+        function = ScoringFunction(
+            Coulomb(force_backend='numpy'),
+            LennardJones(force_backend='numpy'),
+            Fabiola(force_backend='numpy'),
+        )
+        expected = function(self.barnase, self.barstar.transform(self.matrix))
+        self.assertAlmostEqual(function(self.barnase, self.pose), expected)
+        self.assertAlmostEqual(function(self.pose, self.barnase), expected)
@@ -4,10 +4,13 @@ from __future__ import unicode_literals
 
 import unittest
 import os
+import shutil
+import tempfile
 import math
 import numpy
 
-from dockerasmus.pdb import Protein
+from dockerasmus.pdb import Protein, Chain, Residue, Atom
+from dockerasmus.ligand import Ligand
 from dockerasmus import spatial
 
 from .utils import DATADIR
@@ -44,6 +47,83 @@ class TestMatrices(TestArrays):
         translated_point = spatial.TranslationMatrix(1, 1, 1).dot(point)
         self.assertArrayAlmostEqual(translated_point, [1, 1, 1, 1])
 
+    def test_matrix_stacks(self):
+        angles = numpy.array([(0.1, 0.2, 0.3), (1, -2, 3), (0, 0, 0)])
+        stack = spatial.RotationMatrix(*angles.T)
+        self.assertEqual(stack.shape, (3, 4, 4))
+        for matrix, (x, y, z) in zip(stack, angles):
+            self.assertArrayAlmostEqual(matrix, spatial.RotationMatrix(x, y, z))
+        stack = spatial.TranslationMatrix(dx=[1, 2], dz=3)
+        self.assertArrayAlmostEqual(stack[1], spatial.TranslationMatrix(2, 0, 3))
+
+    def test_transform_matrix(self):
+        rotation = spatial.RotationMatrix(0.1, 0.2, 0.3)
+        self.assertArrayAlmostEqual(
+            spatial.TransformMatrix(rotation, [1, 2, 3]),
+            spatial.TranslationMatrix(1, 2, 3).dot(rotation))
+        self.assertArrayAlmostEqual(
+            spatial.TransformMatrix(rotation[:3, :3], numpy.zeros((2, 3)))[1], rotation)
+
+    def test_quaternion_matrix(self):
+        angle = 0.7
+        c, s = math.cos(angle / 2), math.sin(angle / 2)
+        self.assertArrayAlmostEqual(
+            spatial.QuaternionMatrix([c, s, 0, 0]), spatial.RotationMatrix(angle, 0, 0))
+        self.assertArrayAlmostEqual(
+            spatial.QuaternionMatrix([c, 0, s, 0]), spatial.RotationMatrix(0, angle, 0))
+        self.assertArrayAlmostEqual(
+            spatial.QuaternionMatrix([[2 * c, 0, 0, 2 * s]])[0], spatial.RotationMatrix(0, 0, angle))
+
+
+class TestSampling(TestArrays):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_rotation_grid(self):
+        resolution = math.radians(20)
+        grid = spatial.rotation_grid(resolution)
+        self.assertArrayAlmostEqual(numpy.linalg.norm(grid, axis=1), 1)
+        rotations = spatial.QuaternionMatrix(grid)[:, :3, :3]
+        self.assertArrayAlmostEqual(numpy.linalg.det(rotations), numpy.ones(len(grid)))
+        # every orientation is close to a rotation of the grid
+        random = numpy.random.RandomState(0).normal(size=(500, 4))
+        random /= numpy.linalg.norm(random, axis=1)[:, None]
+        cosines = numpy.abs(random.dot(grid.T)).max(axis=1)
+        self.assertLess(2 * numpy.arccos(numpy.clip(cosines, 0, 1)).max(), resolution)
+
+    def test_rotation_grid_spacing(self):
+        for degrees in (45, 30, 20):
+            resolution = math.radians(degrees)
+            grid = spatial.rotation_grid(resolution)
+            cosines = numpy.abs(grid.dot(grid.T))
+            numpy.fill_diagonal(cosines, 0)
+            # the nearest neighbor of every rotation is about ``resolution`` away
+            spacing = 2 * numpy.arccos(numpy.clip(cosines.max(axis=1), 0, 1))
+            self.assertLessEqual(spacing.max(), resolution * 1.01)
+            self.assertGreater(spacing.min(), resolution * 0.8)
+            self.assertAlmostEqual(numpy.median(spacing) / resolution, 1, delta=0.1)
+
+    def test_translation_shells(self):
+        shells = spatial.translation_shells([0, 5, 10], 2.0)
+        norms = numpy.linalg.norm(shells, axis=1)
+        self.assertEqual(sorted(set(numpy.round(norms, 6).tolist())), [0, 5, 10])
+        self.assertEqual((norms == 0).sum(), 1)
+        self.assertEqual(numpy.isclose(norms, 5).sum(), math.ceil(4 * math.pi * 25 / 4))
+
+    def test_cache(self):
+        grid = spatial.rotation_grid(0.5, cache_dir=self.tmpdir)
+        files = os.listdir(self.tmpdir)
+        self.assertEqual(len(files), 1)
+        numpy.testing.assert_array_equal(spatial.rotation_grid(0.5, cache_dir=self.tmpdir), grid)
+        numpy.testing.assert_array_equal(spatial.rotation_grid(0.5), grid)
+        spatial.translation_shells([1, 2], 1.0, cache_dir=self.tmpdir)
+        spatial.rotation_grid(0.4, cache_dir=self.tmpdir)
+        self.assertEqual(len(os.listdir(self.tmpdir)), 3)
+
 
 class TestTransform(TestArrays):
 
@@ -64,6 +144,12 @@ class TestTransform(TestArrays):
                 self.arginine['A'][-3][new_atom.name].pos + numpy.array([2, 2, 1])
             )
 
+    def test_transform_cartesian_z_rotation(self):
+        new_arginine = spatial.transform_cartesian(self.arginine, tau=math.pi)
+        for new_atom in new_arginine['A'][-3].values():
+            x, y, z = self.arginine['A'][-3][new_atom.name].pos
+            self.assertArrayAlmostEqual(new_atom.pos, [-x, -y, z])
+
     def test_transform_spherical(self):
         new_arginine = spatial.transform_spherical(
             self.arginine, r=1, phi=0, theta=0
@@ -84,3 +170,105 @@ class TestTransform(TestArrays):
                 new_atom_2.pos,
                 self.arginine['A'][-3][new_atom_2.name].pos + numpy.array([0, 2, 0])
             )
+
+        new_arginine_3 = spatial.transform_spherical(
+            self.arginine, r=3, phi=math.pi/2, theta=0
+        )
+
+        for new_atom_3 in new_arginine_3['A'][-3].values():
+            self.assertArrayAlmostEqual(
+                new_atom_3.pos,
+                self.arginine['A'][-3][new_atom_3.name].pos + numpy.array([3, 0, 0])
+            )
+
+
+class TestApplyTransformationMatrix(TestArrays):
+
+    def setUp(self):
+        self.protein = Protein.from_pdb_file(os.path.join(DATADIR, '1brs.pdb.gz'))
+        self.matrix = spatial.RotationMatrix(0.3, 0.2, 0.1).dot(spatial.TranslationMatrix(1, 2, 3))
+
+    def expected(self, positions):
+        homogeneous = numpy.hstack([positions, numpy.ones((len(positions), 1))])
+        return homogeneous.dot(self.matrix.T)[:, :3]
+
+    def test_copy(self):
+        positions = self.protein.atom_positions().copy()
+        moved = spatial.apply_transformation_matrix(self.protein, self.matrix)
+        self.assertTrue(moved._lazy)
+        self.assertIs(moved._atom_store().columns['name'], self.protein._atom_store().columns['name'])
+        self.assertArrayAlmostEqual(moved.atom_positions(), self.expected(positions))
+        numpy.testing.assert_array_equal(self.protein.atom_positions(), positions)
+        self.assertEqual(moved, spatial.apply_transformation_matrix(self.protein, self.matrix))
+
+    def test_inplace(self):
+        positions = self.protein.atom_positions().copy()
+        atom = self.protein.atom(1)
+        center = self.protein.mass_center
+        result = spatial.apply_transformation_matrix(self.protein, self.matrix, inplace=True)
+        self.assertIs(result, self.protein)
+        self.assertArrayAlmostEqual(self.protein.atom_positions(), self.expected(positions))
+        self.assertArrayAlmostEqual(atom.pos, self.expected(positions[:1])[0])
+        self.assertArrayAlmostEqual(self.protein.mass_center, self.expected(center[None])[0])
+
+    def test_inplace_copy_on_write(self):
+        positions = self.protein.atom_positions().copy()
+        copy = self.protein.copy()
+        spatial.apply_transformation_matrix(copy, self.matrix, inplace=True)
+        numpy.testing.assert_array_equal(self.protein.atom_positions(), positions)
+        self.assertArrayAlmostEqual(copy.atom_positions(), self.expected(positions))
+
+    def test_inplace_subset(self):
+        positions = self.protein.atom_positions().copy()
+        mask = self.protein.select(chains='D')
+        subset = self.protein.subset(mask)
+        subset.transform(self.matrix, inplace=True)
+        self.assertArrayAlmostEqual(subset.atom_positions(), self.expected(positions[mask]))
+        self.assertArrayAlmostEqual(self.protein.atom_positions()[mask], self.expected(positions[mask]))
+        numpy.testing.assert_array_equal(self.protein.atom_positions()[~mask], positions[~mask])
+
+    def test_inplace_hand_built(self):
+        residue = Residue(1, "GLY")
+        residue["CA"] = Atom(0, 0, 1, 1, "CA", residue)
+        protein = Protein(chains={"A": Chain("A", residues={1: residue})})
+        protein.transform(spatial.TranslationMatrix(1, 2, 3), inplace=True)
+        self.assertArrayAlmostEqual(residue["CA"].pos, [1, 2, 4])
+        self.assertArrayAlmostEqual(protein.atom_positions(), [[1, 2, 4]])
+
+    def test_ligand(self):
+        ligand = Ligand("water", ["O", "H", "H"], numpy.eye(3), [-0.8, 0.4, 0.4])
+        moved = spatial.apply_transformation_matrix(ligand, self.matrix)
+        self.assertArrayAlmostEqual(moved.positions, self.expected(numpy.eye(3)))
+        self.assertIs(moved.charges, ligand.charges)
+        self.assertArrayAlmostEqual(ligand.positions, numpy.eye(3))
+        spatial.apply_transformation_matrix(ligand, self.matrix, inplace=True)
+        self.assertArrayAlmostEqual(ligand.positions, moved.positions)
+
+
+class TestPosePositions(TestArrays):
+
+    def setUp(self):
+        self.protein = Protein.from_pdb_file(os.path.join(DATADIR, 'barstar.native.pdb.gz'))
+        i = numpy.arange(5)
+        self.transforms = numpy.matmul(
+            spatial.RotationMatrix(0.1 * i, -0.2 * i, 0.3 * i),
+            spatial.TranslationMatrix(i, 2 * i, -i))
+
+    def test_pose_positions(self):
+        poses = spatial.pose_positions(self.protein, self.transforms)
+        self.assertEqual(poses.shape, (5,) + self.protein.atom_positions().shape)
+        for pose, matrix in zip(poses, self.transforms):
+            expected = spatial.apply_transformation_matrix(self.protein, matrix)
+            self.assertArrayAlmostEqual(pose, expected.atom_positions())
+
+    def test_pose_positions_out(self):
+        out = numpy.empty((5,) + self.protein.atom_positions().shape)
+        result = spatial.pose_positions(self.protein.atom_positions(), self.transforms, out=out)
+        self.assertIs(result, out)
+        self.assertArrayAlmostEqual(out, spatial.pose_positions(self.protein, self.transforms))
+
+    def test_iter_pose_positions(self):
+        batches = [b.copy() for b in spatial.iter_pose_positions(self.protein, self.transforms, 2)]
+        self.assertEqual([len(b) for b in batches], [2, 2, 1])
+        self.assertArrayAlmostEqual(
+            numpy.concatenate(batches), spatial.pose_positions(self.protein, self.transforms))
@@ -0,0 +1,43 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from dockerasmus.utils import files
+
+
+class TestAtomicOpen(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'data.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_replace(self):
+        with files.atomic_open(self.path) as f:
+            f.write(b'old')
+            self.assertFalse(os.path.exists(self.path))
+        with files.atomic_open(self.path) as f:
+            f.write(b'new')
+            with open(self.path, 'rb') as g:
+                self.assertEqual(g.read(), b'old')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'new')
+        self.assertEqual(os.listdir(self.tmpdir), ['data.bin'])
+
+    def test_error(self):
+        with files.atomic_open(self.path) as f:
+            f.write(b'old')
+        with self.assertRaises(ValueError):
+            with files.atomic_open(self.path) as f:
+                f.write(b'partial')
+                raise ValueError()
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'old')
+        self.assertEqual(os.listdir(self.tmpdir), ['data.bin'])
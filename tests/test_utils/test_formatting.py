@@ -0,0 +1,104 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import unittest
+import numpy
+
+from dockerasmus.utils import formatting, parsing
+
+
+def _decode(mx):
+    return [bytes(row).decode('ascii') for row in mx.reshape(-1, mx.shape[-1])]
+
+
+class TestFormatDecimals(unittest.TestCase):
+
+    def test_same_as_format(self):
+        values = numpy.array([11.281, -86.699, 9999.999, -0.001, 0.5, -0.25, 0, 123.4567])
+        self.assertEqual(
+            _decode(formatting.format_decimals(values, 8, 3)),
+            ['{:8.3f}'.format(v) for v in values],
+        )
+
+    def test_random(self):
+        rng = numpy.random.RandomState(0)
+        values = rng.uniform(-999, 9999, 1000)
+        self.assertEqual(
+            _decode(formatting.format_decimals(values, 8, 3)),
+            ['{:8.3f}'.format(v) for v in values],
+        )
+
+    def test_matrix(self):
+        mx = formatting.format_decimals(numpy.array([[1.0, -2.5, 3.125]]).T, 8, 3)
+        self.assertEqual(mx.shape, (3, 1, 8))
+        self.assertEqual(_decode(mx), ['   1.000', '  -2.500', '   3.125'])
+
+    def test_no_negative_zero(self):
+        self.assertEqual(_decode(formatting.format_decimals([-0.0004], 8, 3)), ['   0.000'])
+
+    def test_overflow(self):
+        with self.assertRaises(ValueError):
+            formatting.format_decimals([10000.0], 8, 3)
+        with self.assertRaises(ValueError):
+            formatting.format_decimals([-1000.0], 8, 3)
+
+
+class TestFormatIntegers(unittest.TestCase):
+
+    def test_same_as_format(self):
+        values = numpy.array([32, -3, 12345, 0, -9999])
+        self.assertEqual(
+            _decode(formatting.format_integers(values, 5)),
+            ['{:5d}'.format(v) for v in values],
+        )
+
+    def test_overflow(self):
+        with self.assertRaises(ValueError):
+            formatting.format_integers([100000], 5)
+        with self.assertRaises(ValueError):
+            formatting.format_integers([-10000], 5)
+
+
+class TestFormatStrings(unittest.TestCase):
+
+    def test_justify(self):
+        values = numpy.array(['ARG', 'HIS', 'N'])
+        self.assertEqual(_decode(formatting.format_strings(values, 4)), ['ARG ', 'HIS ', 'N   '])
+        self.assertEqual(
+            _decode(formatting.format_strings(values, 4, justify='right')),
+            [' ARG', ' HIS', '   N'],
+        )
+
+    def test_empty(self):
+        mx = formatting.format_strings(numpy.array([], dtype='U1'), 3)
+        self.assertEqual(mx.shape, (0, 3))
+
+    def test_overflow(self):
+        with self.assertRaises(ValueError):
+            formatting.format_strings(numpy.array(['AB']), 1)
+
+
+class TestFormatHybrid36(unittest.TestCase):
+
+    def test_decimal(self):
+        self.assertEqual(
+            _decode(formatting.format_hybrid36(numpy.array([1, -3, 99999]), 5)),
+            ['    1', '   -3', '99999'],
+        )
+
+    def test_encoded(self):
+        values = numpy.array([100000, 100001, 43770015, 43770016, 87440031])
+        self.assertEqual(
+            _decode(formatting.format_hybrid36(values, 5)),
+            ['A0000', 'A0001', 'ZZZZZ', 'a0000', 'zzzzz'],
+        )
+
+    def test_roundtrip(self):
+        values = numpy.arange(-999, 2436112, 13)
+        mx = formatting.format_hybrid36(values, 4)
+        numpy.testing.assert_array_equal(parsing.parse_hybrid36(mx), values)
+
+    def test_overflow(self):
+        with self.assertRaises(ValueError):
+            formatting.format_hybrid36([87440032], 5)
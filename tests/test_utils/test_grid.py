@@ -0,0 +1,58 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import unittest
+import numpy
+
+from dockerasmus.utils import grid
+from dockerasmus.utils.matrices import distance
+
+
+class TestCellList(unittest.TestCase):
+
+    def setUp(self):
+        rng = numpy.random.RandomState(0)
+        self.points = rng.uniform(0, 40, (2000, 3))
+        # query points inside, around and far from the indexed points
+        self.queries = rng.uniform(-30, 70, (300, 3))
+        self.grid = grid.CellList(self.points, 4.0)
+        self.distances = distance(self.queries, self.points)
+
+    def test_pairs(self):
+        i, j, d = self.grid.pairs(self.queries, 6.0)
+        expected_i, expected_j = numpy.nonzero(self.distances < 6.0)
+        numpy.testing.assert_array_equal(i, expected_i)
+        numpy.testing.assert_array_equal(j, expected_j)
+        numpy.testing.assert_allclose(d, self.distances[expected_i, expected_j])
+
+    def test_within(self):
+        numpy.testing.assert_array_equal(
+            self.grid.within(self.queries, 2.5), (self.distances < 2.5).any(axis=1))
+
+    def test_query_radius(self):
+        neighbors = self.grid.query_radius(self.queries, 5.0)
+        self.assertEqual(len(neighbors), len(self.queries))
+        for row, indices in zip(self.distances, neighbors):
+            numpy.testing.assert_array_equal(indices, numpy.flatnonzero(row < 5.0))
+
+    def test_query(self):
+        distances, indices = self.grid.query(self.queries)
+        numpy.testing.assert_array_equal(indices, self.distances.argmin(axis=1))
+        numpy.testing.assert_allclose(distances, self.distances.min(axis=1))
+        distances, indices = self.grid.query(self.queries, k=4)
+        expected = numpy.argsort(self.distances, axis=1, kind='mergesort')[:, :4]
+        numpy.testing.assert_array_equal(indices, expected)
+        self.assertEqual(distances.shape, (len(self.queries), 4))
+        self.assertTrue((numpy.diff(distances, axis=1) >= 0).all())
+
+    def test_query_single(self):
+        d, i = self.grid.query(self.queries[0])
+        self.assertEqual(i, self.distances[0].argmin())
+        with self.assertRaises(ValueError):
+            self.grid.query(self.queries, k=len(self.points) + 1)
+
+    def test_empty(self):
+        empty = grid.CellList(numpy.zeros((0, 3)))
+        self.assertEqual(len(empty.pairs(self.queries, 5)[0]), 0)
+        self.assertFalse(empty.within(self.queries, 5).any())
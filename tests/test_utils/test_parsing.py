@@ -0,0 +1,105 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import unittest
+import numpy
+
+from dockerasmus.utils import parsing
+
+
+class TestParseDecimals(unittest.TestCase):
+
+    def test_fixed_format(self):
+        fields = [b"  11.281", b" -86.699", b"9999.999", b"  -0.001"]
+        self.assertEqual(
+            parsing.parse_decimals(numpy.array(fields)).tolist(),
+            [float(f) for f in fields],
+        )
+
+    def test_free_format(self):
+        fields = [b"  11.2  ", b"-86.699 ", b"    1   ", b"  .5    "]
+        self.assertEqual(
+            parsing.parse_decimals(numpy.array(fields)).tolist(),
+            [float(f) for f in fields],
+        )
+
+    def test_matrix(self):
+        mx = numpy.frombuffer(b"   1.000  -2.500   3.125", dtype=numpy.uint8)
+        self.assertEqual(
+            parsing.parse_decimals(mx.reshape(1, 3, 8)).tolist(),
+            [[1.0, -2.5, 3.125]],
+        )
+
+    def test_moving_decimal_point(self):
+        fields = [b" 1.250", b" 12.50", b"-125.0"]
+        self.assertEqual(
+            parsing.parse_decimals(numpy.array(fields)).tolist(),
+            [float(f) for f in fields],
+        )
+
+    def test_exact(self):
+        # single precision is only used when every digit is exact
+        fields = [b"  9999999.9", b" -1234567.8", b"123456789.1"]
+        self.assertEqual(
+            parsing.parse_decimals(numpy.array(fields)).tolist(),
+            [float(f) for f in fields],
+        )
+        # fields sliced from a matrix of lines
+        lines = numpy.frombuffer(b"x -8.125  99.50x 12.375   0.25", dtype=numpy.uint8)
+        self.assertEqual(
+            parsing.parse_decimals(lines.reshape(2, 15)[:, 1:].reshape(2, 2, 7)).tolist(),
+            [[-8.125, 99.5], [12.375, 0.25]],
+        )
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parsing.parse_decimals(numpy.array([b"  1.0", b"  abc"]))
+        with self.assertRaises(ValueError):
+            parsing.parse_decimals(numpy.array([b"  1.0", b"     "]))
+
+
+class TestParseIntegers(unittest.TestCase):
+
+    def test_right_aligned(self):
+        fields = [b"   32", b"   -3", b"12345", b"    0"]
+        self.assertEqual(
+            parsing.parse_integers(numpy.array(fields)).tolist(),
+            [32, -3, 12345, 0],
+        )
+
+    def test_left_aligned(self):
+        fields = [b"32   ", b"-3   ", b" 1 "]
+        self.assertEqual(
+            parsing.parse_integers(numpy.array(fields)).tolist(),
+            [32, -3, 1],
+        )
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parsing.parse_integers(numpy.array([b"  1", b"1.0"]))
+        with self.assertRaises(ValueError):
+            parsing.parse_integers(numpy.array([b"  1", b"   "]))
+
+
+class TestParseHybrid36(unittest.TestCase):
+
+    def test_decimal(self):
+        fields = [b"    1", b"   -3", b"99999"]
+        self.assertEqual(parsing.parse_hybrid36(numpy.array(fields)).tolist(), [1, -3, 99999])
+
+    def test_encoded(self):
+        fields = [b"A0000", b"A0001", b"ZZZZZ", b"a0000", b"zzzzz", b"  123"]
+        self.assertEqual(
+            parsing.parse_hybrid36(numpy.array(fields)).tolist(),
+            [100000, 100001, 43770015, 43770016, 87440031, 123],
+        )
+
+    def test_width(self):
+        fields = [b"9999", b"A000", b"a000"]
+        self.assertEqual(parsing.parse_hybrid36(numpy.array(fields)).tolist(), [9999, 10000, 1223056])
+
+    def test_invalid(self):
+        for field in (b"1A000", b"Aa000", b"A 000", b"A-000"):
+            with self.assertRaises(ValueError):
+                parsing.parse_hybrid36(numpy.array([b"A0000", field]))